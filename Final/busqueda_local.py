@@ -0,0 +1,328 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
+
+from funciones import Solucion
+
+#  Búsqueda local sobre la estructura de viajes de una ruta
+#
+# Una ruta se ve como una secuencia de viajes: cada viaje carga en una recarga (depósito o
+# hub) y entrega en sus paradas una cantidad fija de paquetes cada una, sin superar la
+# capacidad. El costo de un viaje t se mide sobre su secuencia [recarga_t, paradas..., fin_t],
+# donde fin_t es la recarga del viaje siguiente (o el depósito al final); así cada arista de
+# la ruta pertenece a exactamente un viaje y todos los movimientos se evalúan en O(1):
+#
+# - 2-opt y or-opt (segmentos de 1 a 3 paradas) dentro de un viaje
+# - relocate (mover una parada a otro viaje) y swap (intercambiar paradas entre viajes),
+#   probando solo contra los k vecinos más cercanos de cada nodo
+# - cambio de la recarga de un viaje por la que minimiza llegar y salir de ella
+#
+# Se aplica la primera mejora encontrada. Cada nodo tiene un "don't-look bit": solo se vuelve
+# a revisar cuando cambia alguno de los viajes en los que está.
+
+EPS = 1e-9
+
+
+@dataclass
+class Viaje:
+    """Un viaje: carga en `recarga` y entrega cantidades[i] paquetes en paradas[i]."""
+    recarga: int
+    paradas: List[int] = field(default_factory=list)
+    cantidades: List[int] = field(default_factory=list)
+
+    @property
+    def carga(self) -> int:
+        return sum(self.cantidades)
+
+
+def descomponer_ruta(ruta: List[int],
+                     deposito_id: int,
+                     nodos_recarga: set,
+                     demanda_por_nodo: Dict[int, int],
+                     capacidad_camion: int) -> Optional[List[Viaje]]:
+    """
+    Reconstruye los viajes de una ruta en el formato de `bt` / `primer_solucion_greedy`
+    (cargar con el camión vacío tomando min(capacidad, restante) y entregar min(carga, demanda)).
+    También acepta viajes que no vacían el camión (los de `heuristicas` o de esta misma búsqueda
+    local): con carga a bordo, pasar por una recarga sin demanda pendiente cierra el viaje.
+    Parametros:
+    - ruta: ruta de la solución (empieza y termina en el depósito)
+    - deposito_id: id del nodo depósito
+    - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
+    - demanda_por_nodo: diccionario {nodo: cantidad de paquetes a entregar}
+    - capacidad_camion: capacidad máxima del camión
+    Salida:
+    - lista de viajes, o None si la ruta no respeta ese formato
+    """
+    pendiente = dict(demanda_por_nodo)
+    restante = sum(pendiente.values())
+    viajes: List[Viaje] = []
+    u, carga, i = ruta[0], 0, 1
+    while restante > 0:
+        if carga == 0:
+            if i < len(ruta) and ruta[i] in nodos_recarga and ruta[i] != u:
+                u = ruta[i]
+                i += 1
+            elif u not in nodos_recarga:
+                return None
+            carga = min(capacidad_camion, restante)
+            viajes.append(Viaje(u))
+            continue
+        if i >= len(ruta):
+            return None
+        v = ruta[i]
+        if v in nodos_recarga and not pendiente.get(v, 0):
+            carga = 0
+            continue
+        i += 1
+        entrego = min(carga, pendiente.get(v, 0))
+        if entrego == 0:
+            return None
+        viajes[-1].paradas.append(v)
+        viajes[-1].cantidades.append(entrego)
+        pendiente[v] -= entrego
+        carga -= entrego
+        restante -= entrego
+        u = v
+    if ruta[i:] not in ([], [deposito_id]):
+        return None
+    return viajes
+
+
+def costo_viajes(viajes: List[Viaje], matriz_distancias: List[List[float]], deposito_id: int) -> float:
+    """Distancia total de recorrer los viajes saliendo y volviendo al depósito."""
+    total, u = 0.0, deposito_id
+    for viaje in viajes:
+        total += matriz_distancias[u][viaje.recarga]
+        u = viaje.recarga
+        for v in viaje.paradas:
+            total += matriz_distancias[u][v]
+            u = v
+    return total + matriz_distancias[u][deposito_id]
+
+
+def componer_ruta(viajes: List[Viaje], deposito_id: int) -> Tuple[List[int], set]:
+    """Ruta (mismo formato que `bt`) y hubs usados a partir de los viajes."""
+    ruta, u = [deposito_id], deposito_id
+    for viaje in viajes:
+        if viaje.recarga != u:
+            ruta.append(viaje.recarga)
+        ruta.extend(viaje.paradas)
+        u = ruta[-1]
+    if u != deposito_id:
+        ruta.append(deposito_id)
+    return ruta, {viaje.recarga for viaje in viajes if viaje.recarga != deposito_id}
+
+
+class BusquedaLocal:
+    """Búsqueda local de primera mejora con listas de vecinos y don't-look bits."""
+
+    def __init__(self,
+                 viajes: List[Viaje],
+                 matriz_distancias: List[List[float]],
+                 deposito_id: int,
+                 nodos_recarga: set,
+                 capacidad_camion: int,
+                 cantidad_vecinos: int = 8):
+        self.viajes = viajes
+        self.D = matriz_distancias
+        self.deposito_id = deposito_id
+        self.recargas = sorted(nodos_recarga)
+        self.capacidad = capacidad_camion
+        nodos = sorted({v for viaje in viajes for v in viaje.paradas})
+        # vecinos[v]: los nodos con demanda más cercanos a v
+        self.vecinos = {v: sorted((w for w in nodos if w != v),
+                                  key=matriz_distancias[v].__getitem__)[:cantidad_vecinos]
+                        for v in nodos}
+        self.mejoras = 0
+        self._posiciones: Dict[int, List[Tuple[int, int]]] = {}
+        self._indexar()
+
+    def _indexar(self) -> None:
+        """posiciones[v] = [(viaje, índice de parada)] donde aparece v."""
+        self._posiciones = {}
+        for t, viaje in enumerate(self.viajes):
+            for i, v in enumerate(viaje.paradas):
+                self._posiciones.setdefault(v, []).append((t, i))
+
+    def _previo(self, t: int) -> int:
+        """Nodo desde el que se llega a la recarga del viaje t."""
+        return self.viajes[t - 1].paradas[-1] if t > 0 else self.deposito_id
+
+    def _secuencia(self, t: int) -> List[int]:
+        """[recarga, paradas..., recarga del viaje siguiente o depósito]."""
+        fin = self.viajes[t + 1].recarga if t + 1 < len(self.viajes) else self.deposito_id
+        return [self.viajes[t].recarga] + self.viajes[t].paradas + [fin]
+
+    # --- Movimientos: cada uno aplica la primera mejora y devuelve los viajes afectados ---
+    # (los que cambiaron y el siguiente de cada uno, cuya recarga depende de la última parada)
+
+    def _dos_opt(self, t: int) -> Optional[List[int]]:
+        D, s = self.D, self._secuencia(t)
+        for i in range(1, len(s) - 2):
+            for j in range(i + 1, len(s) - 1):
+                delta = D[s[i - 1]][s[j]] + D[s[i]][s[j + 1]] - D[s[i - 1]][s[i]] - D[s[j]][s[j + 1]]
+                if delta < -EPS:
+                    viaje = self.viajes[t]
+                    viaje.paradas[i - 1:j] = viaje.paradas[i - 1:j][::-1]
+                    viaje.cantidades[i - 1:j] = viaje.cantidades[i - 1:j][::-1]
+                    return [t, t + 1]
+        return None
+
+    def _or_opt(self, t: int) -> Optional[List[int]]:
+        D, s = self.D, self._secuencia(t)
+        for largo in (1, 2, 3):
+            for i in range(1, len(s) - largo):
+                a, primero, ultimo, b = s[i - 1], s[i], s[i + largo - 1], s[i + largo]
+                ganancia = D[a][primero] + D[ultimo][b] - D[a][b]
+                for k in range(len(s) - 1):
+                    if i - 1 <= k <= i + largo - 1:
+                        continue
+                    c, e = s[k], s[k + 1]
+                    directo = D[c][primero] + D[ultimo][e] - D[c][e]
+                    invertido = D[c][ultimo] + D[primero][e] - D[c][e]
+                    if min(directo, invertido) - ganancia < -EPS:
+                        viaje = self.viajes[t]
+                        tramo = list(zip(viaje.paradas, viaje.cantidades))
+                        segmento = tramo[i - 1:i - 1 + largo]
+                        if invertido < directo:
+                            segmento.reverse()
+                        resto = tramo[:i - 1] + tramo[i - 1 + largo:]
+                        destino = k if k < i - 1 else k - largo  # posición en `resto`
+                        resto[destino:destino] = segmento
+                        viaje.paradas = [v for v, _ in resto]
+                        viaje.cantidades = [q for _, q in resto]
+                        return [t, t + 1]
+        return None
+
+    def _recarga(self, t: int) -> Optional[List[int]]:
+        D, viaje = self.D, self.viajes[t]
+        p, f = self._previo(t), viaje.paradas[0]
+        actual = D[p][viaje.recarga] + D[viaje.recarga][f]
+        mejor = min(self.recargas, key=lambda r: D[p][r] + D[r][f])
+        if D[p][mejor] + D[mejor][f] < actual - EPS:
+            viaje.recarga = mejor
+            return [t - 1, t]
+        return None
+
+    def _entre_viajes(self, v: int) -> Optional[List[int]]:
+        D = self.D
+        for t, i in self._posiciones.get(v, []):
+            s = self._secuencia(t)
+            a, b = s[i], s[i + 2]
+            q = self.viajes[t].cantidades[i]
+            unica = len(self.viajes[t].paradas) == 1
+            if unica:  # mover la única parada elimina el viaje entero
+                p = self._previo(t)
+                r = self.viajes[t].recarga
+                ganancia = D[p][r] + D[r][v] + D[v][b] - D[p][b]
+            else:
+                ganancia = D[a][v] + D[v][b] - D[a][b]
+            for w in self.vecinos[v]:
+                for t2, j in self._posiciones.get(w, []):
+                    if t2 == t:
+                        continue
+                    viaje2 = self.viajes[t2]
+                    s2 = self._secuencia(t2)
+                    # relocate: v justo antes o justo después de w
+                    if viaje2.carga + q <= self.capacidad:
+                        for k in (j, j + 1):
+                            if unica and t2 == t - 1 and k == len(s2) - 2:
+                                continue  # esa arista desaparece al eliminar el viaje t
+                            c, e = s2[k], s2[k + 1]
+                            if D[c][v] + D[v][e] - D[c][e] - ganancia < -EPS:
+                                viaje2.paradas.insert(k, v)
+                                viaje2.cantidades.insert(k, q)
+                                del self.viajes[t].paradas[i]
+                                del self.viajes[t].cantidades[i]
+                                if unica:
+                                    del self.viajes[t]
+                                    t2 = t2 if t2 < t else t2 - 1
+                                    return [t - 1, t, t2, t2 + 1]
+                                return [t, t + 1, t2, t2 + 1]
+                    # swap: v y w intercambian lugares
+                    qw = viaje2.cantidades[j]
+                    if (self.viajes[t].carga - q + qw <= self.capacidad and
+                            viaje2.carga - qw + q <= self.capacidad):
+                        c, e = s2[j], s2[j + 2]
+                        delta = (D[a][w] + D[w][b] - D[a][v] - D[v][b] +
+                                 D[c][v] + D[v][e] - D[c][w] - D[w][e])
+                        if delta < -EPS:
+                            self.viajes[t].paradas[i], viaje2.paradas[j] = w, v
+                            self.viajes[t].cantidades[i], viaje2.cantidades[j] = qw, q
+                            return [t, t + 1, t2, t2 + 1]
+        return None
+
+    def optimizar(self, limite: float = float('inf')) -> List[Viaje]:
+        """Aplica movimientos hasta que ningún nodo activo mejore (o venza `limite`)."""
+        activos = deque(self._posiciones)
+        en_cola = set(activos)
+        revisados = 0
+        while activos:
+            revisados += 1
+            if not revisados & 63 and time.monotonic() >= limite:
+                break
+            v = activos.popleft()
+            en_cola.discard(v)
+            tocados = None
+            for t, _ in self._posiciones.get(v, []):
+                tocados = self._dos_opt(t) or self._or_opt(t) or self._recarga(t)
+                if tocados:
+                    break
+            if not tocados:
+                tocados = self._entre_viajes(v)
+            if not tocados:
+                continue  # don't-look bit: v queda inactivo hasta que cambie uno de sus viajes
+            self.mejoras += 1
+            self._indexar()
+            for t in tocados:
+                if 0 <= t < len(self.viajes):
+                    for w in self.viajes[t].paradas:
+                        if w not in en_cola:
+                            en_cola.add(w)
+                            activos.append(w)
+            if v not in en_cola and v in self._posiciones:
+                en_cola.add(v)
+                activos.append(v)
+        return self.viajes
+
+
+def mejorar_solucion(solucion: Solucion,
+                     matriz_distancias: List[List[float]],
+                     deposito_id: int,
+                     nodos_recarga: set,
+                     demanda_por_nodo: Dict[int, int],
+                     capacidad_camion: int,
+                     limite: float = float('inf')) -> bool:
+    """
+    Post-optimiza la ruta de `solucion` con búsqueda local (la modifica en el lugar).
+    Parametros:
+    - solucion: solución a mejorar (ruta en el formato de `bt`)
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
+    - demanda_por_nodo: diccionario {nodo: cantidad de paquetes a entregar}
+    - capacidad_camion: capacidad máxima del camión
+    - limite: instante (time.monotonic()) en que vence el tiempo
+    Salida:
+    - True si mejoró la solución; en `estadisticas` quedan las mejoras, el ahorro y el tiempo
+    """
+    inicio = time.perf_counter()
+    viajes = descomponer_ruta(solucion.ruta or [], deposito_id, nodos_recarga,
+                              demanda_por_nodo, capacidad_camion) if solucion.ruta else None
+    if not viajes or abs(costo_viajes(viajes, matriz_distancias, deposito_id) - solucion.distancia) > 1e-6:
+        return False  # la ruta no se pudo leer como viajes (o se leyó de otra forma)
+    busqueda = BusquedaLocal(viajes, matriz_distancias, deposito_id, nodos_recarga, capacidad_camion)
+    viajes = busqueda.optimizar(limite)
+    distancia = costo_viajes(viajes, matriz_distancias, deposito_id)
+    mejoro = distancia < solucion.distancia - EPS
+    solucion.estadisticas.update({
+        "mejoras_busqueda_local": busqueda.mejoras,
+        "ahorro_busqueda_local": solucion.distancia - distancia if mejoro else 0.0,
+        "segundos_busqueda_local": time.perf_counter() - inicio,
+    })
+    if mejoro:
+        ruta, hubs_usados = componer_ruta(viajes, deposito_id)
+        solucion.set(distancia, ruta, hubs_usados)
+    return mejoro
@@ -0,0 +1,238 @@
+from math import ceil
+from typing import List, Dict, Optional, Tuple
+
+#  Cotas inferiores admisibles para podar el backtracking
+#
+# Todas reciben el estado de un nodo del árbol (u, carga, restante, pendientes) y devuelven
+# una cota inferior de lo que falta recorrer: entregar toda la demanda pendiente y volver
+# al depósito. `pendientes` es una máscara de bits sobre `nodos_demanda` (bit i = nodo i
+# todavía tiene demanda). Como las distancias son de caminos mínimos valen la desigualdad
+# triangular, así que saltear paradas intermedias nunca alarga un recorrido.
+
+
+class ContextoCotas:
+    """Datos compartidos por las cotas, con una cache por conjunto de pendientes.
+    Cada entrada guarda (cota del MST de pendientes ∪ {depósito}, min distancia
+    pendiente-recarga, min distancia pendiente-depósito). El MST exacto (Prim O(k²)) solo se
+    calcula cuando no está en cache el conjunto "padre"; si no, la entrada se deriva en O(1)
+    del padre, que tiene un nodo más: MST(P) <= MST(P - {u}) + min_y d(u, y), así que restarle
+    al MST del padre la distancia de `u` a su pendiente más cercano sigue siendo una cota."""
+
+    def __init__(self,
+                 matriz_distancias: List[List[float]],
+                 deposito_id: int,
+                 nodos_demanda: List[int],
+                 nodos_recarga: set,
+                 capacidad_camion: int,
+                 orden_destinos: List[Optional[List[int]]],
+                 max_cache: int = 500_000):
+        self.matriz = matriz_distancias
+        self.deposito_id = deposito_id
+        self.nodos_demanda = nodos_demanda
+        self.capacidad = max(1, capacidad_camion)
+        self.orden_destinos = orden_destinos
+        self.max_cache = max_cache
+        n = len(matriz_distancias)
+        # bit_demanda[v] = 1 << i si v = nodos_demanda[i]
+        self.bit_demanda = [0] * n
+        for i, v in enumerate(nodos_demanda):
+            self.bit_demanda[v] = 1 << i
+        # distancia de cada nodo con demanda a su recarga más cercana
+        self.dist_recarga = [0.0] * n
+        for v in nodos_demanda:
+            self.dist_recarga[v] = min(matriz_distancias[r][v] for r in nodos_recarga)
+        # nodos con demanda ordenados por distancia a la recarga más cercana y al depósito
+        self.por_recarga = sorted(nodos_demanda, key=lambda v: self.dist_recarga[v])
+        self.por_deposito = sorted(nodos_demanda, key=lambda v: matriz_distancias[v][deposito_id])
+        self._cache: Dict[int, Tuple[float, float, float]] = {}
+        self.msts_exactos = 0
+
+    def mascara(self, demanda: List[int]) -> int:
+        """Máscara de pendientes a partir del vector de demanda."""
+        return sum(self.bit_demanda[v] for v in self.nodos_demanda if demanda[v] > 0)
+
+    def pendientes(self, mascara: int) -> List[int]:
+        """Nodos con demanda representados por la máscara."""
+        return [v for i, v in enumerate(self.nodos_demanda) if mascara >> i & 1]
+
+    def primero_pendiente(self, orden: List[int], mascara: int) -> Optional[int]:
+        """Primer nodo de `orden` que sigue pendiente."""
+        bit_demanda = self.bit_demanda
+        for v in orden:
+            if mascara & bit_demanda[v]:
+                return v
+        return None
+
+    def mas_cercano(self, u: int, mascara: int) -> float:
+        """min d(u, x) con x pendiente (el orden por distancia ya está precalculado)."""
+        v = self.primero_pendiente(self.orden_destinos[u], mascara)
+        return self.matriz[u][v] if v is not None else float('inf')
+
+    def derivar_mst(self, mst_padre: float, u: int, mascara: int) -> float:
+        """Cota del MST de `mascara` ∪ {depósito} a partir de la del conjunto que todavía incluía
+        a `u` (ver la docstring de la clase)."""
+        return max(0.0, mst_padre - min(self.mas_cercano(u, mascara), self.matriz[u][self.deposito_id]))
+
+    def minimos(self, mascara: int) -> Tuple[float, float]:
+        """(min distancia pendiente-recarga, min distancia pendiente-depósito), exactos."""
+        return (self.dist_recarga[self.primero_pendiente(self.por_recarga, mascara)],
+                self.matriz[self.primero_pendiente(self.por_deposito, mascara)][self.deposito_id])
+
+    def resumen_exacto(self, mascara: int) -> Tuple[float, float, float]:
+        """El resumen de `mascara` calculado desde cero (Prim), sin mirar la cache."""
+        self.msts_exactos += 1
+        return (arbol_generador_minimo(self.matriz, [self.deposito_id] + self.pendientes(mascara)),
+                *self.minimos(mascara))
+
+    def resumen(self, mascara: int, u: int) -> Tuple[float, float, float]:
+        """(cota del MST de pendientes + depósito, min distancia pendiente-recarga,
+        min distancia pendiente-depósito) para la máscara, sabiendo que se llegó desde `u`."""
+        datos = self._cache.get(mascara)
+        if datos is not None:
+            return datos
+        matriz = self.matriz
+        bit_u = self.bit_demanda[u]
+        padre = self._cache.get(mascara | bit_u) if bit_u and not mascara & bit_u else None
+        if padre is not None:
+            # u se acaba de completar: derivar del conjunto que todavía lo incluía
+            mst_padre, min_recarga, min_deposito = padre
+            mst = self.derivar_mst(mst_padre, u, mascara)
+            if self.dist_recarga[u] <= min_recarga:
+                min_recarga = self.dist_recarga[self.primero_pendiente(self.por_recarga, mascara)]
+            if matriz[u][self.deposito_id] <= min_deposito:
+                min_deposito = matriz[self.primero_pendiente(self.por_deposito, mascara)][self.deposito_id]
+            datos = (mst, min_recarga, min_deposito)
+        else:
+            datos = self.resumen_exacto(mascara)
+        if len(self._cache) >= self.max_cache:
+            self._cache.clear()
+        self._cache[mascara] = datos
+        return datos
+
+
+def arbol_generador_minimo(matriz_distancias: List[List[float]], nodos: List[int]) -> float:
+    """Peso del árbol generador mínimo (Prim O(k²)) sobre `nodos` con la métrica de caminos mínimos."""
+    if len(nodos) <= 1:
+        return 0.0
+    raiz = matriz_distancias[nodos[0]]
+    resto = nodos[1:]
+    mejor = [raiz[v] for v in resto]
+    total = 0.0
+    while resto:
+        i = min(range(len(resto)), key=mejor.__getitem__)
+        total += mejor[i]
+        v = resto[i]
+        resto[i] = resto[-1]
+        mejor[i] = mejor[-1]
+        resto.pop()
+        mejor.pop()
+        fila_v = matriz_distancias[v]
+        for j, w in enumerate(resto):
+            if fila_v[w] < mejor[j]:
+                mejor[j] = fila_v[w]
+    return total
+
+
+class CotaMST:
+    """min d(u, x) con x pendiente + MST(pendientes ∪ {depósito}) (o su cota incremental).
+    El resto de la ruta es un camino u -> x1 -> ... -> depósito que recorre todos los
+    pendientes; sin el primer tramo es un árbol generador de pendientes ∪ {depósito}."""
+    nombre = "mst"
+
+    def __init__(self, contexto: ContextoCotas):
+        self.ctx = contexto
+
+    def __call__(self, u: int, carga: int, restante: int, pendientes: int) -> float:
+        if not pendientes:
+            return self.ctx.matriz[u][self.ctx.deposito_id]
+        mst, _, _ = self.ctx.resumen(pendientes, u)
+        return self.ctx.mas_cercano(u, pendientes) + mst
+
+    def valor(self, u: int, carga: int, restante: int, pendientes: int,
+              datos: Tuple[float, float, float]) -> float:
+        """La misma cota con el resumen de `pendientes` ya calculado (sin pasar por la cache)."""
+        if not pendientes:
+            return self.ctx.matriz[u][self.ctx.deposito_id]
+        return self.ctx.mas_cercano(u, pendientes) + datos[0]
+
+
+class CotaRecargas:
+    """Cota por cantidad de recargas: faltan R = ceil(paquetes sin cargar / capacidad) recargas
+    más, y cada una obliga a ir de un pendiente a una recarga y de ahí a otro pendiente."""
+    nombre = "recargas"
+
+    def __init__(self, contexto: ContextoCotas):
+        self.ctx = contexto
+
+    def __call__(self, u: int, carga: int, restante: int, pendientes: int) -> float:
+        ctx = self.ctx
+        if not pendientes:
+            return ctx.matriz[u][ctx.deposito_id]
+        if carga > 0:
+            recargas = ceil((restante - carga) / ctx.capacidad)
+        else:
+            recargas = ceil(restante / ctx.capacidad) - 1
+        _, min_recarga, min_deposito = ctx.resumen(pendientes, u)
+        return ctx.mas_cercano(u, pendientes) + 2 * recargas * min_recarga + min_deposito
+
+    def valor(self, u: int, carga: int, restante: int, pendientes: int,
+              datos: Tuple[float, float, float]) -> float:
+        """La misma cota con el resumen de `pendientes` ya calculado (sin pasar por la cache)."""
+        ctx = self.ctx
+        if not pendientes:
+            return ctx.matriz[u][ctx.deposito_id]
+        if carga > 0:
+            recargas = ceil((restante - carga) / ctx.capacidad)
+        else:
+            recargas = ceil(restante / ctx.capacidad) - 1
+        _, min_recarga, min_deposito = datos
+        return ctx.mas_cercano(u, pendientes) + 2 * recargas * min_recarga + min_deposito
+
+
+# Cotas disponibles, por nombre
+COTAS = {
+    CotaRecargas.nombre: CotaRecargas,
+    CotaMST.nombre: CotaMST,
+}
+
+
+class CotasInferiores:
+    """Conjunto de cotas enchufables que usa el backtracking, con estadísticas de poda por cota."""
+
+    def __init__(self, nombres: List[str], contexto: ContextoCotas):
+        desconocidas = [nombre for nombre in nombres if nombre not in COTAS]
+        if desconocidas:
+            raise ValueError(f"Cotas desconocidas: {', '.join(desconocidas)}")
+        self.contexto = contexto
+        self.cotas = [COTAS[nombre](contexto) for nombre in nombres]
+        self.evaluaciones = {nombre: 0 for nombre in nombres}
+        self.podas = {nombre: 0 for nombre in nombres}
+
+    def podar(self, u: int, carga: int, restante: int, pendientes: int, dist: float, mejor: float) -> bool:
+        """True si alguna cota demuestra que desde este nodo no se puede mejorar `mejor`.
+        Se evalúan en orden y la poda se le atribuye a la primera que la logra."""
+        for cota in self.cotas:
+            self.evaluaciones[cota.nombre] += 1
+            if dist + cota(u, carga, restante, pendientes) >= mejor:
+                self.podas[cota.nombre] += 1
+                return True
+        return False
+
+    def cota_raiz(self, u: int, carga: int, restante: int, pendientes: int) -> float:
+        """La mejor (mayor) de las cotas en un nodo, sin contar estadísticas."""
+        return max((cota(u, carga, restante, pendientes) for cota in self.cotas), default=0.0)
+
+    def cota_con_resumen(self, u: int, carga: int, restante: int, pendientes: int,
+                         datos: Tuple[float, float, float]) -> float:
+        """Como cota_raiz, pero con el resumen de `pendientes` que trae el llamador: el valor no
+        depende de lo que haya en la cache del contexto (lo usa la búsqueda en haz)."""
+        return max((cota.valor(u, carga, restante, pendientes, datos) for cota in self.cotas), default=0.0)
+
+    def estadisticas(self) -> Dict[str, float]:
+        """Evaluaciones y podas de cada cota."""
+        stats: Dict[str, float] = {}
+        for nombre in self.evaluaciones:
+            stats[f"evaluaciones_cota_{nombre}"] = self.evaluaciones[nombre]
+            stats[f"podas_cota_{nombre}"] = self.podas[nombre]
+        stats["msts_exactos"] = self.contexto.msts_exactos
+        return stats
@@ -0,0 +1,175 @@
+import time
+from math import prod
+from typing import List, Dict, Optional, Tuple
+
+from funciones import Solucion
+
+#  Solver exacto por programación dinámica (estilo Held-Karp) para instancias chicas
+#
+# Recorre el mismo modelo que el backtracking (cargar solo con el camión vacío, tomando
+# min(capacidad, restante); entregar min(carga, demanda) en cada destino; volver al depósito),
+# pero memoizando el costo mínimo para terminar desde cada estado (demanda pendiente, nodo,
+# carga). La demanda pendiente se codifica en base mixta: el nodo i aporta d_i * peso_i con
+# 0 <= d_i <= demanda inicial. Todo se calcula sobre la submatriz de distancias de los
+# terminales (depósito, hubs y nodos con demanda).
+#
+# Cada transición entrega al menos un paquete o pasa de vacío a cargado, así que el grafo de
+# estados es acíclico y el recorrido en profundidad termina: el valor de la raíz es el óptimo
+# del modelo, demostrado por enumeración completa de los estados alcanzables. El recorrido usa
+# una pila explícita porque su profundidad crece con paquetes / capacidad.
+
+# Tope de estados (demanda x nodo x carga) para considerar tratable una instancia
+MAX_ESTADOS_EXACTO = 2_000_000
+
+
+class TiempoAgotado(Exception):
+    """Venció el tiempo antes de terminar la programación dinámica."""
+
+
+def terminales(deposito_id: int, hubs: List[int], demanda_por_nodo: Dict[int, int]) -> List[int]:
+    """Depósito, hubs y nodos con demanda, sin repetidos y en ese orden."""
+    return list(dict.fromkeys([deposito_id] + list(hubs) +
+                              [v for v, cnt in demanda_por_nodo.items() if cnt > 0]))
+
+
+def estados_exacto(hubs: List[int], deposito_id: int, demanda_por_nodo: Dict[int, int],
+                   capacidad_camion: int) -> int:
+    """Cantidad máxima de estados que puede visitar `resolver_exacto`."""
+    combinaciones = prod(cnt + 1 for cnt in demanda_por_nodo.values() if cnt > 0)
+    return combinaciones * len(terminales(deposito_id, hubs, demanda_por_nodo)) * (capacidad_camion + 1)
+
+
+def resolver_exacto(matriz_distancias: List[List[float]],
+                    deposito_id: int,
+                    hubs: List[int],
+                    demanda_por_nodo: Dict[int, int],
+                    capacidad_camion: int,
+                    limite: float = float('inf')) -> Optional[Solucion]:
+    """
+    Resuelve el problema en forma exacta con programación dinámica sobre los terminales.
+    Parametros:
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - hubs: lista de nodos que son hubs
+    - demanda_por_nodo: diccionario {nodo: cantidad de paquetes a entregar}
+    - capacidad_camion: capacidad máxima del camión
+    - limite: instante (time.monotonic()) en que vence el tiempo; se revisa cada 1024 estados
+    Salida:
+    - solución óptima (objeto Solucion) con `cota_inferior` igual a su distancia; en
+      `estadisticas` quedan los estados evaluados y el tiempo. None si venció el tiempo
+    """
+    inicio = time.perf_counter()
+    INF = float('inf')
+    nodos = terminales(deposito_id, hubs, demanda_por_nodo)
+    k = len(nodos)
+    D = [[matriz_distancias[a][b] for b in nodos] for a in nodos]  # submatriz de terminales
+    dep = 0
+    es_recarga = [i == dep or v in hubs for i, v in enumerate(nodos)]
+    recargas = [i for i in range(k) if es_recarga[i]]
+    demanda = [demanda_por_nodo.get(v, 0) for v in nodos]
+    con_demanda = [i for i in range(k) if demanda[i] > 0]
+    peso = [0] * k
+    base = 1
+    for i in con_demanda:
+        peso[i] = base
+        base *= demanda[i] + 1
+    cap = max(1, capacidad_camion)
+
+    memo: Dict[int, float] = {}
+    # eleccion[clave] = índice local del siguiente nodo (-1 = volver al depósito)
+    eleccion: Dict[int, int] = {}
+
+    def clave_de(codigo: int, u: int, carga: int) -> int:
+        return (codigo * k + u) * (cap + 1) + carga
+
+    def transiciones(codigo: int, u: int, carga: int, restante: int) -> List[Tuple[float, int, Tuple[int, int, int, int]]]:
+        """(tramo, siguiente nodo, estado hijo) de cada decisión, en el orden del backtracking."""
+        if restante == 0:
+            return []
+        if carga == 0:
+            para_cargar = min(cap, restante)
+            return [(D[u][r], r, (codigo, r, para_cargar, restante)) for r in recargas if D[u][r] != INF]
+        hijos = []
+        fila_u = D[u]
+        for v in con_demanda:
+            cnt = codigo // peso[v] % (demanda[v] + 1)  # demanda pendiente de v en este estado
+            if cnt == 0 or fila_u[v] == INF:
+                continue
+            entrego = min(carga, cnt)
+            hijos.append((fila_u[v], v, (codigo - entrego * peso[v], v, carga - entrego, restante - entrego)))
+        return hijos
+
+    def marco(codigo: int, u: int, carga: int, restante: int) -> list:
+        """Marco de la pila: [clave, transiciones, próxima transición, mejor costo, mejor siguiente]."""
+        return [clave_de(codigo, u, carga), transiciones(codigo, u, carga, restante), 0,
+                D[u][dep] if restante == 0 else INF, -1]
+
+    def costo(codigo: int, u: int, carga: int, restante: int) -> float:
+        """Costo mínimo para terminar desde el estado. Usa una pila explícita: la profundidad
+        crece con paquetes / capacidad y la recursión de Python no alcanza."""
+        raiz = clave_de(codigo, u, carga)
+        if raiz in memo:
+            return memo[raiz]
+        pila = [marco(codigo, u, carga, restante)]
+        while pila:
+            actual = pila[-1]
+            hijos = actual[1]
+            pendiente = None
+            while actual[2] < len(hijos):
+                tramo, v, hijo = hijos[actual[2]]
+                valor = memo.get(clave_de(hijo[0], hijo[1], hijo[2]))
+                if valor is None:
+                    pendiente = hijo
+                    break
+                if tramo + valor < actual[3]:
+                    actual[3], actual[4] = tramo + valor, v
+                actual[2] += 1
+            if pendiente is None:
+                memo[actual[0]] = actual[3]
+                eleccion[actual[0]] = actual[4]
+                pila.pop()
+                continue
+            if not len(memo) & 1023 and time.monotonic() >= limite:
+                raise TiempoAgotado
+            pila.append(marco(*pendiente))
+        return memo[raiz]
+
+    total = sum(demanda)
+    try:
+        optimo = costo(base - 1, dep, 0, total)
+    except TiempoAgotado:
+        return None
+
+    # Reconstrucción: seguir las elecciones desde la raíz (mismo formato de ruta que `bt`)
+    ruta = [deposito_id]
+    hubs_usados = set()
+    codigo, u, carga, restante = base - 1, dep, 0, total
+    while optimo < INF:
+        siguiente = eleccion[(codigo * k + u) * (cap + 1) + carga]
+        if siguiente < 0:
+            if u != dep:
+                ruta.append(deposito_id)
+            break
+        if carga == 0:
+            if siguiente != u:
+                ruta.append(nodos[siguiente])
+            if siguiente != dep:
+                hubs_usados.add(nodos[siguiente])
+            carga = min(cap, restante)
+        else:
+            ruta.append(nodos[siguiente])
+            entrego = min(carga, demanda[siguiente])
+            demanda[siguiente] -= entrego
+            codigo -= entrego * peso[siguiente]
+            carga -= entrego
+            restante -= entrego
+        u = siguiente
+
+    s = Solucion()
+    s.set(optimo, ruta, hubs_usados)
+    s.cota_inferior = optimo
+    s.estadisticas.update({
+        "estados_exacto": len(memo),
+        "segundos_exacto": time.perf_counter() - inicio,
+    })
+    return s
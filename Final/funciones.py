@@ -1,6 +1,24 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Tuple, Optional
+from typing import Any, Callable, Iterator, List, Dict, Tuple, Optional, Union
 from math import ceil, sqrt
+import heapq
+import queue
+import random
+import threading
+import time
+import mmap
+import os
+import struct
+from array import array
+from multiprocessing import shared_memory
+
+from cotas import CotasInferiores, ContextoCotas
+from transposicion import TablaTransposicion
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: solo lo usa el motor vectorizado
+    np = None
 
 #  Modelos / Dataclasses
 
@@ -12,12 +30,37 @@ class Solucion:
     ruta: List[int] = None
     # conjunto de hubs realmente usados
     hubs_usados: set = field(default_factory=set)
+    # métricas de la búsqueda (llamadas, tiempos, etc.)
+    estadisticas: Dict[str, float] = field(default_factory=dict)
+    # cota inferior demostrada del óptimo (igual a `distancia` si la solución es óptima); vale
+    # dentro del modelo de carga del backtracking (sale lleno y recarga solo vacío): las rutas
+    # de split, ahorros o la búsqueda local salen de ese modelo y en principio podrían mejorarla
+    cota_inferior: float = 0.0
+    # estrategia del portafolio que encontró la solución (None fuera del modo portafolio)
+    estrategia: Optional[str] = None
 
-    def set(self, dist: float, ruta: List[int], hubs_usados: Optional[set] = None) -> None:
-        """Actualiza la mejor solución con nueva distancia, ruta y hubs usados."""
+    def set(self, dist: float, ruta: List[int], hubs_usados: Union[set, int, None] = None,
+            hubs_indexados: Optional[List[int]] = None) -> None:
+        """Actualiza la mejor solución con nueva distancia, ruta y hubs usados.
+        `hubs_usados` puede ser un conjunto o una máscara de bits sobre `hubs_indexados`
+        (el bit i representa a hubs_indexados[i]); la máscara se decodifica acá."""
         self.distancia = dist
         self.ruta = ruta.copy()
-        self.hubs_usados = hubs_usados.copy() if hubs_usados else set()
+        if isinstance(hubs_usados, int):
+            self.hubs_usados = {h for i, h in enumerate(hubs_indexados or []) if hubs_usados >> i & 1}
+        else:
+            self.hubs_usados = hubs_usados.copy() if hubs_usados else set()
+
+
+@dataclass
+class Incumbente:
+    """Nueva mejor solución encontrada durante la búsqueda (ver `al_mejorar` en resolver_problema)"""
+    distancia: float
+    ruta: List[int]
+    hubs_usados: set
+    # momento en que se encontró: hora (time.time()) y segundos desde el inicio de la resolución
+    instante: float
+    segundos: float
 
 
 @dataclass
@@ -29,6 +72,77 @@ class EstadoBT:
     stop: bool = False
     max_llamadas_sin_mejora: int = 0
     intervalo_report: int = 0
+    # hubs de la rama como máscara de bits: bits_hub[h] = 1 << i, con hubs_indexados[i] = h
+    bits_hub: Dict[int, int] = field(default_factory=dict)
+    hubs_indexados: List[int] = field(default_factory=list)
+    # orden_destinos[u]: nodos con demanda ordenados por distancia desde u (None si u no es terminal)
+    orden_destinos: List[Optional[List[int]]] = field(default_factory=list)
+    # ramificar solo entre los primeros `candidatos` destinos pendientes de orden_destinos[u]
+    # (los más cercanos; 0 = todos)
+    candidatos: int = 0
+    # pendientes como máscara de bits: bit_demanda[v] es el bit del nodo v (0 si no tiene demanda)
+    bit_demanda: List[int] = field(default_factory=list)
+    # cotas inferiores para podar (None = solo poda por distancia)
+    cotas: Optional[CotasInferiores] = None
+    # tabla de transposición (None = sin detección de estados repetidos)
+    transposicion: Optional[TablaTransposicion] = None
+    # mejor distancia global compartida entre procesos (multiprocessing.Value('d')); solo la
+    # usa bt_iterativo: la relee cada 1024 llamadas para podar y publica sus mejoras
+    incumbente: Optional[Any] = None
+    # instante (time.monotonic()) en que vence el tiempo; se revisa cada 1024 llamadas
+    limite: float = float('inf')
+    vencido: bool = False
+    # se llama con `mejor` cada vez que mejora (None = nadie escucha)
+    al_mejorar: Optional[Callable[[Solucion], None]] = None
+
+
+#  Grafo disperso en formato CSR (compressed sparse row)
+class GrafoCSR:
+    """Lista de adyacencia compacta de un grafo no dirigido: los vecinos de `u` son
+    destinos[offsets[u]:offsets[u + 1]], con sus pesos en la misma posición de `pesos`."""
+
+    def __init__(self, offsets: array, destinos: array, pesos: array):
+        self.offsets = offsets
+        self.destinos = destinos
+        self.pesos = pesos
+
+    @property
+    def n(self) -> int:
+        """Cantidad de nodos."""
+        return len(self.offsets) - 1
+
+    @classmethod
+    def desde_aristas(cls, n: int, aristas: Dict[Tuple[int, int], float]) -> "GrafoCSR":
+        """Arma el CSR a partir de las aristas {(u, v): peso} (cada una se agrega en ambos sentidos).
+        Peso 0 significa "sin arista", igual que en la matriz de adyacencia."""
+        entradas = sorted((a, b, peso) for (u, v), peso in aristas.items()
+                          if peso != 0 and u != v for a, b in ((u, v), (v, u)))
+        offsets = array('i', [0]) * (n + 1)
+        for a, _, _ in entradas:
+            offsets[a + 1] += 1
+        for u in range(n):
+            offsets[u + 1] += offsets[u]
+        destinos = array('i', (b for _, b, _ in entradas))
+        pesos = array('d', (peso for _, _, peso in entradas))
+        return cls(offsets, destinos, pesos)
+
+    def a_matriz_densa(self) -> List[List[float]]:
+        """Matriz de adyacencia n x n (0 = sin arista), para el código que todavía la usa."""
+        n = self.n
+        matriz = [[0.0] * n for _ in range(n)]
+        for u in range(n):
+            fila = matriz[u]
+            for idx in range(self.offsets[u], self.offsets[u + 1]):
+                fila[self.destinos[idx]] = self.pesos[idx]
+        return matriz
+
+    def a_matriz_numpy(self) -> "np.ndarray":
+        """Matriz de adyacencia n x n en numpy, sin pasar por listas de Python."""
+        n = self.n
+        matriz = np.zeros((n, n), dtype=np.float64)
+        filas = np.repeat(np.arange(n), np.diff(np.frombuffer(self.offsets, dtype=np.int32)))
+        matriz[filas, np.frombuffer(self.destinos, dtype=np.int32)] = np.frombuffer(self.pesos, dtype=np.float64)
+        return matriz
 
 
 #  Floyd–Warshall con reconstrucción de caminos
@@ -53,13 +167,13 @@ def reconstruir_camino(next_node: List[List[Optional[int]]], origen: int, destin
     return path
 
 
-def floydWarshallConCaminos(matrizDeAdyacencia: List[List[float]]) -> Tuple[List[List[float]], List[List[List[int]]]]:
-    """Floyd-Warshall que devuelve matriz de distancias y caminos mínimos (listas de nodos).
+def floydWarshallSiguientes(matrizDeAdyacencia: List[List[float]]) -> Tuple[List[List[float]], List[List[Optional[int]]]]:
+    """Floyd-Warshall en Python puro, sin materializar los caminos.
     Parametros:
     - matrizDeAdyacencia: matriz de adyacencia con pesos (0 = sin arista).
     Salida:
     - distancia: matriz de distancias mínimas entre nodos
-    - caminos: matriz de caminos mínimos entre nodos (listas de nodos)
+    - next_node: matriz de nodos siguientes en el camino mínimo (None = sin camino)
     """
     n = len(matrizDeAdyacencia)
     distancia = [[float('inf')] * n for _ in range(n)]
@@ -87,6 +201,19 @@ def floydWarshallConCaminos(matrizDeAdyacencia: List[List[float]]) -> Tuple[List
                 if nd < distancia[i][j]:
                     distancia[i][j] = nd
                     next_node[i][j] = next_node[i][k]
+    return distancia, next_node
+
+
+def floydWarshallConCaminos(matrizDeAdyacencia: List[List[float]]) -> Tuple[List[List[float]], List[List[List[int]]]]:
+    """Floyd-Warshall que devuelve matriz de distancias y caminos mínimos (listas de nodos).
+    Parametros:
+    - matrizDeAdyacencia: matriz de adyacencia con pesos (0 = sin arista).
+    Salida:
+    - distancia: matriz de distancias mínimas entre nodos
+    - caminos: matriz de caminos mínimos entre nodos (listas de nodos)
+    """
+    n = len(matrizDeAdyacencia)
+    distancia, next_node = floydWarshallSiguientes(matrizDeAdyacencia)
 
     caminos: List[List[List[int]]] = [[[] for _ in range(n)] for _ in range(n)]
     for i in range(n):
@@ -96,6 +223,331 @@ def floydWarshallConCaminos(matrizDeAdyacencia: List[List[float]]) -> Tuple[List
     return distancia, caminos
 
 
+def floydWarshallMatricesNumpy(matrizDeAdyacencia: List[List[float]]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Floyd-Warshall vectorizado: cada relajación por `k` es una sola operación de arrays.
+    Parametros:
+    - matrizDeAdyacencia: matriz de adyacencia con pesos (0 = sin arista).
+    Salida:
+    - distancia: matriz float64 (n x n) de distancias mínimas (inf = inalcanzable)
+    - next_node: matriz int32 (n x n) con el siguiente nodo del camino mínimo (-1 = sin camino)
+    """
+    if np is None:
+        raise ValueError("El motor 'numpy' requiere tener numpy instalado.")
+    adyacencia = np.asarray(matrizDeAdyacencia, dtype=np.float64)
+    n = adyacencia.shape[0]
+    hay_arista = adyacencia != 0
+    distancia = np.where(hay_arista, adyacencia, np.inf)
+    next_node = np.where(hay_arista, np.arange(n, dtype=np.int32)[None, :], -1).astype(np.int32)
+    diagonal = np.arange(n)
+    distancia[diagonal, diagonal] = 0.0
+    next_node[diagonal, diagonal] = diagonal
+
+    candidato = np.empty_like(distancia)
+    mejora = np.empty((n, n), dtype=bool)
+    for k in range(n):
+        # d[i][k] + d[k][j] para todo (i, j); inf + x sigue siendo inf, así que no mejora
+        np.add(distancia[:, k, None], distancia[None, k, :], out=candidato)
+        np.less(candidato, distancia, out=mejora)
+        np.copyto(distancia, candidato, where=mejora)
+        np.copyto(next_node, np.broadcast_to(next_node[:, k, None], (n, n)), where=mejora)
+    return distancia, next_node
+
+
+#  Oráculos de caminos: reconstruyen un tramo solo cuando se lo pide
+class OraculoCaminos:
+    """Guarda solo la matriz de nodos siguientes (aplanada, int32; -1 = sin camino)
+    y reconstruye cada camino mínimo a demanda, en lugar de la matriz n x n de listas."""
+
+    def __init__(self, siguiente, n: int):
+        self.siguiente = siguiente
+        self.n = n
+
+    @classmethod
+    def desde_matriz(cls, next_node: List[List[Optional[int]]]) -> "OraculoCaminos":
+        """Compacta una matriz `next_node` (con None) a un array('i') plano."""
+        siguiente = array('i', (-1 if v is None else v for fila in next_node for v in fila))
+        return cls(siguiente, len(next_node))
+
+    def camino(self, origen: int, destino: int) -> List[int]:
+        """Camino mínimo desde `origen` hasta `destino` ([] si no hay camino)."""
+        siguiente = self.siguiente
+        n = self.n
+        if siguiente[origen * n + destino] < 0:
+            return []
+        path = [origen]
+        u = origen
+        while u != destino:
+            u = int(siguiente[u * n + destino])
+            if u < 0:
+                return []
+            path.append(u)
+        return path
+
+
+class OraculoPredecesores:
+    """Oráculo de caminos armado con los árboles de predecesores de Dijkstra (uno por terminal)."""
+
+    def __init__(self, predecesores: Dict[int, List[Optional[int]]]):
+        self.predecesores = {t: array('i', (-1 if v is None else v for v in pred))
+                             for t, pred in predecesores.items()}
+
+    def camino(self, origen: int, destino: int) -> List[int]:
+        """Camino mínimo desde `origen` hasta `destino` ([] si no hay camino)."""
+        if origen in self.predecesores:
+            pred, desde, hasta, invertir = self.predecesores[origen], origen, destino, True
+        elif destino in self.predecesores:
+            # el grafo es no dirigido: se recorre el árbol del destino y no se invierte
+            pred, desde, hasta, invertir = self.predecesores[destino], destino, origen, False
+        else:
+            return []
+        path = [hasta]
+        v = hasta
+        while v != desde:
+            v = pred[v]
+            if v < 0:
+                return []
+            path.append(v)
+        if invertir:
+            path.reverse()
+        return path
+
+
+def floydWarshallConOraculo(grafo: GrafoCSR,
+                            motor: str = "python") -> Tuple[List[List[float]], OraculoCaminos]:
+    """Floyd-Warshall que devuelve distancias y un oráculo de caminos (sin armar los n² caminos).
+    Parametros:
+    - grafo: grafo en formato CSR
+    - motor: "python" o "numpy"
+    Salida:
+    - distancia: matriz de distancias mínimas entre nodos
+    - oraculo: OraculoCaminos para reconstruir tramos a demanda
+    """
+    if motor == "numpy":
+        if np is None:
+            raise ValueError("El motor 'numpy' requiere tener numpy instalado.")
+        dist_np, next_np = floydWarshallMatricesNumpy(grafo.a_matriz_numpy())
+        return dist_np.tolist(), OraculoCaminos(next_np.ravel(), len(next_np))
+    if motor != "python":
+        raise ValueError(f"Motor de Floyd-Warshall desconocido: {motor}")
+    distancia, next_node = floydWarshallSiguientes(grafo.a_matriz_densa())
+    return distancia, OraculoCaminos.desde_matriz(next_node)
+
+
+#  Matriz de distancias compartida entre procesos (archivo mmap o shared_memory)
+class FilasCompartidas(list):
+    """Filas de una MatrizCompartida: se indexan como la matriz de listas y recuerdan de qué
+    bloque vienen, para que el código que reparte trabajo entre procesos lo reutilice."""
+
+    def __init__(self, filas, compartida: "MatrizCompartida"):
+        super().__init__(filas)
+        self.compartida = compartida
+
+
+class MatrizCompartida:
+    """Distancias (float64) y siguientes (int32) de Floyd en un bloque de memoria compartida.
+    Layout: encabezado (magic, n, huella de la instancia) + n² distancias + n² siguientes.
+    `filas[u][v]` lee la distancia sin copiar nada, así que varios procesos solver
+    pueden usar la misma matriz sin que crezca la memoria de cada uno."""
+
+    MAGIC = b"DIST"
+    ENCABEZADO = struct.Struct("<4s4xq32s")
+
+    def __init__(self, buffer, shm: Optional[shared_memory.SharedMemory] = None,
+                 archivo_mmap: Optional[mmap.mmap] = None, ruta: Optional[str] = None):
+        magic, n, huella = self.ENCABEZADO.unpack_from(buffer, 0)
+        if magic != self.MAGIC:
+            raise ValueError("El bloque no contiene una matriz de distancias.")
+        if len(buffer) < self.tamanio(n):
+            raise ValueError("El bloque de la matriz de distancias está incompleto.")
+        self.n = n
+        self.huella = huella
+        self._shm = shm
+        self._mmap = archivo_mmap
+        self._ruta = ruta
+        self._buffer = memoryview(buffer)
+        inicio = self.ENCABEZADO.size
+        fin_dist = inicio + 8 * n * n
+        distancias = self._buffer[inicio:fin_dist].cast('d')
+        self.siguiente = self._buffer[fin_dist:fin_dist + 4 * n * n].cast('i')
+        self.filas: List[memoryview] = FilasCompartidas((distancias[u * n:(u + 1) * n] for u in range(n)), self)
+
+    @classmethod
+    def tamanio(cls, n: int) -> int:
+        """Bytes necesarios para una matriz de n nodos."""
+        return cls.ENCABEZADO.size + 12 * n * n
+
+    @classmethod
+    def _escribir(cls, buffer, distancia: List[Optional[List[float]]], siguiente, huella: bytes) -> None:
+        n = len(distancia)
+        cls.ENCABEZADO.pack_into(buffer, 0, cls.MAGIC, n, huella)
+        inicio = cls.ENCABEZADO.size
+        sin_calcular = None
+        for u, fila in enumerate(distancia):
+            desde = inicio + 8 * n * u
+            if fila is None:
+                # fila no calculada (Dijkstra solo desde terminales): queda inalcanzable
+                if sin_calcular is None:
+                    sin_calcular = array('d', [float('inf')] * n).tobytes()
+                buffer[desde:desde + 8 * n] = sin_calcular
+            else:
+                buffer[desde:desde + 8 * n] = array('d', fila).tobytes()
+        desde = inicio + 8 * n * n
+        if siguiente is not None:  # sin siguientes queda en cero (solo distancias)
+            buffer[desde:desde + 4 * n * n] = bytes(memoryview(siguiente).cast('B'))
+
+    @classmethod
+    def crear_shm(cls, distancia: List[Optional[List[float]]], oraculo: Optional["OraculoCaminos"] = None,
+                  huella: bytes = b"") -> "MatrizCompartida":
+        """Copia la matriz a un bloque shared_memory nuevo (liberarlo con `liberar()`).
+        Sin oráculo solo se comparten las distancias; las filas en None (las que no calcula
+        `dijkstraTerminales`) quedan en inf."""
+        shm = shared_memory.SharedMemory(create=True, size=cls.tamanio(len(distancia)))
+        try:
+            cls._escribir(shm.buf, distancia, oraculo.siguiente if oraculo is not None else None, huella)
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+        return cls(shm.buf, shm=shm)
+
+    @classmethod
+    def adjuntar_shm(cls, nombre: str, desregistrar: bool = True) -> "MatrizCompartida":
+        """Se adjunta (sin copiar) a un bloque shared_memory creado por otro proceso.
+        Con `desregistrar=False` no se toca el resource_tracker: es lo correcto para procesos
+        hijos del creador (p. ej. un Pool), que comparten su tracker."""
+        shm = shared_memory.SharedMemory(name=nombre)
+        if desregistrar:
+            try:
+                # Solo el creador debe borrar el bloque; sin esto el resource_tracker
+                # lo eliminaría al terminar este proceso
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except (ImportError, AttributeError, KeyError):
+                pass
+        return cls(shm.buf, shm=shm)
+
+    @classmethod
+    def crear_archivo(cls, ruta: str, distancia: List[List[float]], oraculo: "OraculoCaminos",
+                      huella: bytes = b"") -> None:
+        """Escribe la matriz en un archivo que luego se abre con `abrir_archivo`."""
+        n = len(distancia)
+        temporal = ruta + ".tmp"
+        with open(temporal, 'w+b') as archivo:
+            archivo.truncate(cls.tamanio(n))
+            with mmap.mmap(archivo.fileno(), cls.tamanio(n)) as buffer:
+                cls._escribir(buffer, distancia, oraculo.siguiente, huella)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def abrir_archivo(cls, ruta: str) -> "MatrizCompartida":
+        """Mapea el archivo en memoria (solo lectura): todos los procesos comparten las páginas."""
+        with open(ruta, 'rb') as archivo:
+            buffer = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, archivo_mmap=buffer, ruta=ruta)
+
+    @classmethod
+    def compartir(cls, distancia: List[Optional[List[float]]]) -> Tuple["MatrizCompartida", bool]:
+        """Bloque compartido con la matriz para repartirla entre procesos.
+        Si `distancia` ya son las filas de una MatrizCompartida (p. ej. el archivo de
+        --distancias-mmap) se reutiliza ese bloque; si no, se copia a un shared_memory nuevo.
+        Salida:
+        - (matriz compartida, si se creó acá); solo en ese caso hay que liberarla con `liberar()`
+        """
+        existente = getattr(distancia, "compartida", None)
+        if existente is not None:
+            return existente, False
+        return cls.crear_shm(distancia), True
+
+    @classmethod
+    def adjuntar(cls, referencia: Tuple[str, str]) -> "MatrizCompartida":
+        """Se adjunta desde un proceso hijo del creador al bloque de `referencia`."""
+        tipo, nombre = referencia
+        if tipo == "archivo":
+            return cls.abrir_archivo(nombre)
+        return cls.adjuntar_shm(nombre, desregistrar=False)
+
+    @property
+    def referencia(self) -> Tuple[str, str]:
+        """("shm", nombre) o ("archivo", ruta): lo que otro proceso necesita para `adjuntar`."""
+        if self._shm is not None:
+            return "shm", self._shm.name
+        if self._ruta is not None:
+            return "archivo", self._ruta
+        raise ValueError("La matriz no está en un bloque que se pueda compartir.")
+
+    def oraculo(self) -> OraculoCaminos:
+        """Oráculo de caminos que lee los siguientes directamente del bloque compartido."""
+        return OraculoCaminos(self.siguiente, self.n)
+
+    def cerrar(self) -> None:
+        """Suelta las vistas y cierra el bloque en este proceso."""
+        self.filas = []
+        self.siguiente.release()
+        self._buffer.release()
+        if self._shm is not None:
+            self._shm.close()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def liberar(self) -> None:
+        """Cierra y borra el bloque shared_memory (solo debe llamarlo quien lo creó)."""
+        shm = self._shm
+        self.cerrar()
+        if shm is not None:
+            shm.unlink()
+
+
+#  Dijkstra desde terminales (depósito, hubs y nodos con demanda)
+def dijkstra(grafo: GrafoCSR, origen: int) -> Tuple[List[float], List[Optional[int]]]:
+    """Dijkstra con heap binario desde `origen`, recorriendo directamente el CSR.
+    Parametros:
+    - grafo: grafo en formato CSR
+    - origen: nodo de inicio
+    Salida:
+    - distancia: distancias mínimas desde `origen` a cada nodo (inf = inalcanzable)
+    - predecesor: nodo anterior en el camino mínimo desde `origen` (None si no hay)
+    """
+    n = grafo.n
+    offsets, destinos, pesos = grafo.offsets, grafo.destinos, grafo.pesos
+    distancia = [float('inf')] * n
+    predecesor: List[Optional[int]] = [None] * n
+    distancia[origen] = 0.0
+    heap = [(0.0, origen)]
+    while heap:
+        d_u, u = heapq.heappop(heap)
+        if d_u > distancia[u]:
+            continue  # entrada vieja del heap
+        for idx in range(offsets[u], offsets[u + 1]):
+            v = destinos[idx]
+            nd = d_u + pesos[idx]
+            if nd < distancia[v]:
+                distancia[v] = nd
+                predecesor[v] = u
+                heapq.heappush(heap, (nd, v))
+    return distancia, predecesor
+
+
+def dijkstraTerminales(grafo: GrafoCSR,
+                       terminales: List[int]) -> Tuple[List[Optional[List[float]]], Dict[int, List[Optional[int]]]]:
+    """Caminos mínimos solo desde los terminales: O(k·m log n) en lugar del O(n³) de Floyd.
+    Parametros:
+    - grafo: grafo en formato CSR
+    - terminales: nodos desde los que se necesitan distancias (depósito, hubs, demanda)
+    Salida:
+    - distancia: tabla n x n donde solo las filas de los terminales están calculadas
+      (las demás quedan en None); `distancia[t][v]` coincide con Floyd salvo por el redondeo
+      de punto flotante (difieren en unos ulps: no comparar los dos motores con ==)
+    - predecesores: {terminal: árbol de predecesores de Dijkstra desde ese terminal}
+    """
+    n = grafo.n
+    distancia: List[Optional[List[float]]] = [None] * n
+    predecesores: Dict[int, List[Optional[int]]] = {}
+    for t in terminales:
+        if distancia[t] is None:
+            distancia[t], predecesores[t] = dijkstra(grafo, t)
+    return distancia, predecesores
+
+
 #  Heurísticas
 def auto_meseta(n: int, m: int, T: int, base: int) -> int:
     """Umbral auto-escalable para early-stop por meseta.
@@ -139,10 +591,12 @@ def primer_solucion_greedy(matriz_distancias: List[List[float]],
                            deposito_id: int,
                            nodos_recarga: set,
                            demanda: Dict[int, int],
-                           capacidad_camion: int) -> Solucion:
+                           capacidad_camion: int,
+                           limite: float = float('inf')) -> Solucion:
     """
     Greedy:
       1) Cuando carga=0 elige la recarga r que minimiza: dist(u,r) + min_v{dist(r,v)} con demanda>0.
+         Si ya venció el tiempo, elige directamente la recarga más cercana.
       2) Con carga>0 elige el destino más cercano; en empate, prioriza mayor demanda pendiente.
       3) Siempre fuerza el regreso al depósito si es alcanzable.
     Parametros:
@@ -151,6 +605,7 @@ def primer_solucion_greedy(matriz_distancias: List[List[float]],
     - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
     - demanda: diccionario {nodo: cantidad de paquetes a entregar}
     - capacidad_camion: capacidad máxima del camión
+    - limite: instante (time.monotonic()) en que vence el tiempo; la ruta se completa igual
     Salida:
     - mejor solución encontrada (objeto Solucion)
     """
@@ -167,10 +622,15 @@ def primer_solucion_greedy(matriz_distancias: List[List[float]],
         if carga == 0:
             carga = min(capacidad_camion, restante)
             mejor_nodo_r, mejor_distancia_u_r_v = None, float('inf')
+            sin_tiempo = time.monotonic() >= limite
             for r in nodos_recarga:
                 d_ur = matriz_distancias[u][r]
                 if d_ur == float('inf'):
                     continue
+                if sin_tiempo:
+                    if d_ur < mejor_distancia_u_r_v:
+                        mejor_nodo_r, mejor_distancia_u_r_v = r, d_ur
+                    continue
                 mejor_min_rv = min(
                     (matriz_distancias[r][v] for v, cnt in dem.items(
                     ) if cnt > 0 and matriz_distancias[r][v] != float('inf')),
@@ -217,6 +677,35 @@ def primer_solucion_greedy(matriz_distancias: List[List[float]],
     return s
 
 
+def ordenar_destinos(matriz_distancias: List[List[float]],
+                     origenes: List[int],
+                     nodos_demanda: List[int],
+                     ruido: float = 0.0,
+                     semilla: int = 0) -> List[Optional[List[int]]]:
+    """Ordena una sola vez, para cada origen, los nodos con demanda por distancia.
+    Parametros:
+    - matriz_distancias: matriz de distancias entre nodos
+    - origenes: nodos desde los que el backtracking elige destino (recargas y nodos con demanda)
+    - nodos_demanda: nodos con demanda > 0 (el orden se usa para desempatar)
+    - ruido: con ruido > 0 cada distancia se multiplica por un factor al azar en [1, 1 + ruido]
+      (otro orden de exploración; las cotas necesitan el orden sin ruido)
+    - semilla: semilla del generador aleatorio del ruido
+    Salida:
+    - lista indexada por nodo con los destinos alcanzables ordenados por distancia (None si no es origen)
+    """
+    azar = random.Random(semilla)
+    orden: List[Optional[List[int]]] = [None] * len(matriz_distancias)
+    for u in origenes:
+        fila_u = matriz_distancias[u]
+        alcanzables = [v for v in nodos_demanda if fila_u[v] != float('inf')]
+        if ruido > 0:
+            factor = {v: 1 + ruido * azar.random() for v in alcanzables}
+            orden[u] = sorted(alcanzables, key=lambda v: fila_u[v] * factor[v])
+        else:
+            orden[u] = sorted(alcanzables, key=lambda v: fila_u[v])
+    return orden
+
+
 #  Núcleo del Backtracking
 
 def bt(u: int,
@@ -227,11 +716,13 @@ def bt(u: int,
        matriz_distancias: List[List[float]],
        nodos_recarga: set,
        capacidad_camion: int,
-       demanda: Dict[int, int],
+       demanda: List[int],
        estado: EstadoBT,
        deposito_id: int,
        debug: bool,
-       hubs_en_rama: Optional[set] = None) -> None:
+       hubs_en_rama: int = 0,
+       pendientes: int = 0,
+       huella: int = 0) -> None:
     """
     Backtracking recursivo para encontrar la mejor solución posible. con poda y early-stop por meseta (finaliza si no hay mejora).
     Parametros:
@@ -243,22 +734,24 @@ def bt(u: int,
     - matriz_distancias: matriz de distancias entre nodos
     - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
     - capacidad_camion: capacidad máxima del camión
-    - demanda: diccionario {nodo: cantidad de paquetes a entregar}
-    - estado: estado mutable del backtracking
+    - demanda: vector de paquetes pendientes indexado por nodo
+    - estado: estado mutable del backtracking (incluye el orden precalculado de destinos)
     - deposito_id: id del nodo depósito
     - debug: si es True, imprime información de depuración
-    - hubs_en_rama: conjunto de hubs usados en la rama actual
+    - hubs_en_rama: máscara de bits de los hubs usados en la rama actual (ver EstadoBT.bits_hub)
+    - pendientes: máscara de bits de los nodos con demanda pendiente (ver EstadoBT.bit_demanda)
+    - huella: hash de Zobrist de `demanda` (ver TablaTransposicion; 0 si no se usa)
     Salida:
     - None (actualiza el estado.mejor si encuentra una mejor solución)
     """
-    if hubs_en_rama is None:
-        hubs_en_rama = set()
-
     if estado.stop:
         return
 
     estado.contador_llamadas += 1
     estado.llamadas_desde_mejora += 1
+    if not estado.contador_llamadas & 1023 and time.monotonic() >= estado.limite:
+        estado.stop = estado.vencido = True
+        return
     if estado.intervalo_report > 0 and (estado.contador_llamadas % estado.intervalo_report == 0) and debug:
         print(f"[DEBUG] llamadas={estado.contador_llamadas:,} | sin_mejora={estado.llamadas_desde_mejora:,} | "
               f"mejor={estado.mejor.distancia:.2f} | restante={restante} | nodo={u}")
@@ -275,19 +768,31 @@ def bt(u: int,
         dist_final, ruta_final = cerrar_ruta(
             dist, u, ruta, deposito_id, matriz_distancias)
         if dist_final < estado.mejor.distancia:
-            estado.mejor.set(dist_final, ruta_final, hubs_en_rama)
+            estado.mejor.set(dist_final, ruta_final, hubs_en_rama, estado.hubs_indexados)
             estado.llamadas_desde_mejora = 0
+            if estado.al_mejorar is not None:
+                estado.al_mejorar(estado.mejor)
+        return
+
+    # Poda por estado repetido: ya se llegó a (u, carga, demanda) con menor o igual distancia
+    tt = estado.transposicion
+    if tt is not None and tt.podar(u, carga, huella, dist):
+        return
+
+    # Poda por cota inferior de lo que falta recorrer
+    if estado.cotas is not None and estado.cotas.podar(u, carga, restante, pendientes,
+                                                       dist, estado.mejor.distancia):
         return
 
     if carga == 0:
         para_cargar = min(capacidad_camion, restante)
 
-        if u in nodos_recarga and u != deposito_id:
-            hubs_en_rama.add(u)
+        bits_hub = estado.bits_hub
         if u in nodos_recarga:
+            hubs_en_rama |= bits_hub.get(u, 0)
             bt(u, para_cargar, restante, dist, ruta,
                matriz_distancias, nodos_recarga, capacidad_camion,
-               demanda, estado, deposito_id, debug, hubs_en_rama.copy())
+               demanda, estado, deposito_id, debug, hubs_en_rama, pendientes, huella)
             if estado.stop:
                 return
 
@@ -299,27 +804,26 @@ def bt(u: int,
             d_ur = matriz_distancias[u][r]
             if d_ur == float('inf'):
                 continue
-            nuevos_hubs = hubs_en_rama.copy()
-            if r != deposito_id:
-                nuevos_hubs.add(r)
             ruta.append(r)
             bt(r, para_cargar, restante, dist + d_ur, ruta,
                matriz_distancias, nodos_recarga, capacidad_camion,
-               demanda, estado, deposito_id, debug, nuevos_hubs)
+               demanda, estado, deposito_id, debug, hubs_en_rama | bits_hub.get(r, 0), pendientes,
+               huella)
             ruta.pop()
         return
 
-    destinos = [v for v, cnt in demanda.items(
-    ) if cnt > 0 and matriz_distancias[u][v] != float('inf')]
-    destinos.sort(key=lambda v: matriz_distancias[u][v])
-
-    for destino in destinos:
+    fila_u = matriz_distancias[u]
+    candidatos = estado.candidatos or len(demanda)
+    for destino in estado.orden_destinos[u]:
         if estado.stop:
             return
         cnt = demanda[destino]
-        d_ud = matriz_distancias[u][destino]
-        if d_ud == float('inf'):
+        if cnt == 0:
             continue
+        if not candidatos:
+            break
+        candidatos -= 1
+        d_ud = fila_u[destino]
         entrego = min(carga, cnt)
         demanda[destino] -= entrego
         nueva_carga = carga - entrego
@@ -327,11 +831,191 @@ def bt(u: int,
         ruta.append(destino)
         bt(destino, nueva_carga, nuevo_restante, dist + d_ud, ruta,
            matriz_distancias, nodos_recarga, capacidad_camion,
-           demanda, estado, deposito_id, debug, hubs_en_rama.copy())
+           demanda, estado, deposito_id, debug, hubs_en_rama,
+           pendientes if demanda[destino] else pendientes & ~estado.bit_demanda[destino],
+           tt.entrega(huella, destino, cnt, cnt - entrego) if tt is not None else huella)
         ruta.pop()
         demanda[destino] += entrego
 
 
+def bt_iterativo(u: int,
+                 carga: int,
+                 restante: int,
+                 dist: float,
+                 ruta: List[int],
+                 matriz_distancias: List[List[float]],
+                 nodos_recarga: set,
+                 capacidad_camion: int,
+                 demanda: List[int],
+                 estado: EstadoBT,
+                 deposito_id: int,
+                 debug: bool,
+                 hubs_en_rama: int = 0,
+                 pendientes: int = 0,
+                 huella: int = 0) -> None:
+    """
+    Misma búsqueda que `bt` (mismo orden, podas y early-stop por meseta), pero sin recursión:
+    recorre el árbol con una pila explícita de marcos y deshace cada movimiento al volver.
+    Parametros:
+    - (los mismos que `bt`)
+    Salida:
+    - None (actualiza el estado.mejor si encuentra una mejor solución)
+    """
+    INF = float('inf')
+    bits_hub = estado.bits_hub
+    orden_destinos = estado.orden_destinos
+    hubs_indexados = estado.hubs_indexados
+    mejor = estado.mejor
+    # contadores en variables locales (se vuelcan a `estado` al terminar)
+    contador = estado.contador_llamadas
+    sin_mejora = estado.llamadas_desde_mejora
+    max_sin_mejora = estado.max_llamadas_sin_mejora
+    intervalo = estado.intervalo_report if debug else 0
+    cota = mejor.distancia
+    hubs = hubs_en_rama
+    cotas = estado.cotas
+    tt = estado.transposicion
+    incumbente = estado.incumbente
+    limite = estado.limite
+    al_mejorar = estado.al_mejorar
+    bit_demanda = estado.bit_demanda
+    candidatos = estado.candidatos or len(demanda)
+
+    # Marco: [iterador de hijos, es_entrega, u, carga, restante, dist, hubs, para_cargar, ultimo, deshacer,
+    #         pendientes, huella, candidatos]
+    # `deshacer` > 0 indica que el último hijo visitado agregó un nodo a la ruta; al entregar,
+    # además es la cantidad entregada en `ultimo`. `candidatos` es cuántos destinos pendientes
+    # quedan por probar en un marco de entrega.
+    pila: List[list] = []
+
+    while not estado.stop:
+        # --- Entrada de la "llamada" (u, carga, restante, dist, hubs): igual que al principio de `bt` ---
+        contador += 1
+        sin_mejora += 1
+        if intervalo > 0 and contador % intervalo == 0:
+            print(f"[DEBUG] llamadas={contador:,} | sin_mejora={sin_mejora:,} | "
+                  f"mejor={cota:.2f} | restante={restante} | nodo={u}")
+
+        if sin_mejora >= max_sin_mejora:
+            estado.stop = True
+            break
+
+        if not contador & 1023:
+            if time.monotonic() >= limite:
+                estado.stop = estado.vencido = True
+                break
+            # otro proceso pudo haber encontrado una solución mejor: podar contra la global
+            if incumbente is not None and incumbente.value < cota:
+                cota = incumbente.value
+
+        if dist < cota:  # si no, poda por distancia: hoja
+            if restante == 0 and carga == 0:
+                dist_final, ruta_final = cerrar_ruta(
+                    dist, u, ruta, deposito_id, matriz_distancias)
+                if dist_final < cota:
+                    mejor.set(dist_final, ruta_final, hubs, hubs_indexados)
+                    cota = dist_final
+                    sin_mejora = 0
+                    if al_mejorar is not None:
+                        al_mejorar(mejor)
+                    if incumbente is not None:
+                        with incumbente.get_lock():
+                            if dist_final < incumbente.value:
+                                incumbente.value = dist_final
+            elif tt is not None and tt.podar(u, carga, huella, dist):
+                pass  # poda por estado repetido: hoja
+            elif cotas is not None and cotas.podar(u, carga, restante, pendientes, dist, cota):
+                pass  # poda por cota inferior: hoja
+            elif carga == 0:
+                hubs |= bits_hub.get(u, 0)
+                fila_u = matriz_distancias[u]
+                hijos = [u] if u in nodos_recarga else []
+                hijos.extend(r for r in nodos_recarga if r != u and fila_u[r] != INF)
+                pila.append([iter(hijos), False, u, carga, restante, dist, hubs,
+                             min(capacidad_camion, restante), u, 0, pendientes, huella, 0])
+            else:
+                # el orden precalculado es compartido: los destinos sin demanda se saltean al avanzar
+                pila.append([iter(orden_destinos[u]), True, u, carga, restante, dist, hubs, 0, u, 0,
+                             pendientes, huella, candidatos])
+
+        # --- Avanzar: deshacer el hijo anterior del tope y bajar al siguiente hijo ---
+        while pila:
+            marco = pila[-1]
+            es_entrega = marco[1]
+            if marco[9]:
+                ruta.pop()
+                if es_entrega:
+                    demanda[marco[8]] += marco[9]
+                marco[9] = 0
+            if es_entrega:
+                if not marco[12]:
+                    pila.pop()
+                    continue
+                for v in marco[0]:
+                    if demanda[v]:
+                        break
+                else:
+                    pila.pop()
+                    continue
+                marco[12] -= 1
+            else:
+                v = next(marco[0], -1)
+                if v < 0:
+                    pila.pop()
+                    continue
+            marco[8] = v
+            u, dist, hubs, pendientes, huella = marco[2], marco[5], marco[6], marco[10], marco[11]
+
+            if es_entrega:
+                carga = marco[3]
+                cnt = demanda[v]
+                entrego = min(carga, cnt)
+                demanda[v] = cnt - entrego
+                if entrego == cnt:
+                    pendientes &= ~bit_demanda[v]
+                if tt is not None:
+                    huella = tt.entrega(huella, v, cnt, cnt - entrego)
+                ruta.append(v)
+                marco[9] = entrego
+                carga -= entrego
+                restante = marco[4] - entrego
+                dist += matriz_distancias[u][v]
+                u = v
+            else:
+                carga, restante = marco[7], marco[4]
+                if v != u:
+                    ruta.append(v)
+                    marco[9] = 1
+                    dist += matriz_distancias[u][v]
+                    hubs |= bits_hub.get(v, 0)
+                    u = v
+                # si v == u: recargar sin moverse
+            break
+        else:
+            break  # se recorrió todo el árbol
+
+    estado.contador_llamadas = contador
+    estado.llamadas_desde_mejora = sin_mejora
+
+    # Early-stop: deshacer los movimientos pendientes para dejar `ruta` y `demanda` como estaban
+    while pila:
+        marco = pila.pop()
+        if marco[9]:
+            ruta.pop()
+            if marco[1]:
+                demanda[marco[8]] += marco[9]
+
+
+# Motores de backtracking intercambiables (misma firma y mismo recorrido)
+MOTORES_BT = {
+    "recursivo": bt,
+    "iterativo": bt_iterativo,
+}
+
+# Métodos de búsqueda que parten de la solución inicial
+METODOS = ("bt", "recocido", "lns", "haz", "portafolio")
+
+
 def resolver_problema(
     matriz_distancias: List[List[float]],
     deposito_id: int,
@@ -341,7 +1025,24 @@ def resolver_problema(
     max_llamadas_sin_mejora: Optional[int] = None,
     intervalo_report: Optional[int] = None,
     debug: bool = False,
-    base_meseta: int = 1300
+    base_meseta: int = 1300,
+    motor_bt: str = "iterativo",
+    cotas: Tuple[str, ...] = ("recargas", "mst"),
+    memoria_transposicion_mb: float = 64,
+    umbral_exacto: int = 16,
+    procesos: int = 1,
+    limite_segundos: Optional[float] = None,
+    al_mejorar: Optional[Callable[[Incumbente], None]] = None,
+    busqueda_local: bool = True,
+    constructores: Tuple[str, ...] = ("greedy", "split", "ahorros"),
+    metodo: str = "bt",
+    iteraciones: Optional[int] = None,
+    semilla: int = 0,
+    coordenadas: Optional[Dict[int, Tuple[float, float]]] = None,
+    ruido_orden: float = 0.0,
+    candidatos: int = 0,
+    ancho_haz: int = 64,
+    estrategias: Optional[Tuple[str, ...]] = None
 ) -> Solucion:
     """
     Resuelve el problema usando backtracking con poda y early-stop por meseta.
@@ -355,15 +1056,109 @@ def resolver_problema(
     - intervalo_report: intervalo de llamadas para reporte de depuración
     - debug: si es True, imprime información de depuración
     - base_meseta: valor base para el cálculo del umbral de meseta
+    - motor_bt: "iterativo" (pila explícita) o "recursivo"
+    - cotas: nombres de las cotas inferiores para podar (ver cotas.COTAS); () = solo distancia
+    - memoria_transposicion_mb: tope de memoria de la tabla de transposición (LRU); 0 = sin tabla
+    - umbral_exacto: con menos terminales (depósito, hubs y nodos con demanda) que este umbral,
+      y si la cantidad de estados es tratable, se resuelve en forma exacta con programación
+      dinámica (ver exacto.py); 0 = siempre backtracking
+    - procesos: con más de 1, branch-and-bound en paralelo con un pool de procesos que
+      comparten el incumbente (ver paralelo.py; usa siempre el motor iterativo)
+    - limite_segundos: tiempo máximo de resolución; al vencer se devuelve la mejor solución
+      encontrada hasta ese momento (None = sin límite, solo corta la meseta)
+    - al_mejorar: función que recibe un Incumbente cada vez que mejora la solución (cada solución
+      inicial, cada mejora del backtracking o la solución exacta), para usarla sin esperar al final
+    - busqueda_local: post-optimizar la ruta final con 2-opt, or-opt, relocate y swap
+      (ver busqueda_local.py) y después reordenar cada viaje en forma exacta (ver held_karp.py);
+      no se aplica si la solución ya es óptima demostrada
+    - constructores: heurísticas que arman la solución inicial (ver heuristicas.CONSTRUCTORES);
+      el backtracking arranca acotado por la mejor de ellas
+    - metodo: "bt" (backtracking con poda), "recocido" (recocido simulado, ver recocido.py)
+      o "lns" (destrucción y reparación adaptativa, ver lns.py), los dos últimos desde la
+      mejor solución inicial; "haz" (búsqueda en haz por capas sobre el árbol del backtracking,
+      ver haz.py); "portafolio" corre varias estrategias en procesos paralelos y
+      se queda con la mejor (ver portafolio.py)
+    - iteraciones: presupuesto de iteraciones del recocido o de LNS; None = hasta
+      `limite_segundos`, o ITERACIONES_POR_CLIENTE (del módulo) por nodo con demanda si no
+      hay límite de tiempo
+    - semilla: semilla del generador aleatorio del recocido, de LNS o del ruido del orden
+    - coordenadas: {nodo: (x, y)} para la destrucción por cercanía de LNS (None = usar la
+      distancia en el grafo)
+    - ruido_orden: perturba el orden en que el backtracking secuencial prueba los destinos
+      (ver ordenar_destinos); 0 = del más cercano al más lejano
+    - candidatos: el backtracking secuencial ramifica solo entre los k destinos pendientes más
+      cercanos; cada vez que una pasada se estanca (meseta o árbol agotado) se duplica k y se
+      vuelve a empezar con el mejor incumbente, hasta llegar a todos los destinos (la última
+      pasada es la completa y la única que puede demostrar el óptimo); 0 = todos desde el inicio
+    - ancho_haz: estados que sobreviven en cada capa de la búsqueda en haz (con procesos > 1
+      cada capa se expande en paralelo)
+    - estrategias: estrategias del portafolio (ver portafolio.ESTRATEGIAS; None = todas);
+      con procesos <= 1 se usa un proceso por estrategia
     Salida:
-    - mejor solución encontrada (objeto Solucion)
+    - mejor solución encontrada (objeto Solucion); en `estadisticas` quedan las
+      llamadas del backtracking, su duración, las llamadas por segundo, las podas por cota
+      y las de la tabla de transposición (o las iteraciones del recocido, de LNS o las capas
+      del haz) y la distancia de cada constructor; siempre quedan el tiempo total
+      (`segundos_total`), la brecha relativa con la cota inferior (`gap`) y si cortó por
+      tiempo (`corte_por_tiempo`). La cota inferior y el óptimo demostrado (solver exacto o
+      backtracking completo) valen solo en el modelo de carga del backtracking
     """
+    inicio_total = time.monotonic()
+    if motor_bt not in MOTORES_BT:
+        raise ValueError(f"Motor de backtracking desconocido: {motor_bt}")
+    if candidatos < 0:
+        raise ValueError(f"La cantidad de candidatos no puede ser negativa: {candidatos}")
+    if ancho_haz < 1:
+        raise ValueError(f"El ancho del haz tiene que ser positivo: {ancho_haz}")
+    if metodo not in METODOS:
+        raise ValueError(f"Método de búsqueda desconocido: {metodo}")
+    if estrategias is not None:
+        import portafolio  # importación diferida: portafolio.py importa este módulo
+        if not estrategias:
+            raise ValueError("El portafolio necesita al menos una estrategia.")
+        for nombre in estrategias:
+            if nombre not in portafolio.ESTRATEGIAS:
+                raise ValueError(f"Estrategia desconocida: {nombre}")
+    import heuristicas  # importación diferida: heuristicas.py importa este módulo
+    if not constructores:
+        raise ValueError("Se necesita al menos un constructor de solución inicial.")
+    for nombre in constructores:
+        if nombre not in heuristicas.CONSTRUCTORES:
+            raise ValueError(f"Constructor desconocido: {nombre}")
+    if limite_segundos is not None and limite_segundos < 0:
+        raise ValueError("limite_segundos no puede ser negativo.")
+    limite = inicio_total + limite_segundos if limite_segundos is not None else float('inf')
+
+    def notificar(solucion: Solucion) -> None:
+        if al_mejorar is not None:
+            al_mejorar(Incumbente(solucion.distancia, solucion.ruta.copy(), set(solucion.hubs_usados),
+                                  time.time(), time.monotonic() - inicio_total))
+    import exacto  # importación diferida: exacto.py importa Solucion de este módulo
+    if (len(exacto.terminales(deposito_id, hubs, demanda_por_nodo)) < umbral_exacto and
+            exacto.estados_exacto(hubs, deposito_id, demanda_por_nodo,
+                                  capacidad_camion) <= exacto.MAX_ESTADOS_EXACTO):
+        solucion = exacto.resolver_exacto(matriz_distancias, deposito_id, hubs,
+                                          demanda_por_nodo, capacidad_camion, limite)
+        if solucion is not None:
+            notificar(solucion)
+            if debug:
+                print(f"[DEBUG] exacto: {solucion.estadisticas['estados_exacto']:,} estados en "
+                      f"{solucion.estadisticas['segundos_exacto']:.2f}s")
+            return _completar_estadisticas(solucion, inicio_total, False)
+        # sin tiempo para terminar la programación dinámica: quedan los constructores
+    if metodo == "portafolio":
+        import portafolio  # importación diferida: portafolio.py importa este módulo
+        solucion = portafolio.correr_portafolio(
+            matriz_distancias, deposito_id, hubs, demanda_por_nodo, capacidad_camion,
+            estrategias or tuple(portafolio.ESTRATEGIAS),
+            procesos if procesos > 1 else len(estrategias or portafolio.ESTRATEGIAS),
+            limite, notificar, coordenadas)
+        return _completar_estadisticas(solucion, inicio_total, time.monotonic() >= limite)
     n = len(matriz_distancias)
     demanda = demanda_por_nodo.copy()
     total_restante = sum(demanda.values())
     nodos_recarga = set(hubs) | {deposito_id}
     mejor = Solucion()
-    ruta_inicial: List[int] = [deposito_id]
 
     if base_meseta <= 0:
         raise ValueError("base_meseta debe ser un entero positivo.")
@@ -375,20 +1170,245 @@ def resolver_problema(
     if intervalo_report is None:
         intervalo_report = max(1_000, max_llamadas_sin_mejora // 100)
 
-    puntoDePartida = primer_solucion_greedy(
-        matriz_distancias, deposito_id, nodos_recarga, demanda, capacidad_camion)
-    if puntoDePartida.distancia < mejor.distancia:
-        mejor.set(puntoDePartida.distancia, puntoDePartida.ruta,
-                  puntoDePartida.hubs_usados)
+    distancias_constructores: Dict[str, float] = {}
+    for nombre in constructores:
+        puntoDePartida = heuristicas.CONSTRUCTORES[nombre](
+            matriz_distancias, deposito_id, nodos_recarga, demanda, capacidad_camion, limite)
+        distancias_constructores[f"distancia_{nombre}"] = puntoDePartida.distancia
+        if puntoDePartida.distancia < mejor.distancia:
+            mejor.set(puntoDePartida.distancia, puntoDePartida.ruta,
+                      puntoDePartida.hubs_usados)
+            notificar(mejor)
+
+    hubs_indexados = [h for h in dict.fromkeys(hubs) if h != deposito_id]
+    nodos_demanda = [v for v, cnt in demanda.items() if cnt > 0]
+    demanda_vec = [0] * n
+    for v in nodos_demanda:
+        demanda_vec[v] = demanda[v]
+    orden_destinos = ordenar_destinos(
+        matriz_distancias, list(nodos_recarga | set(nodos_demanda)), nodos_demanda)
+    contexto = ContextoCotas(matriz_distancias, deposito_id, nodos_demanda,
+                             nodos_recarga, capacidad_camion, orden_destinos)
+
+    def cerrar(solucion: Solucion, vencido: bool) -> Solucion:
+        """Post-optimiza con búsqueda local y Held-Karp (si no es óptima demostrada) y completa las estadísticas."""
+        solucion.estadisticas.update(distancias_constructores)
+        if busqueda_local and solucion.cota_inferior < solucion.distancia:
+            from busqueda_local import mejorar_solucion  # importación diferida (importa este módulo)
+            if mejorar_solucion(solucion, matriz_distancias, deposito_id, nodos_recarga,
+                                demanda, capacidad_camion, limite):
+                notificar(solucion)
+            from held_karp import reoptimizar_solucion  # importación diferida (importa este módulo)
+            if reoptimizar_solucion(solucion, matriz_distancias, deposito_id, nodos_recarga,
+                                    demanda, capacidad_camion, procesos, limite):
+                notificar(solucion)
+        return _completar_estadisticas(solucion, inicio_total, vencido)
+
+    if metodo != "bt":
+        _buscar_desde_inicial(metodo, mejor, matriz_distancias, deposito_id, hubs_indexados, nodos_recarga,
+                              demanda, capacidad_camion, contexto, cotas, ancho_haz, procesos, iteraciones,
+                              semilla, coordenadas, limite, notificar)
+        if cotas:
+            mejor.cota_inferior = CotasInferiores(list(cotas), contexto).cota_raiz(
+                deposito_id, 0, total_restante, contexto.mascara(demanda_vec))
+        if debug:
+            print(f"[DEBUG] {metodo}: {mejor.estadisticas.get(f'iteraciones_{metodo}', 0):,} iteraciones en "
+                  f"{mejor.estadisticas.get(f'segundos_{metodo}', 0.0):.2f}s")
+        return cerrar(mejor, time.monotonic() >= limite)
 
     estado = EstadoBT(
         mejor=mejor,
         max_llamadas_sin_mejora=max_llamadas_sin_mejora,
         intervalo_report=intervalo_report,
+        bits_hub={h: 1 << i for i, h in enumerate(hubs_indexados)},
+        hubs_indexados=hubs_indexados,
+        orden_destinos=(ordenar_destinos(matriz_distancias, list(nodos_recarga | set(nodos_demanda)),
+                                         nodos_demanda, ruido_orden, semilla)
+                        if ruido_orden > 0 else orden_destinos),
+        bit_demanda=contexto.bit_demanda,
+        cotas=CotasInferiores(list(cotas), contexto) if cotas else None,
+        transposicion=(TablaTransposicion(n, demanda_vec, capacidad_camion, memoria_transposicion_mb)
+                       if memoria_transposicion_mb > 0 else None),
+        limite=limite,
+        al_mejorar=notificar if al_mejorar is not None else None,
     )
 
-    bt(deposito_id, 0, total_restante, 0.0, ruta_inicial,
-       matriz_distancias, nodos_recarga, capacidad_camion,
-       demanda, estado, deposito_id, debug)
+    inicio = time.perf_counter()
+    if procesos > 1:
+        import paralelo  # importación diferida: paralelo.py importa este módulo
+        estadisticas = paralelo.bt_paralelo(estado, matriz_distancias, deposito_id, hubs, demanda_vec,
+                                            capacidad_camion, procesos, cotas, memoria_transposicion_mb)
+        motor_bt = "paralelo"
+    else:
+        estadisticas = _bt_con_candidatos(estado, MOTORES_BT[motor_bt], matriz_distancias, deposito_id,
+                                          nodos_recarga, capacidad_camion, demanda_vec, contexto,
+                                          candidatos, memoria_transposicion_mb, debug)
+    segundos = time.perf_counter() - inicio
+
+    estado.mejor.estadisticas.update({
+        "llamadas_bt": estado.contador_llamadas,
+        "segundos_bt": segundos,
+        "llamadas_por_segundo": estado.contador_llamadas / segundos if segundos > 0 else 0.0,
+    })
+    estado.mejor.estadisticas.update(estadisticas)
+    # Si la búsqueda terminó sin early-stop, recorrió (o podó con cotas admisibles) todo el árbol
+    if not estado.stop:
+        estado.mejor.cota_inferior = estado.mejor.distancia
+    elif estado.cotas is not None:
+        estado.mejor.cota_inferior = estado.cotas.cota_raiz(deposito_id, 0, total_restante,
+                                                            contexto.mascara(demanda_vec))
+    if debug:
+        print(f"[DEBUG] bt {motor_bt}: {estado.contador_llamadas:,} llamadas en {segundos:.2f}s "
+              f"({estado.mejor.estadisticas['llamadas_por_segundo']:,.0f} llamadas/s)")
+    return cerrar(estado.mejor, estado.vencido)
+
+
+def _buscar_desde_inicial(metodo: str,
+                          mejor: Solucion,
+                          matriz_distancias: List[List[float]],
+                          deposito_id: int,
+                          hubs_indexados: List[int],
+                          nodos_recarga: set,
+                          demanda: Dict[int, int],
+                          capacidad_camion: int,
+                          contexto: ContextoCotas,
+                          cotas: Tuple[str, ...],
+                          ancho_haz: int,
+                          procesos: int,
+                          iteraciones: Optional[int],
+                          semilla: int,
+                          coordenadas: Optional[Dict[int, Tuple[float, float]]],
+                          limite: float,
+                          notificar: Callable[[Solucion], None]) -> None:
+    """Mejora `mejor` (la mejor solución inicial) en el lugar con el método "recocido", "lns" o "haz".
+    Los parámetros son los de `resolver_problema`; `iteraciones` en None toma el presupuesto por
+    defecto del módulo del método."""
+    # importación diferida: recocido.py, lns.py y haz.py importan este módulo
+    if metodo == "haz":
+        import haz
+        haz.buscar_en_haz(mejor, matriz_distancias, deposito_id, hubs_indexados, nodos_recarga,
+                          demanda, capacidad_camion, contexto, cotas, ancho_haz, procesos, limite,
+                          notificar)
+        return
+    if metodo == "recocido":
+        import recocido as modulo
+    else:
+        import lns as modulo
+    if iteraciones is None:
+        iteraciones = (modulo.ITERACIONES_SIN_TOPE if limite != float('inf')
+                       else modulo.ITERACIONES_POR_CLIENTE * max(1, len(contexto.nodos_demanda)))
+    if metodo == "recocido":
+        modulo.recocer_solucion(mejor, matriz_distancias, deposito_id, nodos_recarga, demanda,
+                                capacidad_camion, iteraciones, limite, semilla, notificar)
+    else:
+        modulo.reconstruir_solucion(mejor, matriz_distancias, deposito_id, nodos_recarga,
+                                    demanda, capacidad_camion, iteraciones, limite, semilla,
+                                    notificar, coordenadas)
+
+
+def _bt_con_candidatos(estado: EstadoBT,
+                       motor: Callable[..., None],
+                       matriz_distancias: List[List[float]],
+                       deposito_id: int,
+                       nodos_recarga: set,
+                       capacidad_camion: int,
+                       demanda_vec: List[int],
+                       contexto: ContextoCotas,
+                       candidatos: int,
+                       memoria_transposicion_mb: float,
+                       debug: bool) -> Dict[str, float]:
+    """
+    Backtracking secuencial desde el depósito con ampliación de la lista de candidatos.
+    Cada pasada ramifica entre los k destinos pendientes más cercanos (estado.candidatos); si se
+    estanca (meseta o árbol agotado) se duplica k y se vuelve a empezar con el mejor incumbente,
+    hasta la pasada completa (k = 0, todos los destinos).
+    Invariante: cada pasada arranca con una tabla de transposición nueva, porque lo guardado con
+    menos candidatos no sirve para podar una búsqueda más amplia.
+    Parametros:
+    - estado: estado del backtracking ya armado (incumbente inicial, orden de destinos, meseta)
+    - motor: función de MOTORES_BT
+    - candidatos: k de la primera pasada (0 = todos desde el inicio)
+    - memoria_transposicion_mb: tope de memoria de cada tabla de transposición
+    - el resto, como en `resolver_problema`
+    Salida:
+    - estadísticas de las cotas, de la tabla de transposición de la última pasada y la cantidad
+      de pasadas (`pasadas_candidatos`, solo si hubo candidatos)
+    """
+    n = len(matriz_distancias)
+    total_restante = sum(demanda_vec)
+    nodos_demanda = contexto.nodos_demanda
+    estadisticas: Dict[str, float] = {}
+    k = candidatos if candidatos < len(nodos_demanda) else 0
+    pasadas = 0
+    while True:
+        if pasadas and estado.transposicion is not None:
+            estado.transposicion = TablaTransposicion(n, demanda_vec, capacidad_camion,
+                                                      memoria_transposicion_mb)
+        huella = estado.transposicion.huella(demanda_vec) if estado.transposicion is not None else 0
+        estado.candidatos = k
+        pasadas += 1
+        motor(deposito_id, 0, total_restante, 0.0, [deposito_id], matriz_distancias, nodos_recarga,
+              capacidad_camion, demanda_vec, estado, deposito_id, debug, 0, contexto.mascara(demanda_vec),
+              huella)
+        if not k or estado.vencido:
+            break
+        # la pasada restringida se estancó: ampliar la lista de candidatos y volver a empezar
+        k = 2 * k if 2 * k < len(nodos_demanda) else 0
+        estado.stop = False
+        estado.llamadas_desde_mejora = 0
+    if candidatos:
+        estadisticas["pasadas_candidatos"] = pasadas
+    if estado.cotas is not None:
+        estadisticas.update(estado.cotas.estadisticas())
+    if estado.transposicion is not None:
+        estadisticas.update(estado.transposicion.estadisticas())
+    return estadisticas
+
+
+def resolver_problema_anytime(*args, **kwargs) -> Iterator[Incumbente]:
+    """
+    Versión generadora de `resolver_problema`: corre la resolución en un hilo aparte y entrega
+    cada nuevo incumbente apenas se encuentra (distancia decreciente).
+    Parametros:
+    - los mismos que `resolver_problema` (salvo `al_mejorar`)
+    Salida:
+    - iterador de Incumbente; al agotarse, el valor de retorno del generador
+      (StopIteration.value) es la Solucion final con sus estadísticas
+    Si se deja de iterar antes de tiempo la búsqueda sigue en segundo plano hasta terminar:
+    para acotarla usar `limite_segundos`.
+    """
+    cola: "queue.Queue[Optional[Incumbente]]" = queue.Queue()
+    resultado: Dict[str, Any] = {}
+
+    def correr() -> None:
+        try:
+            resultado["solucion"] = resolver_problema(*args, al_mejorar=cola.put, **kwargs)
+        except Exception as e:  # se relanza en el hilo que consume el generador
+            resultado["error"] = e
+        finally:
+            cola.put(None)
+
+    hilo = threading.Thread(target=correr, daemon=True)
+    hilo.start()
+    while True:
+        incumbente = cola.get()
+        if incumbente is None:
+            break
+        yield incumbente
+    hilo.join()
+    if "error" in resultado:
+        raise resultado["error"]
+    return resultado["solucion"]
+
 
-    return estado.mejor
+def _completar_estadisticas(solucion: Solucion, inicio: float, vencido: bool) -> Solucion:
+    """Agrega a la solución el tiempo total, la brecha con la cota inferior y si cortó por tiempo."""
+    gap = 0.0
+    if 0 < solucion.distancia < float('inf'):
+        gap = max(0.0, solucion.distancia - solucion.cota_inferior) / solucion.distancia
+    solucion.estadisticas.update({
+        "segundos_total": time.monotonic() - inicio,
+        "gap": gap,
+        "corte_por_tiempo": float(vencido),
+    })
+    return solucion
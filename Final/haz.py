@@ -0,0 +1,281 @@
+import heapq
+import multiprocessing as mp
+import time
+from typing import List, Dict, Optional, Callable, Tuple, Any
+
+import funciones as f
+from cotas import CotasInferiores, ContextoCotas
+
+#  Búsqueda en haz sobre el árbol del backtracking
+#
+# El backtracking en profundidad con meseta gasta casi todo el presupuesto debajo de las
+# primeras ramas de la raíz. La búsqueda en haz recorre el mismo espacio de estados por
+# capas: cada capa aplica una transición de `bt` a todos los estados del haz (recargar en
+# el lugar o ir a otra recarga con el camión vacío; entregar min(carga, demanda) en un
+# destino pendiente con el camión cargado) y se queda con los `ancho` hijos de menor
+# dist + cota inferior (las mismas cotas de cotas.py), sin estados repetidos (mismo nodo,
+# carga y demanda pendiente). Los hijos que no pueden mejorar al incumbente se descartan y
+# los que terminan de entregar se cierran contra el depósito.
+#
+# Cada estado del haz lleva su propio resumen de pendientes (MST, min a recarga, min al
+# depósito), calculado exacto. Para ordenar los hijos, el de uno que completa un nodo se deriva
+# del resumen del padre como en ContextoCotas.resumen (O(1)); solo los que entran al haz pagan
+# el MST exacto. Así la cota de un estado no depende de qué quedó en la cache de cada proceso,
+# y el haz es el mismo con uno o con varios.
+#
+# El trabajo por capa es ancho x destinos, así que el tiempo total es proporcional a
+# ancho x profundidad. No es exhaustiva: no demuestra optimalidad. Con procesos, cada capa
+# se reparte en lotes que se expanden en un pool (cada lote devuelve sus mejores `ancho`
+# hijos, que alcanzan para elegir los mejores de la capa).
+
+# Ancho del haz por defecto
+ANCHO_HAZ = 64
+
+# Estado que se expande: (índice en la capa, u, carga, restante, dist, pendientes, demanda,
+# resumen), con `demanda` como tupla alineada con `nodos_demanda`, `pendientes` como su máscara
+# de bits y `resumen` como en ContextoCotas.resumen_exacto
+Resumen = Tuple[float, float, float]
+Estado = Tuple[int, int, int, int, float, int, Tuple[int, ...], Resumen]
+
+
+class Expansor:
+    """Genera y filtra los hijos de un lote de estados del haz."""
+
+    def __init__(self,
+                 matriz_distancias: List[List[float]],
+                 deposito_id: int,
+                 nodos_recarga: set,
+                 capacidad_camion: int,
+                 contexto: ContextoCotas,
+                 cotas: Optional[CotasInferiores],
+                 ancho: int):
+        self.D = matriz_distancias
+        self.deposito_id = deposito_id
+        self.recargas = sorted(nodos_recarga)
+        self.nodos_demanda = contexto.nodos_demanda
+        self.posicion = {v: i for i, v in enumerate(self.nodos_demanda)}
+        self.capacidad = capacidad_camion
+        self.contexto = contexto
+        self.cotas = cotas
+        self.ancho = ancho
+
+    def _cota(self, u: int, carga: int, restante: int, pendientes: int, resumen: Resumen) -> float:
+        if self.cotas is None:
+            return 0.0
+        return self.cotas.cota_con_resumen(u, carga, restante, pendientes, resumen)
+
+    def _resumen_sin(self, resumen: Resumen, v: int, pendientes: int) -> Resumen:
+        """Resumen de `pendientes` (no vacío) cuando se acaba de completar `v`."""
+        return (self.contexto.derivar_mst(resumen[0], v, pendientes), *self.contexto.minimos(pendientes))
+
+    def expandir(self, lote: List[Estado], cota_superior: float) -> Tuple[list, Tuple[float, int, int], int]:
+        """
+        Expande un lote de estados.
+        Parametros:
+        - lote: estados a expandir
+        - cota_superior: distancia del incumbente (se descartan los hijos que no la mejoran)
+        Salida:
+        - (hijos, cierre, generados): hasta `ancho` hijos (f, índice del padre, u, carga, restante,
+          dist, pendientes, demanda, resumen) ordenados por f = dist + cota y sin repetidos, la
+          mejor ruta completa como (distancia, índice del padre, último destino) (-1 si no hay)
+          y cuántos hijos sobrevivieron a la poda
+        """
+        D, capacidad = self.D, self.capacidad
+        candidatos = []
+        cierre = (cota_superior, -1, -1)
+        for j, (_, u, carga, restante, dist, pendientes, demanda, resumen) in enumerate(lote):
+            fila_u = D[u]
+            if carga == 0:
+                para_cargar = min(capacidad, restante)
+                for r in self.recargas:  # r == u: recargar sin moverse
+                    g = dist + fila_u[r]
+                    if g < cota_superior:
+                        f_hijo = g + self._cota(r, para_cargar, restante, pendientes, resumen)
+                        if f_hijo < cota_superior:
+                            candidatos.append((f_hijo, j, r))
+                continue
+            for i, cnt in enumerate(demanda):
+                if not cnt:
+                    continue
+                v = self.nodos_demanda[i]
+                g = dist + fila_u[v]
+                if g >= cota_superior:
+                    continue
+                entrego = min(carga, cnt)
+                if entrego == restante:
+                    total = g + D[v][self.deposito_id]
+                    if total < cierre[0]:
+                        cierre = (total, lote[j][0], v)
+                    continue
+                if entrego < cnt:
+                    f_hijo = g + self._cota(v, carga - entrego, restante - entrego, pendientes, resumen)
+                else:
+                    quedan = pendientes & ~(1 << i)
+                    f_hijo = g + self._cota(v, carga - entrego, restante - entrego, quedan,
+                                            self._resumen_sin(resumen, v, quedan))
+                if f_hijo < cota_superior:
+                    candidatos.append((f_hijo, j, v))
+
+        generados = len(candidatos)
+        heapq.heapify(candidatos)
+        hijos, vistos = [], set()
+        while candidatos and len(hijos) < self.ancho:
+            f_hijo, j, v = heapq.heappop(candidatos)
+            indice, u, carga, restante, dist, pendientes, demanda, resumen = lote[j]
+            if carga == 0:
+                carga = min(capacidad, restante)
+            else:
+                i = self.posicion[v]
+                cnt = demanda[i]
+                entrego = min(carga, cnt)
+                demanda = demanda[:i] + (cnt - entrego,) + demanda[i + 1:]
+                carga -= entrego
+                restante -= entrego
+                if entrego == cnt:
+                    pendientes &= ~(1 << i)
+                    resumen = None  # se calcula exacto si el hijo entra al haz
+            clave = (v, carga, demanda)
+            if clave in vistos:
+                continue
+            vistos.add(clave)
+            if resumen is None:
+                resumen = self.contexto.resumen_exacto(pendientes)
+            hijos.append((f_hijo, indice, v, carga, restante, dist + D[u][v], pendientes, demanda,
+                          resumen))
+        return hijos, cierre, generados
+
+
+# Estado de cada proceso del pool (lo arma _iniciar_trabajador)
+_trabajador: Dict[str, Any] = {}
+
+
+def _iniciar_trabajador(referencia: Tuple[str, str], deposito_id: int, nodos_recarga: set, nodos_demanda: List[int],
+                        capacidad_camion: int, cotas: Tuple[str, ...], ancho: int) -> None:
+    """Se adjunta a la matriz compartida y arma el expansor (con sus propias cotas)."""
+    compartida = f.MatrizCompartida.adjuntar(referencia)
+    matriz = compartida.filas
+    orden_destinos = f.ordenar_destinos(matriz, list(nodos_recarga | set(nodos_demanda)), nodos_demanda)
+    contexto = ContextoCotas(matriz, deposito_id, nodos_demanda, nodos_recarga, capacidad_camion,
+                             orden_destinos)
+    _trabajador.update(
+        compartida=compartida,
+        expansor=Expansor(matriz, deposito_id, nodos_recarga, capacidad_camion, contexto,
+                          CotasInferiores(list(cotas), contexto) if cotas else None, ancho),
+    )
+
+
+def _expandir_lote(lote: List[Estado], cota_superior: float) -> Tuple[list, Tuple[float, int, int], int]:
+    return _trabajador["expansor"].expandir(lote, cota_superior)
+
+
+def buscar_en_haz(mejor: f.Solucion,
+                  matriz_distancias: List[List[float]],
+                  deposito_id: int,
+                  hubs_indexados: List[int],
+                  nodos_recarga: set,
+                  demanda_por_nodo: Dict[int, int],
+                  capacidad_camion: int,
+                  contexto: ContextoCotas,
+                  cotas: Tuple[str, ...],
+                  ancho: int = ANCHO_HAZ,
+                  procesos: int = 1,
+                  limite: float = float('inf'),
+                  al_mejorar: Optional[Callable[[f.Solucion], None]] = None) -> bool:
+    """
+    Búsqueda en haz desde el depósito; mejora `mejor` en el lugar.
+    Parametros:
+    - mejor: incumbente (poda los hijos que no lo mejoran)
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - hubs_indexados: hubs en el orden de las máscaras de bits de Solucion.set
+    - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
+    - demanda_por_nodo: diccionario {nodo: cantidad de paquetes a entregar}
+    - capacidad_camion: capacidad máxima del camión
+    - contexto: contexto de cotas de la instancia (su orden de nodos define `pendientes`)
+    - cotas: nombres de las cotas inferiores que ordenan el haz
+    - ancho: estados que sobreviven en cada capa
+    - procesos: con más de 1, cada capa se expande en un pool de procesos
+    - limite: instante (time.monotonic()) en que vence el tiempo
+    - al_mejorar: se llama con `mejor` cada vez que mejora
+    Salida:
+    - True si mejoró la solución; en `estadisticas` quedan las capas (`iteraciones_haz`), los
+      estados generados, el ancho y el tiempo
+    """
+    inicio = time.perf_counter()
+    D = matriz_distancias
+    nodos_demanda = contexto.nodos_demanda
+    demanda = tuple(demanda_por_nodo[v] for v in nodos_demanda)
+    bits_hub = {h: 1 << i for i, h in enumerate(hubs_indexados)}
+    todos = (1 << len(nodos_demanda)) - 1
+    # capa: (u, carga, restante, dist, pendientes, demanda, resumen, hubs, ruta); la ruta es una
+    # lista enlazada (nodo, resto) para no copiarla en cada hijo
+    capa = [(deposito_id, 0, sum(demanda), 0.0, todos, demanda, contexto.resumen_exacto(todos), 0,
+             (deposito_id, None))]
+    distancia_inicial = mejor.distancia
+    capas = generados = 0
+
+    def ruta_de(enlazada) -> List[int]:
+        ruta = []
+        while enlazada is not None:
+            ruta.append(enlazada[0])
+            enlazada = enlazada[1]
+        ruta.reverse()
+        return ruta
+
+    pool, compartida, propia = None, None, False
+    if procesos > 1:
+        compartida, propia = f.MatrizCompartida.compartir(D)
+        pool = mp.get_context().Pool(procesos, initializer=_iniciar_trabajador,
+                                     initargs=(compartida.referencia, deposito_id, nodos_recarga,
+                                               nodos_demanda, capacidad_camion, cotas, ancho))
+    else:
+        expansor = Expansor(D, deposito_id, nodos_recarga, capacidad_camion, contexto,
+                            CotasInferiores(list(cotas), contexto) if cotas else None, ancho)
+    try:
+        while capa and time.monotonic() < limite:
+            capas += 1
+            lote = [(k,) + estado[:7] for k, estado in enumerate(capa)]
+            if pool is not None:
+                resultados = pool.starmap(_expandir_lote, [(lote[p::procesos], mejor.distancia)
+                                                           for p in range(procesos)])
+            else:
+                resultados = [expansor.expandir(lote, mejor.distancia)]
+
+            generados += sum(g for _, _, g in resultados)
+            cierre = min(c for _, c, _ in resultados)
+            total, k, v = cierre
+            if k >= 0 and total < mejor.distancia:
+                ruta = ruta_de(capa[k][8]) + [v]
+                if v != deposito_id:
+                    ruta.append(deposito_id)
+                mejor.set(total, ruta, capa[k][7], hubs_indexados)
+                if al_mejorar is not None:
+                    al_mejorar(mejor)
+
+            nueva, vistos = [], set()
+            for hijo in heapq.merge(*(h for h, _, _ in resultados)):
+                f_hijo, k, v, carga, _, _, _, dem, _ = hijo
+                if len(nueva) == ancho or f_hijo >= mejor.distancia:
+                    break
+                if (v, carga, dem) in vistos:
+                    continue
+                vistos.add((v, carga, dem))
+                padre = capa[k]
+                recarga = padre[1] == 0
+                nueva.append(hijo[2:] + (padre[7] | (bits_hub.get(v, 0) if recarga else 0),
+                                         padre[8] if recarga and v == padre[0] else (v, padre[8])))
+            capa = nueva
+    finally:
+        if pool is not None:
+            pool.terminate()
+            if propia:
+                compartida.liberar()
+
+    mejoro = mejor.distancia < distancia_inicial
+    mejor.estadisticas.update({
+        "iteraciones_haz": capas,
+        "estados_haz": generados,
+        "ancho_haz": ancho,
+        "segundos_haz": time.perf_counter() - inicio,
+    })
+    return mejoro
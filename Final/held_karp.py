@@ -0,0 +1,202 @@
+import multiprocessing as mp
+import time
+from typing import List, Dict, Optional, Tuple
+
+from funciones import Solucion
+from busqueda_local import Viaje, descomponer_ruta, costo_viajes, componer_ruta, EPS
+
+#  Reordenamiento exacto de cada viaje (Held-Karp)
+#
+# Con la capacidad del camión acotada, cada viaje visita pocas paradas, así que su orden
+# óptimo se puede calcular exactamente con programación dinámica sobre subconjuntos: C[S][j]
+# es el camino más corto que sale de la recarga, visita las paradas de S y termina en j.
+# Los extremos del viaje quedan fijos (su recarga y la recarga del viaje siguiente, o el
+# depósito al final), así que los viajes son independientes entre sí: se resuelven todos a la
+# vez (en paralelo si hay procesos) y se guardan en una cache por (recarga, paradas, fin).
+#
+# Cambiar el orden de un viaje cambia su última parada, y con ella la mejor recarga del viaje
+# siguiente; por eso se alterna con la elección de recargas hasta que ninguna de las dos mejore.
+
+# Viajes más largos que esto no se reordenan (la tabla crece como 2^k * k)
+MAX_PARADAS_HELD_KARP = 12
+# Con menos viajes por resolver que esto no conviene pagar el arranque del pool
+MIN_VIAJES_PARALELO = 64
+
+Clave = Tuple[int, Tuple[int, ...], int]
+
+
+def camino_minimo(submatriz: List[List[float]]) -> Tuple[float, List[int]]:
+    """
+    Held-Karp para un camino con extremos fijos.
+    Parametros:
+    - submatriz: distancias entre [inicio, paradas..., fin] (k + 2 filas)
+    Salida:
+    - (costo mínimo, orden de las paradas como índices 0..k-1)
+    """
+    k = len(submatriz) - 2
+    INF = float('inf')
+    fin = k + 1
+    completo = (1 << k) - 1
+    costo = [[INF] * k for _ in range(1 << k)]
+    padre = [[-1] * k for _ in range(1 << k)]
+    for j in range(k):
+        costo[1 << j][j] = submatriz[0][j + 1]
+    for S in range(1, completo):
+        fila_costo = costo[S]
+        for j in range(k):
+            c = fila_costo[j]
+            if c == INF:
+                continue
+            dist_j = submatriz[j + 1]
+            for l in range(k):
+                if S >> l & 1:
+                    continue
+                T = S | 1 << l
+                nuevo = c + dist_j[l + 1]
+                if nuevo < costo[T][l]:
+                    costo[T][l] = nuevo
+                    padre[T][l] = j
+    j = min(range(k), key=lambda j: costo[completo][j] + submatriz[j + 1][fin])
+    total = costo[completo][j] + submatriz[j + 1][fin]
+    orden, S = [], completo
+    while j != -1:
+        orden.append(j)
+        S, j = S ^ 1 << j, padre[S][j]
+    orden.reverse()
+    return total, orden
+
+
+def _clave(viaje: Viaje, fin: int) -> Clave:
+    return viaje.recarga, tuple(sorted(viaje.paradas)), fin
+
+
+def resolver_viajes(claves: List[Clave],
+                    matriz_distancias: List[List[float]],
+                    procesos: int = 1) -> List[Tuple[float, Tuple[int, ...]]]:
+    """
+    Orden óptimo de las paradas de cada clave (recarga, paradas, fin).
+    Parametros:
+    - claves: viajes a resolver
+    - matriz_distancias: matriz de distancias entre nodos
+    - procesos: procesos para repartir los viajes (1 = en este proceso)
+    Salida:
+    - [(costo, paradas en orden)] en el mismo orden que `claves`
+    """
+    D = matriz_distancias
+    submatrices = []
+    for inicio, paradas, fin in claves:
+        nodos = [inicio, *paradas, fin]
+        submatrices.append([[D[a][b] for b in nodos] for a in nodos])
+    if procesos > 1 and len(claves) >= MIN_VIAJES_PARALELO:
+        # a cada proceso le alcanza con la submatriz del viaje: no hace falta compartir D
+        with mp.get_context().Pool(procesos) as pool:
+            resultados = pool.map(camino_minimo, submatrices,
+                                  chunksize=max(1, len(submatrices) // (4 * procesos)))
+    else:
+        resultados = [camino_minimo(s) for s in submatrices]
+    return [(costo, tuple(clave[1][i] for i in orden))
+            for clave, (costo, orden) in zip(claves, resultados)]
+
+
+def reordenar_viajes(viajes: List[Viaje],
+                     matriz_distancias: List[List[float]],
+                     deposito_id: int,
+                     nodos_recarga: set,
+                     procesos: int = 1,
+                     limite: float = float('inf'),
+                     cache: Optional[Dict[Clave, Tuple[float, Tuple[int, ...]]]] = None) -> Dict[str, float]:
+    """
+    Deja cada viaje en su orden óptimo y cada recarga en la mejor, hasta que no haya cambios
+    (modifica `viajes` en el lugar).
+    Parametros:
+    - viajes: viajes de la ruta
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
+    - procesos: procesos para resolver los viajes en paralelo
+    - limite: instante (time.monotonic()) en que vence el tiempo; la primera pasada se hace
+      siempre (cuesta milisegundos), las siguientes solo si queda tiempo
+    - cache: {(recarga, paradas ordenadas, fin): (costo, paradas en orden)}, se completa acá
+    Salida:
+    - estadísticas: viajes resueltos, aciertos de cache y viajes reordenados
+    """
+    D = matriz_distancias
+    recargas = sorted(nodos_recarga)
+    cache = {} if cache is None else cache
+    resueltos = aciertos = reordenados = 0
+    cambio = True
+    while cambio:
+        cambio = False
+        claves = []
+        for t, viaje in enumerate(viajes):
+            fin = viajes[t + 1].recarga if t + 1 < len(viajes) else deposito_id
+            claves.append(_clave(viaje, fin) if len(viaje.paradas) <= MAX_PARADAS_HELD_KARP else None)
+        nuevas = list({c for c in claves if c is not None and c not in cache})
+        aciertos += sum(c is not None for c in claves) - len(nuevas)
+        cache.update(zip(nuevas, resolver_viajes(nuevas, D, procesos)))
+        resueltos += len(nuevas)
+
+        for viaje, clave in zip(viajes, claves):
+            if clave is None:
+                continue
+            costo, orden = cache[clave]
+            s = [viaje.recarga] + viaje.paradas + [clave[2]]
+            if costo < sum(D[a][b] for a, b in zip(s, s[1:])) - EPS:
+                cantidades: Dict[int, List[int]] = {}
+                for v, q in zip(viaje.paradas, viaje.cantidades):
+                    cantidades.setdefault(v, []).append(q)
+                viaje.paradas = list(orden)
+                viaje.cantidades = [cantidades[v].pop() for v in orden]
+                reordenados += 1
+
+        for t, viaje in enumerate(viajes):
+            p, f = (viajes[t - 1].paradas[-1] if t > 0 else deposito_id), viaje.paradas[0]
+            mejor = min(recargas, key=lambda r: D[p][r] + D[r][f])
+            if D[p][mejor] + D[mejor][f] < D[p][viaje.recarga] + D[viaje.recarga][f] - EPS:
+                viaje.recarga = mejor
+                cambio = time.monotonic() < limite
+    return {"viajes_held_karp": resueltos, "aciertos_held_karp": aciertos,
+            "reordenados_held_karp": reordenados}
+
+
+def reoptimizar_solucion(solucion: Solucion,
+                         matriz_distancias: List[List[float]],
+                         deposito_id: int,
+                         nodos_recarga: set,
+                         demanda_por_nodo: Dict[int, int],
+                         capacidad_camion: int,
+                         procesos: int = 1,
+                         limite: float = float('inf')) -> bool:
+    """
+    Reordena en forma exacta cada viaje de la ruta de `solucion` (la modifica en el lugar).
+    Parametros:
+    - solucion: solución a mejorar (ruta en el formato de `bt`)
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
+    - demanda_por_nodo: diccionario {nodo: cantidad de paquetes a entregar}
+    - capacidad_camion: capacidad máxima del camión
+    - procesos: procesos para resolver los viajes en paralelo
+    - limite: instante (time.monotonic()) en que vence el tiempo (ver reordenar_viajes)
+    Salida:
+    - True si mejoró la solución; en `estadisticas` quedan los viajes resueltos, los aciertos
+      de cache, los reordenados, el ahorro y el tiempo
+    """
+    inicio = time.perf_counter()
+    viajes = descomponer_ruta(solucion.ruta or [], deposito_id, nodos_recarga,
+                              demanda_por_nodo, capacidad_camion) if solucion.ruta else None
+    if not viajes or abs(costo_viajes(viajes, matriz_distancias, deposito_id) - solucion.distancia) > 1e-6:
+        return False  # la ruta no se pudo leer como viajes (o se leyó de otra forma)
+    estadisticas = reordenar_viajes(viajes, matriz_distancias, deposito_id, nodos_recarga,
+                                    procesos, limite)
+    distancia = costo_viajes(viajes, matriz_distancias, deposito_id)
+    mejoro = distancia < solucion.distancia - EPS
+    solucion.estadisticas.update(estadisticas)
+    solucion.estadisticas.update({
+        "ahorro_held_karp": solucion.distancia - distancia if mejoro else 0.0,
+        "segundos_held_karp": time.perf_counter() - inicio,
+    })
+    if mejoro:
+        ruta, hubs_usados = componer_ruta(viajes, deposito_id)
+        solucion.set(distancia, ruta, hubs_usados)
+    return mejoro
@@ -0,0 +1,268 @@
+import heapq
+import time
+from typing import List, Dict, Tuple
+
+from funciones import Solucion, primer_solucion_greedy
+from busqueda_local import Viaje, costo_viajes, componer_ruta, EPS
+
+#  Heurísticas constructivas (solución inicial para acotar el backtracking)
+
+
+def clientes(demanda: Dict[int, int], capacidad_camion: int) -> List[Tuple[int, int]]:
+    """Demanda como lista de (nodo, paquetes); un nodo que no entra en un solo viaje se parte."""
+    lista = []
+    for v, cnt in demanda.items():
+        while cnt > 0:
+            q = min(capacidad_camion, cnt)
+            lista.append((v, q))
+            cnt -= q
+    return lista
+
+
+def tour_gigante(matriz_distancias: List[List[float]],
+                 deposito_id: int,
+                 lista_clientes: List[Tuple[int, int]],
+                 limite: float = float('inf')) -> List[Tuple[int, int]]:
+    """Tour por todos los clientes ignorando la capacidad: vecino más cercano desde el
+    depósito y después 2-opt sobre el tour cerrado."""
+    D = matriz_distancias
+    pendientes = list(lista_clientes)
+    tour = []
+    u = deposito_id
+    while pendientes:
+        i = min(range(len(pendientes)), key=lambda k: D[u][pendientes[k][0]])
+        pendientes[i], pendientes[-1] = pendientes[-1], pendientes[i]
+        cliente = pendientes.pop()
+        tour.append(cliente)
+        u = cliente[0]
+
+    t = [(deposito_id, 0)] + tour + [(deposito_id, 0)]
+    mejoro = True
+    while mejoro and time.monotonic() < limite:
+        mejoro = False
+        for i in range(1, len(t) - 2):
+            a, b = t[i - 1][0], t[i][0]
+            fila_a, fila_b = D[a], D[b]
+            for j in range(i + 1, len(t) - 1):
+                c, e = t[j][0], t[j + 1][0]
+                if fila_a[c] + fila_b[e] - fila_a[b] - D[c][e] < -EPS:
+                    t[i:j + 1] = t[i:j + 1][::-1]
+                    b, fila_b = t[i][0], D[t[i][0]]
+                    mejoro = True
+    return t[1:-1]
+
+
+def particionar(matriz_distancias: List[List[float]],
+                deposito_id: int,
+                nodos_recarga: set,
+                tour: List[Tuple[int, int]],
+                capacidad_camion: int) -> List[Viaje]:
+    """
+    Split de Prins: corta el tour gigante en viajes que respetan la capacidad, en forma óptima
+    para ese orden. Es un camino mínimo sobre el DAG de cortes: V[j] = min_i V[i] + costo(i, j),
+    donde el viaje (i, j] sale del último cliente del viaje anterior, pasa por la mejor
+    recarga para llegar al cliente i+1 y recorre los clientes i+1..j en orden.
+    Parametros:
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
+    - tour: clientes (nodo, paquetes) en el orden del tour gigante
+    - capacidad_camion: capacidad máxima del camión
+    Salida:
+    - lista de viajes
+    """
+    D = matriz_distancias
+    m = len(tour)
+    recargas = list(nodos_recarga)
+    INF = float('inf')
+    V = [0.0] + [INF] * m
+    padre = [0] * (m + 1)
+    recarga_de = [deposito_id] * (m + 1)
+    for i in range(m):
+        if V[i] == INF:
+            continue
+        desde = tour[i - 1][0] if i > 0 else deposito_id
+        primero = tour[i][0]
+        r = min(recargas, key=lambda h: D[desde][h] + D[h][primero])
+        costo = D[desde][r] + D[r][primero]
+        carga = 0
+        for j in range(i, m):
+            carga += tour[j][1]
+            if carga > capacidad_camion:
+                break
+            if j > i:
+                costo += D[tour[j - 1][0]][tour[j][0]]
+            if V[i] + costo < V[j + 1]:
+                V[j + 1] = V[i] + costo
+                padre[j + 1] = i
+                recarga_de[j + 1] = r
+
+    viajes: List[Viaje] = []
+    j = m
+    while j > 0:
+        i = padre[j]
+        viajes.append(Viaje(recarga_de[j], [v for v, _ in tour[i:j]], [q for _, q in tour[i:j]]))
+        j = i
+    viajes.reverse()
+    return viajes
+
+
+def solucion_split(matriz_distancias: List[List[float]],
+                   deposito_id: int,
+                   nodos_recarga: set,
+                   demanda: Dict[int, int],
+                   capacidad_camion: int,
+                   limite: float = float('inf')) -> Solucion:
+    """
+    Ruta primero, viajes después: tour gigante (vecino más cercano + 2-opt) partido
+    con el Split de Prins, cargando cada viaje en su mejor recarga.
+    Parametros:
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
+    - demanda: diccionario {nodo: cantidad de paquetes a entregar}
+    - capacidad_camion: capacidad máxima del camión
+    - limite: instante (time.monotonic()) en que vence el tiempo (corta el 2-opt del tour)
+    Salida:
+    - solución construida (objeto Solucion)
+    """
+    tour = tour_gigante(matriz_distancias, deposito_id,
+                        clientes(demanda, capacidad_camion), limite)
+    viajes = particionar(matriz_distancias, deposito_id, nodos_recarga, tour, capacidad_camion)
+    ruta, hubs_usados = componer_ruta(viajes, deposito_id)
+    s = Solucion()
+    s.set(costo_viajes(viajes, matriz_distancias, deposito_id), ruta, hubs_usados)
+    return s
+
+
+def fusionar_ahorros(matriz_distancias: List[List[float]],
+                     nodos_recarga: set,
+                     lista_clientes: List[Tuple[int, int]],
+                     capacidad_camion: int,
+                     limite: float = float('inf')) -> List[List[int]]:
+    """
+    Clarke-Wright en paralelo: arranca con un viaje por cliente y une extremos de viajes
+    distintos en orden de ahorro decreciente mientras entren en el camión. Como cada viaje
+    sale de una recarga, el ahorro de unir i con j se mide contra la recarga más cercana:
+    s(i, j) = d(i, R) + d(R, j) - d(i, j). Los ahorros se precalculan en un heap.
+    Parametros:
+    - matriz_distancias: matriz de distancias entre nodos
+    - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
+    - lista_clientes: clientes (nodo, paquetes)
+    - capacidad_camion: capacidad máxima del camión
+    - limite: instante (time.monotonic()) en que vence el tiempo; deja de unir viajes
+    Salida:
+    - viajes como listas de índices de `lista_clientes` (sin recarga ni sentido asignados)
+    """
+    D = matriz_distancias
+    m = len(lista_clientes)
+    a_recarga = [min(D[v][r] for r in nodos_recarga) for v, _ in lista_clientes]
+    ahorros = []
+    for i in range(m):
+        vi, qi = lista_clientes[i]
+        fila_i = D[vi]
+        for j in range(i + 1, m):
+            vj, qj = lista_clientes[j]
+            ahorro = a_recarga[i] + a_recarga[j] - fila_i[vj]
+            if ahorro > EPS and qi + qj <= capacidad_camion:
+                ahorros.append((-ahorro, i, j))
+    heapq.heapify(ahorros)
+
+    viaje_de = list(range(m))
+    viajes = {i: [i] for i in range(m)}
+    cargas = {i: q for i, (_, q) in enumerate(lista_clientes)}
+    extraidos = 0
+    while ahorros:
+        extraidos += 1
+        if not extraidos & 1023 and time.monotonic() >= limite:
+            break
+        _, i, j = heapq.heappop(ahorros)
+        a, b = viaje_de[i], viaje_de[j]
+        if a == b or cargas[a] + cargas[b] > capacidad_camion:
+            continue
+        va, vb = viajes[a], viajes[b]
+        # i tiene que quedar al final de su viaje y j al principio del suyo
+        if va[-1] != i:
+            if va[0] != i:
+                continue
+            va.reverse()
+        if vb[0] != j:
+            if vb[-1] != j:
+                continue
+            vb.reverse()
+        va.extend(vb)
+        cargas[a] += cargas.pop(b)
+        for k in viajes.pop(b):
+            viaje_de[k] = a
+    return list(viajes.values())
+
+
+def encadenar(matriz_distancias: List[List[float]],
+              deposito_id: int,
+              nodos_recarga: set,
+              lista_clientes: List[Tuple[int, int]],
+              grupos: List[List[int]]) -> List[Viaje]:
+    """Ordena los viajes por vecino más cercano: desde donde quedó el camión elige el viaje,
+    el sentido y la recarga que minimizan d(u, r) + d(r, primera parada)."""
+    D = matriz_distancias
+    recargas = list(nodos_recarga)
+    pendientes = list(grupos)
+    viajes: List[Viaje] = []
+    u = deposito_id
+    while pendientes:
+        fila_u = D[u]
+        mejor = (float('inf'), 0, False, deposito_id)
+        for k, grupo in enumerate(pendientes):
+            for invertido, inicio in ((False, grupo[0]), (True, grupo[-1])):
+                v = lista_clientes[inicio][0]
+                for r in recargas:
+                    c = fila_u[r] + D[r][v]
+                    if c < mejor[0]:
+                        mejor = (c, k, invertido, r)
+                if len(grupo) == 1:
+                    break
+        _, k, invertido, r = mejor
+        pendientes[k], pendientes[-1] = pendientes[-1], pendientes[k]
+        grupo = pendientes.pop()
+        if invertido:
+            grupo = grupo[::-1]
+        viajes.append(Viaje(r, [lista_clientes[i][0] for i in grupo],
+                            [lista_clientes[i][1] for i in grupo]))
+        u = viajes[-1].paradas[-1]
+    return viajes
+
+
+def solucion_ahorros(matriz_distancias: List[List[float]],
+                     deposito_id: int,
+                     nodos_recarga: set,
+                     demanda: Dict[int, int],
+                     capacidad_camion: int,
+                     limite: float = float('inf')) -> Solucion:
+    """
+    Ahorros de Clarke-Wright: arma los viajes uniendo clientes por ahorro y después los
+    encadena, cargando cada uno en la recarga (hub o depósito) que menos cuesta.
+    Parametros:
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
+    - demanda: diccionario {nodo: cantidad de paquetes a entregar}
+    - capacidad_camion: capacidad máxima del camión
+    - limite: instante (time.monotonic()) en que vence el tiempo (corta las uniones)
+    Salida:
+    - solución construida (objeto Solucion)
+    """
+    lista = clientes(demanda, capacidad_camion)
+    grupos = fusionar_ahorros(matriz_distancias, nodos_recarga, lista, capacidad_camion, limite)
+    viajes = encadenar(matriz_distancias, deposito_id, nodos_recarga, lista, grupos)
+    ruta, hubs_usados = componer_ruta(viajes, deposito_id)
+    s = Solucion()
+    s.set(costo_viajes(viajes, matriz_distancias, deposito_id), ruta, hubs_usados)
+    return s
+
+
+# Constructores intercambiables de la solución inicial (misma firma)
+CONSTRUCTORES = {
+    "greedy": primer_solucion_greedy,
+    "split": solucion_split,
+    "ahorros": solucion_ahorros,
+}
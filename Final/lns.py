@@ -0,0 +1,358 @@
+import math
+import random
+import time
+from typing import List, Dict, Optional, Callable, Tuple
+
+from funciones import Solucion
+from busqueda_local import Viaje, descomponer_ruta, costo_viajes, componer_ruta, EPS
+
+#  Búsqueda en vecindarios grandes adaptativa (ALNS, "ruin and recreate")
+#
+# En cada iteración se quita un subconjunto de entregas de la solución actual y se vuelven a
+# insertar, y después cada viaje se reasigna a la recarga (hub o depósito) más conveniente:
+#
+# - destrucción: al azar, por cercanía (las entregas más próximas a una semilla, según las
+#   coordenadas de los nodos si se conocen, o según la distancia en el grafo) o las de peor
+#   costo (las que más ahorran al quitarlas)
+# - reparación: inserción más barata o por arrepentimiento (regret-2: primero la entrega que
+#   más perdería si no consigue su mejor viaje); una entrega también puede abrir un viaje nuevo
+#
+# La nueva solución se acepta como en el recocido simulado, con una temperatura que baja con
+# el presupuesto consumido. Los operadores se eligen por ruleta y sus pesos se adaptan por
+# segmentos según lo que lograron (nueva mejor, mejor que la actual o aceptada).
+
+# Puntaje de un operador según el resultado de la iteración
+PUNTAJE_MEJOR_GLOBAL = 33
+PUNTAJE_MEJORA = 9
+PUNTAJE_ACEPTADA = 13
+# Iteraciones por segmento y velocidad de reacción de los pesos
+SEGMENTO = 50
+REACCION = 0.1
+# Al arrancar, una solución un 5% peor se acepta con probabilidad 1/2; al final, T0 * ENFRIAMIENTO
+EMPEORAMIENTO_INICIAL = 0.05
+ENFRIAMIENTO_TOTAL = 1e-3
+# Entregas a quitar por iteración: entre MIN_QUITAR y la fracción FRACCION_QUITAR (tope MAX_QUITAR)
+MIN_QUITAR = 4
+FRACCION_QUITAR = 0.25
+MAX_QUITAR = 30
+# Aleatoriedad de la destrucción por peor costo (mayor = más determinista)
+POTENCIA_PEOR = 3
+# Presupuesto de iteraciones por nodo con demanda cuando no hay límite de tiempo
+ITERACIONES_POR_CLIENTE = 20
+# Presupuesto de iteraciones cuando corta el límite de tiempo
+ITERACIONES_SIN_TOPE = 2 ** 62
+
+
+def copiar(viajes: List[Viaje]) -> List[Viaje]:
+    return [Viaje(v.recarga, v.paradas.copy(), v.cantidades.copy()) for v in viajes]
+
+
+class ALNS:
+    """Destrucción y reparación con pesos adaptativos sobre una lista de viajes."""
+
+    def __init__(self,
+                 matriz_distancias: List[List[float]],
+                 deposito_id: int,
+                 nodos_recarga: set,
+                 capacidad_camion: int,
+                 coordenadas: Optional[Dict[int, Tuple[float, float]]] = None,
+                 semilla: int = 0):
+        self.D = matriz_distancias
+        self.deposito_id = deposito_id
+        self.recargas = sorted(nodos_recarga)
+        self.capacidad = capacidad_camion
+        self.coordenadas = coordenadas
+        self.azar = random.Random(semilla)
+        self.destruccion = {"azar": self._quitar_azar, "cercania": self._quitar_cercanas,
+                            "peor": self._quitar_peores}
+        self.reparacion = {"barata": self._insertar_barata, "arrepentimiento": self._insertar_arrepentimiento}
+        self.pesos = {nombre: 1.0 for nombre in list(self.destruccion) + list(self.reparacion)}
+        # _via[(p, v)]: mejor forma de ir de p a v pasando por una recarga
+        self._via: Dict[Tuple[int, int], Tuple[float, int]] = {}
+        self.iteraciones = 0
+        self.mejoras = 0
+
+    # --- Destrucción: cada operador devuelve las posiciones (viaje, parada) a quitar ---
+
+    def _quitar_azar(self, viajes: List[Viaje], k: int) -> List[Tuple[int, int]]:
+        posiciones = [(t, i) for t, viaje in enumerate(viajes) for i in range(len(viaje.paradas))]
+        return self.azar.sample(posiciones, k)
+
+    def _cercania(self, v: int, w: int) -> float:
+        if self.coordenadas is not None and v in self.coordenadas and w in self.coordenadas:
+            (xv, yv), (xw, yw) = self.coordenadas[v], self.coordenadas[w]
+            return math.hypot(xv - xw, yv - yw)
+        return self.D[v][w]
+
+    def _quitar_cercanas(self, viajes: List[Viaje], k: int) -> List[Tuple[int, int]]:
+        posiciones = [(t, i) for t, viaje in enumerate(viajes) for i in range(len(viaje.paradas))]
+        ts, is_ = self.azar.choice(posiciones)
+        semilla = viajes[ts].paradas[is_]
+        posiciones.sort(key=lambda p: self._cercania(semilla, viajes[p[0]].paradas[p[1]]))
+        return posiciones[:k]
+
+    def _quitar_peores(self, viajes: List[Viaje], k: int) -> List[Tuple[int, int]]:
+        D = self.D
+        ahorros = []
+        for t, viaje in enumerate(viajes):
+            previo = viajes[t - 1].paradas[-1] if t > 0 else self.deposito_id
+            fin = viajes[t + 1].recarga if t + 1 < len(viajes) else self.deposito_id
+            paradas = viaje.paradas
+            for i, v in enumerate(paradas):
+                b = paradas[i + 1] if i + 1 < len(paradas) else fin
+                if len(paradas) == 1:  # quitarla elimina el viaje entero
+                    r = viaje.recarga
+                    ahorro = D[previo][r] + D[r][v] + D[v][b] - D[previo][b]
+                else:
+                    a = paradas[i - 1] if i > 0 else viaje.recarga
+                    ahorro = D[a][v] + D[v][b] - D[a][b]
+                ahorros.append((ahorro, t, i))
+        ahorros.sort(reverse=True)
+        elegidas = []
+        for _ in range(k):
+            _, t, i = ahorros.pop(int(len(ahorros) * self.azar.random() ** POTENCIA_PEOR))
+            elegidas.append((t, i))
+        return elegidas
+
+    @staticmethod
+    def _quitar(viajes: List[Viaje], posiciones: List[Tuple[int, int]]) -> Tuple[List[Viaje], List[Tuple[int, int]]]:
+        """Viajes sin las entregas de `posiciones` (sin viajes vacíos) y las entregas quitadas."""
+        marcadas = set(posiciones)
+        quedan: List[Viaje] = []
+        quitadas = []
+        for t, viaje in enumerate(viajes):
+            nuevo = Viaje(viaje.recarga)
+            for i, (v, q) in enumerate(zip(viaje.paradas, viaje.cantidades)):
+                if (t, i) in marcadas:
+                    quitadas.append((v, q))
+                else:
+                    nuevo.paradas.append(v)
+                    nuevo.cantidades.append(q)
+            if nuevo.paradas:
+                quedan.append(nuevo)
+        return quedan, quitadas
+
+    # --- Reparación ---
+
+    def _en_viaje(self, viajes: List[Viaje], t: int, v: int) -> Tuple[float, int]:
+        """(delta, posición) de la inserción más barata de v en el viaje t."""
+        D, fila_v = self.D, self.D[v]
+        paradas = viajes[t].paradas
+        fin = viajes[t + 1].recarga if t + 1 < len(viajes) else self.deposito_id
+        c = viajes[t].recarga
+        mejor, pos = float('inf'), 0
+        for k in range(len(paradas) + 1):
+            e = paradas[k] if k < len(paradas) else fin
+            delta = D[c][v] + fila_v[e] - D[c][e]
+            if delta < mejor:
+                mejor, pos = delta, k
+            c = e
+        return mejor, pos
+
+    def _por_recarga(self, p: int, v: int) -> Tuple[float, int]:
+        """(distancia, recarga) del mejor camino p -> recarga -> v (memoizado: D no cambia)."""
+        clave = (p, v)
+        valor = self._via.get(clave)
+        if valor is None:
+            D = self.D
+            r = min(self.recargas, key=lambda h: D[p][h] + D[h][v])
+            valor = self._via[clave] = (D[p][r] + D[r][v], r)
+        return valor
+
+    def _viaje_nuevo(self, viajes: List[Viaje], v: int) -> Tuple[float, int, int, int]:
+        """Mejor viaje nuevo solo para v: (delta, viaje tras el que se abre, -1, recarga)."""
+        D, fila_v = self.D, self.D[v]
+        mejor = (float('inf'), -1, -1, self.deposito_id)
+        p = self.deposito_id
+        for t in range(-1, len(viajes)):
+            if t >= 0:
+                p = viajes[t].paradas[-1]
+            e = viajes[t + 1].recarga if t + 1 < len(viajes) else self.deposito_id
+            llegar, r = self._por_recarga(p, v)
+            delta = llegar + fila_v[e] - D[p][e]
+            if delta < mejor[0]:
+                mejor = (delta, t, -1, r)
+        return mejor
+
+    @staticmethod
+    def _insertar(viajes: List[Viaje], cargas: List[int], opcion: Tuple[float, int, int, int], v: int, q: int) -> None:
+        _, t, pos, r = opcion
+        if pos < 0:
+            viajes.insert(t + 1, Viaje(r, [v], [q]))
+            cargas.insert(t + 1, q)
+        else:
+            viajes[t].paradas.insert(pos, v)
+            viajes[t].cantidades.insert(pos, q)
+            cargas[t] += q
+
+    def _insertar_barata(self, viajes: List[Viaje], quitadas: List[Tuple[int, int]]) -> None:
+        cargas = [viaje.carga for viaje in viajes]
+        self.azar.shuffle(quitadas)
+        for v, q in quitadas:
+            opcion = self._viaje_nuevo(viajes, v)
+            for t in range(len(viajes)):
+                if cargas[t] + q <= self.capacidad:
+                    delta, pos = self._en_viaje(viajes, t, v)
+                    if delta < opcion[0]:
+                        opcion = (delta, t, pos, viajes[t].recarga)
+            self._insertar(viajes, cargas, opcion, v, q)
+
+    def _insertar_arrepentimiento(self, viajes: List[Viaje], quitadas: List[Tuple[int, int]]) -> None:
+        """Regret-2 entre viajes. La mejor inserción de cada entrega en cada viaje se guarda
+        (por identidad del viaje) y solo se recalcula en los viajes que cambiaron."""
+        cargas = [viaje.carga for viaje in viajes]
+        pendientes = list(quitadas)
+        en_viaje = [{id(viaje): self._en_viaje(viajes, t, v) for t, viaje in enumerate(viajes)}
+                    for v, _ in pendientes]
+        nuevo = [self._viaje_nuevo(viajes, v) for v, _ in pendientes]
+        while pendientes:
+            elegida, opcion, mayor = 0, None, -1.0
+            indice = {id(viaje): t for t, viaje in enumerate(viajes)}
+            for idx, (v, q) in enumerate(pendientes):
+                primera, segunda = nuevo[idx], (float('inf'),)
+                for clave, (delta, pos) in en_viaje[idx].items():
+                    t = indice[clave]
+                    if cargas[t] + q > self.capacidad or delta >= segunda[0]:
+                        continue
+                    if delta < primera[0]:
+                        primera, segunda = (delta, t, pos, viajes[t].recarga), primera
+                    else:
+                        segunda = (delta, t, pos, viajes[t].recarga)
+                arrepentimiento = segunda[0] - primera[0]
+                if arrepentimiento > mayor:
+                    elegida, opcion, mayor = idx, primera, arrepentimiento
+            v, q = pendientes.pop(elegida)
+            del en_viaje[elegida]
+            del nuevo[elegida]
+            self._insertar(viajes, cargas, opcion, v, q)
+            _, t, pos, _ = opcion
+            # cambió el viaje t; si se abrió uno nuevo (t + 1), también cambió el fin del t
+            tocados = [u for u in ((t, t + 1) if pos < 0 else (t,)) if 0 <= u < len(viajes)]
+            # los huecos entre viajes solo cambian al abrir un viaje o al agregar al final de uno
+            huecos = pos < 0 or pos == len(viajes[t].paradas) - 1
+            for idx, (w, _) in enumerate(pendientes):
+                for u in tocados:
+                    en_viaje[idx][id(viajes[u])] = self._en_viaje(viajes, u, w)
+                if huecos:
+                    nuevo[idx] = self._viaje_nuevo(viajes, w)
+
+    def _reasignar_recargas(self, viajes: List[Viaje]) -> None:
+        """Cada viaje carga en la recarga que minimiza llegar desde el anterior y salir a su primera parada."""
+        D = self.D
+        previo = self.deposito_id
+        for viaje in viajes:
+            primera = viaje.paradas[0]
+            viaje.recarga = min(self.recargas, key=lambda r: D[previo][r] + D[r][primera])
+            previo = viaje.paradas[-1]
+
+    def _elegir(self, nombres) -> str:
+        return self.azar.choices(list(nombres), weights=[self.pesos[n] for n in nombres])[0]
+
+    def optimizar(self, viajes: List[Viaje], iteraciones: int, limite: float = float('inf'),
+                  al_mejorar: Optional[Callable[[List[Viaje], float], None]] = None) -> List[Viaje]:
+        """Corre ALNS desde `viajes` hasta agotar `iteraciones` o llegar a `limite`. Llama a
+        `al_mejorar(viajes, costo)` con cada nueva mejor solución; devuelve la mejor."""
+        D, dep, azar = self.D, self.deposito_id, self.azar
+        inicio = time.monotonic()
+        duracion = limite - inicio
+        actual, costo_actual = viajes, costo_viajes(viajes, D, dep)
+        mejor, costo_mejor = copiar(viajes), costo_actual
+        t0 = EMPEORAMIENTO_INICIAL * costo_actual / math.log(2)
+        temperatura = t0
+        puntajes = {nombre: 0.0 for nombre in self.pesos}
+        usos = {nombre: 0 for nombre in self.pesos}
+        entregas = sum(len(viaje.paradas) for viaje in viajes)
+        if entregas < 2:
+            return mejor
+        for it in range(iteraciones):
+            progreso = it / iteraciones
+            if duracion != float('inf'):
+                ahora = time.monotonic()
+                if ahora >= limite:
+                    break
+                progreso = max(progreso, (ahora - inicio) / duracion)
+            temperatura = t0 * ENFRIAMIENTO_TOTAL ** progreso
+            self.iteraciones += 1
+
+            nombre_d = self._elegir(self.destruccion)
+            nombre_r = self._elegir(self.reparacion)
+            k = azar.randint(min(MIN_QUITAR, entregas), max(min(MIN_QUITAR, entregas),
+                                                              min(MAX_QUITAR, int(FRACCION_QUITAR * entregas))))
+            candidata, quitadas = self._quitar(actual, self.destruccion[nombre_d](actual, k))
+            self.reparacion[nombre_r](candidata, quitadas)
+            self._reasignar_recargas(candidata)
+            costo = costo_viajes(candidata, D, dep)
+
+            puntaje = 0
+            if costo < costo_actual - EPS or azar.random() < math.exp(-(costo - costo_actual) / temperatura):
+                puntaje = PUNTAJE_MEJORA if costo < costo_actual - EPS else PUNTAJE_ACEPTADA
+                actual, costo_actual = candidata, costo
+                if costo < costo_mejor - EPS:
+                    puntaje = PUNTAJE_MEJOR_GLOBAL
+                    mejor, costo_mejor = copiar(candidata), costo
+                    self.mejoras += 1
+                    if al_mejorar is not None:
+                        al_mejorar(mejor, costo_mejor)
+            for nombre in (nombre_d, nombre_r):
+                puntajes[nombre] += puntaje
+                usos[nombre] += 1
+            if not (it + 1) % SEGMENTO:
+                for nombre, usado in usos.items():
+                    if usado:
+                        self.pesos[nombre] = (1 - REACCION) * self.pesos[nombre] + REACCION * puntajes[nombre] / usado
+                    puntajes[nombre], usos[nombre] = 0.0, 0
+        return mejor
+
+
+def reconstruir_solucion(solucion: Solucion,
+                         matriz_distancias: List[List[float]],
+                         deposito_id: int,
+                         nodos_recarga: set,
+                         demanda_por_nodo: Dict[int, int],
+                         capacidad_camion: int,
+                         iteraciones: int,
+                         limite: float = float('inf'),
+                         semilla: int = 0,
+                         al_mejorar: Optional[Callable[[Solucion], None]] = None,
+                         coordenadas: Optional[Dict[int, Tuple[float, float]]] = None) -> bool:
+    """
+    Mejora `solucion` con ALNS partiendo de su ruta (la modifica en el lugar).
+    Parametros:
+    - solucion: solución inicial (ruta en el formato de `bt` o de las heurísticas)
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
+    - demanda_por_nodo: diccionario {nodo: cantidad de paquetes a entregar}
+    - capacidad_camion: capacidad máxima del camión
+    - iteraciones: presupuesto de iteraciones de destrucción y reparación
+    - limite: instante (time.monotonic()) en que vence el tiempo
+    - semilla: semilla del generador aleatorio
+    - al_mejorar: se llama con `solucion` cada vez que mejora
+    - coordenadas: {nodo: (x, y)} para la destrucción por cercanía (None = distancia en el grafo)
+    Salida:
+    - True si mejoró la solución; en `estadisticas` quedan iteraciones, mejoras, el peso
+      final de cada operador y el tiempo
+    """
+    inicio = time.perf_counter()
+    viajes = descomponer_ruta(solucion.ruta or [], deposito_id, nodos_recarga,
+                              demanda_por_nodo, capacidad_camion) if solucion.ruta else None
+    if not viajes or abs(costo_viajes(viajes, matriz_distancias, deposito_id) - solucion.distancia) > 1e-6:
+        return False  # la ruta no se pudo leer como viajes (o se leyó de otra forma)
+    distancia_inicial = solucion.distancia
+    alns = ALNS(matriz_distancias, deposito_id, nodos_recarga, capacidad_camion, coordenadas, semilla)
+
+    def registrar(mejores: List[Viaje], costo: float) -> None:
+        if costo < solucion.distancia - EPS:
+            ruta, hubs_usados = componer_ruta(mejores, deposito_id)
+            solucion.set(costo, ruta, hubs_usados)
+            if al_mejorar is not None:
+                al_mejorar(solucion)
+
+    alns.optimizar(viajes, iteraciones, limite, registrar)
+    solucion.estadisticas.update({
+        "iteraciones_lns": alns.iteraciones,
+        "mejoras_lns": alns.mejoras,
+        "segundos_lns": time.perf_counter() - inicio,
+    })
+    solucion.estadisticas.update({f"peso_lns_{nombre}": peso for nombre, peso in alns.pesos.items()})
+    return solucion.distancia < distancia_inicial - EPS
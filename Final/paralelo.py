@@ -0,0 +1,239 @@
+import multiprocessing as mp
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple
+
+import funciones as f
+from cotas import CotasInferiores, ContextoCotas
+from transposicion import TablaTransposicion
+
+#  Branch-and-bound paralelo
+#
+# Los primeros niveles del árbol del backtracking (primera recarga x primer destino, o más
+# niveles si hacen falta) se expanden en el proceso principal y cada subárbol se resuelve
+# como una tarea independiente con bt_iterativo en un pool de procesos. La mejor distancia
+# global vive en un multiprocessing.Value compartido: cada trabajador la relee para podar y
+# publica sus mejoras, así que todos podan contra el mejor incumbente conocido.
+#
+# Hay muchas más tareas que procesos y se reparten de a una (imap_unordered con chunksize=1):
+# el proceso que termina un subárbol toma el siguiente pendiente, y los subárboles que se
+# podan enseguida no dejan procesos ociosos. La matriz de distancias se comparte con
+# MatrizCompartida (shared_memory, o el archivo de --distancias-mmap si ya viene de ahí) en
+# lugar de copiarse a cada proceso.
+
+# Tareas a generar por proceso (más tareas = mejor balance de carga)
+TAREAS_POR_PROCESO = 16
+
+
+@dataclass
+class Tarea:
+    """Prefijo de decisiones del backtracking: el estado al que lleva y cómo se llegó."""
+    u: int
+    carga: int
+    restante: int
+    dist: float
+    ruta: List[int]
+    hubs: int = 0
+    # entregas hechas en el prefijo: (nodo, paquetes)
+    entregas: List[Tuple[int, int]] = field(default_factory=list)
+
+
+def expandir(tarea: Tarea,
+             matriz_distancias: List[List[float]],
+             nodos_recarga: set,
+             capacidad_camion: int,
+             demanda: List[int],
+             estado: f.EstadoBT) -> List[Tarea]:
+    """Hijos de `tarea` en el mismo orden en que los recorre el backtracking (vacío si es hoja)."""
+    actual = demanda.copy()
+    for v, entrego in tarea.entregas:
+        actual[v] -= entrego
+    u, fila_u = tarea.u, matriz_distancias[tarea.u]
+    hijos: List[Tarea] = []
+    if tarea.restante == 0:
+        return hijos
+    if tarea.carga == 0:
+        para_cargar = min(capacidad_camion, tarea.restante)
+        hubs = tarea.hubs | estado.bits_hub.get(u, 0)
+        if u in nodos_recarga:
+            hijos.append(Tarea(u, para_cargar, tarea.restante, tarea.dist, tarea.ruta, hubs, tarea.entregas))
+        for r in nodos_recarga:
+            if r != u and fila_u[r] != float('inf'):
+                hijos.append(Tarea(r, para_cargar, tarea.restante, tarea.dist + fila_u[r],
+                                   tarea.ruta + [r], hubs | estado.bits_hub.get(r, 0), tarea.entregas))
+        return hijos
+    for v in estado.orden_destinos[u]:
+        if actual[v] == 0:
+            continue
+        entrego = min(tarea.carga, actual[v])
+        hijos.append(Tarea(v, tarea.carga - entrego, tarea.restante - entrego, tarea.dist + fila_u[v],
+                           tarea.ruta + [v], tarea.hubs, tarea.entregas + [(v, entrego)]))
+    return hijos
+
+
+def generar_tareas(tarea_raiz: Tarea,
+                   cantidad: int,
+                   matriz_distancias: List[List[float]],
+                   nodos_recarga: set,
+                   capacidad_camion: int,
+                   demanda: List[int],
+                   estado: f.EstadoBT) -> List[Tarea]:
+    """Expande el árbol nivel por nivel hasta tener al menos `cantidad` tareas (o solo hojas).
+    Las tareas quedan ordenadas por distancia del prefijo, para resolver primero las prometedoras."""
+    tareas = [tarea_raiz]
+    while len(tareas) < cantidad:
+        siguientes: List[Tarea] = []
+        for tarea in tareas:
+            hijos = expandir(tarea, matriz_distancias, nodos_recarga, capacidad_camion, demanda, estado)
+            siguientes.extend(hijos if hijos else [tarea])
+        if len(siguientes) == len(tareas):
+            break
+        tareas = siguientes
+    tareas.sort(key=lambda t: t.dist)
+    return tareas
+
+
+# Estado de cada proceso del pool (lo arma _iniciar_trabajador)
+_trabajador: Dict[str, object] = {}
+
+
+def _iniciar_trabajador(referencia: Tuple[str, str], incumbente, deposito_id: int, hubs: List[int],
+                        demanda: List[int], capacidad_camion: int, cotas: Tuple[str, ...],
+                        memoria_transposicion_mb: float, max_llamadas_sin_mejora: int,
+                        limite: float) -> None:
+    """Se adjunta a la matriz compartida y precalcula lo estático de la búsqueda."""
+    compartida = f.MatrizCompartida.adjuntar(referencia)
+    matriz = compartida.filas
+    nodos_recarga = set(hubs) | {deposito_id}
+    nodos_demanda = [v for v, cnt in enumerate(demanda) if cnt > 0]
+    orden_destinos = f.ordenar_destinos(matriz, list(nodos_recarga | set(nodos_demanda)), nodos_demanda)
+    hubs_indexados = [h for h in dict.fromkeys(hubs) if h != deposito_id]
+    _trabajador.update(
+        compartida=compartida,
+        matriz=matriz,
+        incumbente=incumbente,
+        deposito_id=deposito_id,
+        nodos_recarga=nodos_recarga,
+        demanda=demanda,
+        capacidad_camion=capacidad_camion,
+        orden_destinos=orden_destinos,
+        hubs_indexados=hubs_indexados,
+        bits_hub={h: 1 << i for i, h in enumerate(hubs_indexados)},
+        contexto=ContextoCotas(matriz, deposito_id, nodos_demanda, nodos_recarga,
+                               capacidad_camion, orden_destinos),
+        cotas=cotas,
+        memoria_transposicion_mb=memoria_transposicion_mb,
+        max_llamadas_sin_mejora=max_llamadas_sin_mejora,
+        limite=limite,
+    )
+
+
+def _resolver_tarea(tarea: Tarea) -> Tuple[float, List[int], set, int, bool, bool, Dict[str, float]]:
+    """Corre bt_iterativo sobre el subárbol de la tarea.
+    Devuelve (distancia, ruta, hubs usados, llamadas, si cortó, si cortó por tiempo, estadísticas);
+    la distancia es inf si no mejoró al incumbente global."""
+    w = _trabajador
+    if time.monotonic() >= w["limite"]:
+        return float('inf'), [], set(), 0, True, True, {}
+    demanda = w["demanda"].copy()
+    for v, entrego in tarea.entregas:
+        demanda[v] -= entrego
+    contexto = w["contexto"]
+    msts_antes = contexto.msts_exactos
+    mejor = f.Solucion()
+    mejor.distancia = w["incumbente"].value
+    tt = (TablaTransposicion(len(demanda), w["demanda"], w["capacidad_camion"], w["memoria_transposicion_mb"])
+          if w["memoria_transposicion_mb"] > 0 else None)
+    estado = f.EstadoBT(
+        mejor=mejor,
+        max_llamadas_sin_mejora=w["max_llamadas_sin_mejora"],
+        bits_hub=w["bits_hub"],
+        hubs_indexados=w["hubs_indexados"],
+        orden_destinos=w["orden_destinos"],
+        bit_demanda=contexto.bit_demanda,
+        cotas=CotasInferiores(list(w["cotas"]), contexto) if w["cotas"] else None,
+        transposicion=tt,
+        incumbente=w["incumbente"],
+        limite=w["limite"],
+    )
+    f.bt_iterativo(tarea.u, tarea.carga, tarea.restante, tarea.dist, tarea.ruta.copy(),
+                   w["matriz"], w["nodos_recarga"], w["capacidad_camion"], demanda, estado,
+                   w["deposito_id"], False, tarea.hubs, contexto.mascara(demanda),
+                   tt.huella(demanda) if tt is not None else 0)
+    estadisticas: Dict[str, float] = {}
+    if estado.cotas is not None:
+        estadisticas.update(estado.cotas.estadisticas())
+        estadisticas["msts_exactos"] = contexto.msts_exactos - msts_antes
+    if tt is not None:
+        estadisticas.update(tt.estadisticas())
+    if mejor.ruta is None:
+        return float('inf'), [], set(), estado.contador_llamadas, estado.stop, estado.vencido, estadisticas
+    return (mejor.distancia, mejor.ruta, mejor.hubs_usados, estado.contador_llamadas, estado.stop,
+            estado.vencido, estadisticas)
+
+
+def bt_paralelo(estado: f.EstadoBT,
+                matriz_distancias: List[List[float]],
+                deposito_id: int,
+                hubs: List[int],
+                demanda: List[int],
+                capacidad_camion: int,
+                procesos: int,
+                cotas: Tuple[str, ...],
+                memoria_transposicion_mb: float) -> Dict[str, float]:
+    """
+    Branch-and-bound en paralelo sobre `procesos` procesos.
+    Parametros:
+    - estado: estado del backtracking ya armado (incumbente inicial, orden de destinos, meseta)
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - hubs: lista de nodos que son hubs
+    - demanda: vector de paquetes pendientes indexado por nodo
+    - capacidad_camion: capacidad máxima del camión
+    - procesos: cantidad de procesos del pool
+    - cotas: nombres de las cotas inferiores que usa cada trabajador
+    - memoria_transposicion_mb: tope de memoria de la tabla de transposición de cada tarea
+    Salida:
+    - estadísticas agregadas de las tareas (actualiza estado.mejor, estado.contador_llamadas,
+      estado.stop, que queda en True si alguna tarea cortó, y estado.vencido)
+    """
+    nodos_recarga = set(hubs) | {deposito_id}
+    raiz = Tarea(deposito_id, 0, sum(demanda), 0.0, [deposito_id])
+    tareas = generar_tareas(raiz, TAREAS_POR_PROCESO * procesos, matriz_distancias, nodos_recarga,
+                            capacidad_camion, demanda, estado)
+    # el presupuesto de meseta de una búsqueda secuencial se reparte entre las tareas, escalado
+    # por la cantidad de procesos (cada uno recorre en total lo que recorrería uno solo)
+    meseta = max(1_000, estado.max_llamadas_sin_mejora * procesos // len(tareas))
+
+    contexto = mp.get_context()
+    incumbente = contexto.Value('d', estado.mejor.distancia)
+    compartida, propia = f.MatrizCompartida.compartir(matriz_distancias)
+    estadisticas: Dict[str, float] = {}
+    try:
+        with contexto.Pool(procesos, initializer=_iniciar_trabajador,
+                           initargs=(compartida.referencia, incumbente, deposito_id, hubs, demanda,
+                                     capacidad_camion, cotas, memoria_transposicion_mb, meseta,
+                                     estado.limite)) as pool:
+            for dist, ruta, hubs_usados, llamadas, corto, vencido, parciales in pool.imap_unordered(
+                    _resolver_tarea, tareas, chunksize=1):
+                estado.contador_llamadas += llamadas
+                estado.stop = estado.stop or corto
+                estado.vencido = estado.vencido or vencido
+                if dist < estado.mejor.distancia:
+                    estado.mejor.set(dist, ruta, hubs_usados)
+                    if estado.al_mejorar is not None:  # se avisa al terminar la tarea que mejoró
+                        estado.al_mejorar(estado.mejor)
+                for clave, valor in parciales.items():
+                    if clave == "tt_entradas":
+                        estadisticas[clave] = max(estadisticas.get(clave, 0), valor)
+                    else:
+                        estadisticas[clave] = estadisticas.get(clave, 0) + valor
+    finally:
+        if propia:
+            compartida.liberar()
+
+    if estadisticas.get("tt_consultas"):
+        estadisticas["tt_tasa_aciertos"] = estadisticas["tt_aciertos"] / estadisticas["tt_consultas"]
+    estadisticas["procesos"] = procesos
+    estadisticas["tareas_paralelas"] = len(tareas)
+    return estadisticas
@@ -0,0 +1,132 @@
+import multiprocessing as mp
+import time
+from typing import List, Dict, Optional, Callable, Tuple, Any
+
+import funciones as f
+
+#  Portafolio de estrategias en carrera
+#
+# Qué método gana depende de la instancia (el backtracking en las chicas, las metaheurísticas
+# en las grandes), así que el portafolio corre varias estrategias a la vez, cada una en su
+# proceso, sobre la misma matriz de distancias (MatrizCompartida en shared_memory o el archivo
+# de --distancias-mmap, sin copiarla) y con el mismo instante límite. Se queda con la mejor
+# solución y con el nombre de la estrategia ganadora, para poder ajustar la mezcla.
+# La cota inferior de una estrategia vale en el modelo de carga del backtracking, así que solo
+# se informa (y solo corta a las demás cuando alcanza a su distancia) si la ganadora es una de
+# las que recorren ese modelo (COTA_PROPIA); las rutas de las metaheurísticas salen de él.
+#
+# Cada estrategia es un conjunto de argumentos para `resolver_problema`. Con más estrategias
+# que procesos, las que quedan esperan a que se libere uno y corren con el tiempo que resta.
+
+ESTRATEGIAS: Dict[str, Dict[str, Any]] = {
+    # las heurísticas constructivas más búsqueda local (el backtracking corta enseguida)
+    "constructivo": {"metodo": "bt", "max_llamadas_sin_mejora": 1},
+    "bt": {"metodo": "bt"},
+    # backtracking con otro orden de exploración de los destinos
+    "bt_ruido": {"metodo": "bt", "ruido_orden": 0.3, "semilla": 1},
+    # backtracking que ramifica solo entre los destinos más cercanos (y va ampliando)
+    "bt_candidatos": {"metodo": "bt", "candidatos": 2},
+    "recocido": {"metodo": "recocido", "semilla": 0},
+    "lns": {"metodo": "lns", "semilla": 0},
+    "haz": {"metodo": "haz"},
+    # reinicios con otra semilla
+    "recocido_2": {"metodo": "recocido", "semilla": 1},
+    "lns_2": {"metodo": "lns", "semilla": 1},
+}
+
+# Estrategias de backtracking: su cota inferior vale para las rutas que encuentran
+COTA_PROPIA = {"constructivo", "bt", "bt_ruido", "bt_candidatos"}
+
+
+# Estado de cada proceso del pool (lo arma _iniciar_trabajador)
+_trabajador: Dict[str, Any] = {}
+
+
+def _iniciar_trabajador(referencia: Tuple[str, str], comunes: Dict[str, Any], limite: float) -> None:
+    """Se adjunta a la matriz compartida y guarda los argumentos comunes a todas las estrategias."""
+    compartida = f.MatrizCompartida.adjuntar(referencia)
+    _trabajador.update(compartida=compartida, comunes=comunes, limite=limite)
+
+
+def _correr_estrategia(nombre: str) -> Tuple[str, float, List[int], set, float, Dict[str, float]]:
+    """Resuelve con una estrategia. Devuelve (nombre, distancia, ruta, hubs usados, cota
+    inferior, estadísticas); la distancia es inf si no llegó a armar una solución."""
+    w = _trabajador
+    restante = w["limite"] - time.monotonic()
+    if restante <= 0:
+        return nombre, float('inf'), [], set(), 0.0, {}
+    solucion = f.resolver_problema(
+        w["compartida"].filas,
+        **w["comunes"],
+        **ESTRATEGIAS[nombre],
+        umbral_exacto=0,  # el proceso principal ya descartó el solver exacto
+        procesos=1,
+        limite_segundos=restante if restante != float('inf') else None,
+    )
+    return (nombre, solucion.distancia, solucion.ruta or [], solucion.hubs_usados,
+            solucion.cota_inferior, solucion.estadisticas)
+
+
+def correr_portafolio(matriz_distancias: List[List[float]],
+                      deposito_id: int,
+                      hubs: List[int],
+                      demanda_por_nodo: Dict[int, int],
+                      capacidad_camion: int,
+                      estrategias: Tuple[str, ...],
+                      procesos: int,
+                      limite: float = float('inf'),
+                      al_mejorar: Optional[Callable[[f.Solucion], None]] = None,
+                      coordenadas: Optional[Dict[int, Tuple[float, float]]] = None) -> f.Solucion:
+    """
+    Corre las estrategias en paralelo y devuelve la mejor solución.
+    Parametros:
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - hubs: lista de nodos que son hubs
+    - demanda_por_nodo: diccionario {nodo: cantidad de paquetes a entregar}
+    - capacidad_camion: capacidad máxima del camión
+    - estrategias: nombres de ESTRATEGIAS a correr
+    - procesos: tamaño del pool (como máximo una estrategia por proceso)
+    - limite: instante (time.monotonic()) en que vence el tiempo, común a todas
+    - al_mejorar: se llama con la mejor solución cada vez que termina una estrategia que mejora
+    - coordenadas: {nodo: (x, y)} para la destrucción por cercanía de LNS
+    Salida:
+    - mejor solución (objeto Solucion) con `estrategia` igual a la ganadora; en `estadisticas`
+      quedan las de la ganadora y la distancia de cada estrategia (`portafolio_<nombre>`);
+      `cota_inferior` es la de la ganadora si está en COTA_PROPIA y 0 si no
+    """
+    comunes = {
+        "deposito_id": deposito_id,
+        "hubs": hubs,
+        "demanda_por_nodo": demanda_por_nodo,
+        "capacidad_camion": capacidad_camion,
+        "coordenadas": coordenadas,
+    }
+    mejor = f.Solucion()
+    cota = 0.0
+    distancias: Dict[str, float] = {}
+    estadisticas_ganadora: Dict[str, float] = {}
+    compartida, propia = f.MatrizCompartida.compartir(matriz_distancias)
+    try:
+        with mp.get_context().Pool(min(procesos, len(estrategias)), initializer=_iniciar_trabajador,
+                                   initargs=(compartida.referencia, comunes, limite)) as pool:
+            for nombre, dist, ruta, hubs_usados, cota_inferior, estadisticas in pool.imap_unordered(
+                    _correr_estrategia, estrategias):
+                distancias[f"portafolio_{nombre}"] = dist
+                if dist < mejor.distancia:
+                    mejor.set(dist, ruta, hubs_usados)
+                    mejor.estrategia = nombre
+                    cota = cota_inferior if nombre in COTA_PROPIA else 0.0
+                    estadisticas_ganadora = estadisticas
+                    if al_mejorar is not None:
+                        al_mejorar(mejor)
+                if cota >= mejor.distancia:
+                    break  # la ganadora demostró su óptimo: al salir del `with` se terminan las demás
+    finally:
+        if propia:
+            compartida.liberar()
+
+    mejor.cota_inferior = min(cota, mejor.distancia)
+    mejor.estadisticas.update(estadisticas_ganadora)
+    mejor.estadisticas.update(distancias)
+    return mejor
@@ -0,0 +1,338 @@
+import math
+import random
+import time
+from typing import List, Dict, Optional, Callable
+
+from funciones import Solucion
+from busqueda_local import Viaje, descomponer_ruta, costo_viajes, componer_ruta, EPS
+
+#  Recocido simulado sobre la estructura de viajes de una ruta
+#
+# Misma representación que busqueda_local.py (cada viaje carga en una recarga y entrega una
+# cantidad fija en cada parada). En cada iteración se propone un movimiento al azar y se
+# calcula su delta en O(1) mirando solo las aristas que cambian:
+#
+# - relocate: mover una parada a otro viaje, al lado de uno de sus k vecinos más cercanos
+# - 2-opt: invertir un tramo de paradas dentro de un viaje
+# - cambio de recarga: cargar el viaje en otro hub (o en el depósito)
+#
+# Se acepta si mejora, o con probabilidad exp(-delta / T) si empeora. La temperatura inicial
+# se calibra con movimientos de muestra y después se adapta: cada VENTANA iteraciones se
+# compara la fracción de empeoramientos aceptados con la que fija el programa (estilo Lam)
+# para la fracción consumida del presupuesto, el de iteraciones o el de tiempo (el que se
+# agote antes), y se enfría o se recalienta para seguirla.
+
+# Fracción de empeoramientos aceptados que se busca en la meseta del programa
+TASA_MESETA = 0.01
+# Iteraciones entre ajustes de temperatura (potencia de 2)
+VENTANA = 256
+# Factor con el que se enfría (o se recalienta) en cada ajuste
+AJUSTE_TEMPERATURA = 0.95
+# Movimientos de muestra para calibrar la temperatura inicial
+MUESTRAS_TEMPERATURA = 200
+# Presupuesto de iteraciones por nodo con demanda cuando no hay límite de tiempo
+ITERACIONES_POR_CLIENTE = 5_000
+# Presupuesto de iteraciones cuando corta el límite de tiempo
+ITERACIONES_SIN_TOPE = 2 ** 62
+
+
+def tasa_objetivo(progreso: float) -> float:
+    """Tasa de aceptación buscada según la fracción consumida del presupuesto: el programa de
+    Lam sin su fase inicial de calentamiento (se parte de una buena solución, no del azar).
+    Se mantiene en TASA_MESETA hasta el 65% y después cae en forma exponencial a ~0."""
+    if progreso < 0.65:
+        return TASA_MESETA
+    return TASA_MESETA * 440 ** (-(progreso - 0.65) / 0.35)
+
+
+class RecocidoSimulado:
+    """Recocido simulado con movimientos de delta O(1) sobre una lista de viajes."""
+
+    def __init__(self,
+                 viajes: List[Viaje],
+                 matriz_distancias: List[List[float]],
+                 deposito_id: int,
+                 nodos_recarga: set,
+                 capacidad_camion: int,
+                 semilla: int = 0,
+                 cantidad_vecinos: int = 8):
+        self.viajes = viajes
+        self.D = matriz_distancias
+        self.deposito_id = deposito_id
+        self.recargas = sorted(nodos_recarga)
+        self.capacidad = capacidad_camion
+        self.azar = random.Random(semilla)
+        nodos = sorted({v for viaje in viajes for v in viaje.paradas})
+        self.vecinos = {v: sorted((w for w in nodos if w != v),
+                                  key=matriz_distancias[v].__getitem__)[:cantidad_vecinos]
+                        for v in nodos}
+        self.cargas = [viaje.carga for viaje in viajes]
+        # viaje (por identidad) -> posición en la lista; se rehace solo al eliminar un viaje
+        self._indice: Dict[int, int] = {}
+        # donde[v]: viajes en los que aparece v (más de uno si su demanda se repartió)
+        self._donde: Dict[int, List[Viaje]] = {}
+        self._movida: tuple = ()
+        self.t0 = self.temperatura = 0.0
+        self.iteraciones = 0
+        self.aceptadas = 0
+        self._indexar()
+
+    def _indexar(self) -> None:
+        self._indice = {id(viaje): t for t, viaje in enumerate(self.viajes)}
+        self._donde = {}
+        for viaje in self.viajes:
+            for v in viaje.paradas:
+                self._donde.setdefault(v, []).append(viaje)
+
+    def _previo(self, t: int) -> int:
+        """Nodo desde el que se llega a la recarga del viaje t."""
+        return self.viajes[t - 1].paradas[-1] if t > 0 else self.deposito_id
+
+    def _fin(self, t: int) -> int:
+        """Nodo al que se va al terminar el viaje t (recarga siguiente o depósito)."""
+        return self.viajes[t + 1].recarga if t + 1 < len(self.viajes) else self.deposito_id
+
+    def _vecino_en(self, viaje: Viaje, t: int, i: int) -> tuple:
+        """(anterior, siguiente) de la parada i del viaje t."""
+        paradas = viaje.paradas
+        a = paradas[i - 1] if i > 0 else viaje.recarga
+        b = paradas[i + 1] if i + 1 < len(paradas) else self._fin(t)
+        return a, b
+
+    # --- Movimientos: cada uno devuelve el delta (None si no aplica) y deja la movida pendiente ---
+
+    def _relocate(self) -> Optional[float]:
+        D, azar = self.D, self.azar
+        t = azar.randrange(len(self.viajes))
+        viaje = self.viajes[t]
+        i = azar.randrange(len(viaje.paradas))
+        v, q = viaje.paradas[i], viaje.cantidades[i]
+        vecinos = self.vecinos[v]
+        if not vecinos:
+            return None
+        w = azar.choice(vecinos)
+        viaje2 = azar.choice(self._donde[w])
+        t2 = self._indice[id(viaje2)]
+        if t2 == t or self.cargas[t2] + q > self.capacidad:
+            return None
+        k = viaje2.paradas.index(w) + azar.randrange(2)  # insertar justo antes o después de w
+        unica = len(viaje.paradas) == 1
+        if unica:
+            if t2 == t - 1 and k == len(viaje2.paradas):
+                return None  # esa arista desaparece al eliminar el viaje t
+            p, r, b = self._previo(t), viaje.recarga, self._fin(t)
+            ganancia = D[p][r] + D[r][v] + D[v][b] - D[p][b]
+        else:
+            a, b = self._vecino_en(viaje, t, i)
+            ganancia = D[a][v] + D[v][b] - D[a][b]
+        c = viaje2.paradas[k - 1] if k > 0 else viaje2.recarga
+        e = viaje2.paradas[k] if k < len(viaje2.paradas) else self._fin(t2)
+        self._movida = ("relocate", t, i, t2, k)
+        return D[c][v] + D[v][e] - D[c][e] - ganancia
+
+    def _swap(self) -> Optional[float]:
+        D, azar = self.D, self.azar
+        t = azar.randrange(len(self.viajes))
+        viaje = self.viajes[t]
+        i = azar.randrange(len(viaje.paradas))
+        v, q = viaje.paradas[i], viaje.cantidades[i]
+        vecinos = self.vecinos[v]
+        if not vecinos:
+            return None
+        w = azar.choice(vecinos)
+        viaje2 = azar.choice(self._donde[w])
+        t2 = self._indice[id(viaje2)]
+        j = viaje2.paradas.index(w)
+        qw = viaje2.cantidades[j]
+        if (t2 == t or self.cargas[t] - q + qw > self.capacidad or
+                self.cargas[t2] - qw + q > self.capacidad):
+            return None
+        a, b = self._vecino_en(viaje, t, i)
+        c, e = self._vecino_en(viaje2, t2, j)
+        self._movida = ("swap", t, i, t2, j)
+        return (D[a][w] + D[w][b] - D[a][v] - D[v][b] +
+                D[c][v] + D[v][e] - D[c][w] - D[w][e])
+
+    def _dos_opt(self) -> Optional[float]:
+        D, azar = self.D, self.azar
+        t = azar.randrange(len(self.viajes))
+        viaje = self.viajes[t]
+        n = len(viaje.paradas)
+        if n < 2:
+            return None
+        i, j = sorted(azar.sample(range(n), 2))  # invertir paradas[i..j]
+        a = viaje.paradas[i - 1] if i > 0 else viaje.recarga
+        b = viaje.paradas[j + 1] if j + 1 < n else self._fin(t)
+        pi, pj = viaje.paradas[i], viaje.paradas[j]
+        self._movida = ("dos_opt", t, i, j)
+        return D[a][pj] + D[pi][b] - D[a][pi] - D[pj][b]
+
+    def _recarga(self) -> Optional[float]:
+        D, azar = self.D, self.azar
+        t = azar.randrange(len(self.viajes))
+        viaje = self.viajes[t]
+        r = azar.choice(self.recargas)
+        if r == viaje.recarga:
+            return None
+        p, f = self._previo(t), viaje.paradas[0]
+        self._movida = ("recarga", t, r)
+        return D[p][r] + D[r][f] - D[p][viaje.recarga] - D[viaje.recarga][f]
+
+    def _proponer(self) -> Optional[float]:
+        eleccion = self.azar.random()
+        if eleccion < 0.4:
+            return self._relocate()
+        if eleccion < 0.6:
+            return self._swap()
+        if eleccion < 0.9:
+            return self._dos_opt()
+        return self._recarga()
+
+    def _aplicar(self) -> None:
+        movida = self._movida
+        if movida[0] == "relocate":
+            _, t, i, t2, k = movida
+            viaje, viaje2 = self.viajes[t], self.viajes[t2]
+            v, q = viaje.paradas.pop(i), viaje.cantidades.pop(i)
+            viaje2.paradas.insert(k, v)
+            viaje2.cantidades.insert(k, q)
+            self.cargas[t] -= q
+            self.cargas[t2] += q
+            donde = self._donde[v]
+            donde.remove(viaje)
+            donde.append(viaje2)
+            if not viaje.paradas:
+                del self.viajes[t]
+                del self.cargas[t]
+                self._indice = {id(x): s for s, x in enumerate(self.viajes)}
+        elif movida[0] == "swap":
+            _, t, i, t2, j = movida
+            viaje, viaje2 = self.viajes[t], self.viajes[t2]
+            v, q = viaje.paradas[i], viaje.cantidades[i]
+            w, qw = viaje2.paradas[j], viaje2.cantidades[j]
+            viaje.paradas[i], viaje.cantidades[i] = w, qw
+            viaje2.paradas[j], viaje2.cantidades[j] = v, q
+            self.cargas[t] += qw - q
+            self.cargas[t2] += q - qw
+            self._donde[v].remove(viaje)
+            self._donde[v].append(viaje2)
+            self._donde[w].remove(viaje2)
+            self._donde[w].append(viaje)
+        elif movida[0] == "dos_opt":
+            _, t, i, j = movida
+            viaje = self.viajes[t]
+            viaje.paradas[i:j + 1] = viaje.paradas[i:j + 1][::-1]
+            viaje.cantidades[i:j + 1] = viaje.cantidades[i:j + 1][::-1]
+        else:
+            _, t, r = movida
+            self.viajes[t].recarga = r
+
+    def temperatura_inicial(self) -> float:
+        """Temperatura con la que un empeoramiento típico (la mediana de la muestra) se acepta
+        con probabilidad TASA_MESETA (los movimientos de muestra no se aplican)."""
+        empeoramientos = []
+        for _ in range(MUESTRAS_TEMPERATURA):
+            delta = self._proponer()
+            if delta is not None and delta > EPS:
+                empeoramientos.append(delta)
+        if not empeoramientos:
+            return 1.0
+        empeoramientos.sort()
+        return -empeoramientos[len(empeoramientos) // 2] / math.log(TASA_MESETA)
+
+    def optimizar(self, iteraciones: int, limite: float = float('inf'),
+                  al_mejorar: Optional[Callable[[List[Viaje], float], None]] = None) -> float:
+        """Corre el recocido hasta agotar `iteraciones` o llegar a `limite`. Llama a
+        `al_mejorar(viajes, costo)` con cada nueva mejor configuración; devuelve la mejor distancia."""
+        inicio = time.monotonic()
+        duracion = limite - inicio
+        self.t0 = self.temperatura = self.temperatura_inicial()
+        costo = costo_viajes(self.viajes, self.D, self.deposito_id)
+        mejor = costo
+        azar = self.azar
+        empeoran = aceptados = 0  # empeoramientos propuestos y aceptados en la ventana actual
+        for it in range(iteraciones):
+            if not it & (VENTANA - 1) and it:
+                progreso = it / iteraciones
+                if duracion != float('inf'):
+                    ahora = time.monotonic()
+                    if ahora >= limite:
+                        break
+                    progreso = max(progreso, (ahora - inicio) / duracion)
+                if empeoran:
+                    if aceptados / empeoran > tasa_objetivo(progreso):
+                        self.temperatura *= AJUSTE_TEMPERATURA
+                    else:
+                        self.temperatura /= AJUSTE_TEMPERATURA
+                empeoran = aceptados = 0
+            self.iteraciones += 1
+            delta = self._proponer()
+            if delta is None:
+                continue
+            if delta > EPS:
+                empeoran += 1
+                if azar.random() >= math.exp(-delta / self.temperatura):
+                    continue
+                aceptados += 1
+            self._aplicar()
+            self.aceptadas += 1
+            costo += delta
+            if costo < mejor - EPS:
+                mejor = costo_viajes(self.viajes, self.D, self.deposito_id)  # sin deriva de redondeo
+                costo = mejor
+                if al_mejorar is not None:
+                    al_mejorar(self.viajes, mejor)
+        return mejor
+
+
+def recocer_solucion(solucion: Solucion,
+                     matriz_distancias: List[List[float]],
+                     deposito_id: int,
+                     nodos_recarga: set,
+                     demanda_por_nodo: Dict[int, int],
+                     capacidad_camion: int,
+                     iteraciones: int,
+                     limite: float = float('inf'),
+                     semilla: int = 0,
+                     al_mejorar: Optional[Callable[[Solucion], None]] = None) -> bool:
+    """
+    Mejora `solucion` con recocido simulado partiendo de su ruta (la modifica en el lugar).
+    Parametros:
+    - solucion: solución inicial (ruta en el formato de `bt` o de las heurísticas)
+    - matriz_distancias: matriz de distancias entre nodos
+    - deposito_id: id del nodo depósito
+    - nodos_recarga: conjunto de nodos donde se puede recargar (hubs + depósito)
+    - demanda_por_nodo: diccionario {nodo: cantidad de paquetes a entregar}
+    - capacidad_camion: capacidad máxima del camión
+    - iteraciones: presupuesto de movimientos propuestos
+    - limite: instante (time.monotonic()) en que vence el tiempo
+    - semilla: semilla del generador aleatorio
+    - al_mejorar: se llama con `solucion` cada vez que mejora
+    Salida:
+    - True si mejoró la solución; en `estadisticas` quedan iteraciones, movimientos
+      aceptados, temperatura inicial y tiempo
+    """
+    inicio = time.perf_counter()
+    viajes = descomponer_ruta(solucion.ruta or [], deposito_id, nodos_recarga,
+                              demanda_por_nodo, capacidad_camion) if solucion.ruta else None
+    if not viajes or abs(costo_viajes(viajes, matriz_distancias, deposito_id) - solucion.distancia) > 1e-6:
+        return False  # la ruta no se pudo leer como viajes (o se leyó de otra forma)
+    distancia_inicial = solucion.distancia
+    recocido = RecocidoSimulado(viajes, matriz_distancias, deposito_id, nodos_recarga,
+                                capacidad_camion, semilla)
+
+    def registrar(actuales: List[Viaje], costo: float) -> None:
+        if costo < solucion.distancia - EPS:
+            ruta, hubs_usados = componer_ruta(actuales, deposito_id)
+            solucion.set(costo, ruta, hubs_usados)
+            if al_mejorar is not None:
+                al_mejorar(solucion)
+
+    recocido.optimizar(iteraciones, limite, registrar)
+    solucion.estadisticas.update({
+        "iteraciones_recocido": recocido.iteraciones,
+        "aceptadas_recocido": recocido.aceptadas,
+        "temperatura_inicial": recocido.t0,
+        "segundos_recocido": time.perf_counter() - inicio,
+    })
+    return solucion.distancia < distancia_inicial - EPS
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 
+import os
 import sys
+import struct
+import zipfile
+import hashlib
+import argparse
+from array import array
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import funciones as f
+import heuristicas
+import portafolio
 import time
 
 
@@ -38,7 +46,16 @@ class Problema:
         self.nodos: List[Nodo] = []
         self.hubs: List[Hub] = []
         self.paquetes: List[Paquete] = []
-        self.grafo_distancias: List[List[float]] = []
+        # Adyacencia dispersa (CSR) armada directamente desde la sección ARISTAS
+        self.grafo: f.GrafoCSR = f.GrafoCSR.desde_aristas(0, {})
+        self._grafo_distancias: Optional[List[List[float]]] = None
+
+    @property
+    def grafo_distancias(self) -> List[List[float]]:
+        """Matriz de adyacencia densa n x n; se arma a demanda desde el CSR (solo para código legado)."""
+        if self._grafo_distancias is None:
+            self._grafo_distancias = self.grafo.a_matriz_densa()
+        return self._grafo_distancias
 
 
 def eliminar_comentario(linea: str) -> str:
@@ -48,147 +65,82 @@ def eliminar_comentario(linea: str) -> str:
     return linea.strip()
 
 
+# Encabezados de sección reconocidos (se busca el nombre dentro de una línea "// --- X ---")
+SECCIONES = ("ARISTAS", "PAQUETES", "HUBS", "NODOS")
+
+
+def detectar_seccion(linea: str) -> Optional[str]:
+    """Devuelve el nombre de la sección si la línea es un encabezado "--- X ---"."""
+    if "---" not in linea:
+        return None
+    for seccion in SECCIONES:
+        if seccion in linea:
+            return seccion
+    return None
+
+
 def leer_archivo(nombre_archivo: str) -> Optional[Problema]:
-    """Lee un archivo de problema y retorna un objeto Problema."""
+    """Lee un archivo de problema y retorna un objeto Problema.
+    Recorre el archivo una sola vez, línea por línea, con una máquina de estados
+    que cambia de sección al encontrar cada encabezado.
+    """
     try:
-        with open(nombre_archivo, 'r') as f:
-            lineas = f.readlines()
+        archivo = open(nombre_archivo, 'r')
     except FileNotFoundError:
         print(f"Error: No se pudo abrir el archivo '{nombre_archivo}'")
         return None
 
     p = Problema()
-
-    # --- LEER CONFIGURACIÓN (primeras líneas) ---
-    idx = 0
-    while idx < len(lineas):
-        linea = eliminar_comentario(lineas[idx])
-
-        if not linea:
-            idx += 1
-            continue
-
-        if linea.startswith("NODOS"):
-            p.num_nodos = int(linea.split()[1])
-        elif linea.startswith("HUBS"):
-            p.num_hubs = int(linea.split()[1])
-        elif linea.startswith("PAQUETES"):
-            p.num_paquetes = int(linea.split()[1])
-        elif linea.startswith("CAPACIDAD_CAMION"):
-            p.capacidad_camion = int(linea.split()[1])
-        elif linea.startswith("DEPOSITO_ID"):
-            p.deposito_id = int(linea.split()[1])
-            idx += 1
-            break  # <-- BREAK aquí después de encontrar DEPOSITO_ID
-
-        idx += 1
-
-    # Inicializar matriz de distancias
-    p.grafo_distancias = [
-        [0.0 for _ in range(p.num_nodos)] for _ in range(p.num_nodos)]
-
-    # --- ENCONTRAR Y LEER CADA SECCIÓN ---
-
-    # Buscar encabezado de NODOS
-    start_nodos = -1
-    for i in range(idx, len(lineas)):
-        if "NODOS" in lineas[i] and "---" in lineas[i]:
-            start_nodos = i + 1
-            break
-
-    # Leer NODOS
-    if start_nodos > 0:
-        nodos_leidos = 0
-        for i in range(start_nodos, len(lineas)):
-            if nodos_leidos >= p.num_nodos:
-                break
-            linea = eliminar_comentario(lineas[i])
-            if not linea:
-                continue
-            try:
-                partes = linea.split()
-                nodo = Nodo(id=int(partes[0]), x=int(
-                    partes[1]), y=int(partes[2]))
-                p.nodos.append(nodo)
-                nodos_leidos += 1
-            except (ValueError, IndexError):
-                pass
-
-    # Buscar encabezado de HUBS
-    start_hubs = -1
-    for i in range(len(lineas)):
-        if "HUBS" in lineas[i] and "---" in lineas[i]:
-            start_hubs = i + 1
-            break
-
-    # Leer HUBS
-    if start_hubs > 0:
-        hubs_leidos = 0
-        for i in range(start_hubs, len(lineas)):
-            if hubs_leidos >= p.num_hubs:
-                break
-            linea = eliminar_comentario(lineas[i])
-            if not linea:
+    seccion = "CONFIGURACION"
+    aristas: Dict[Tuple[int, int], float] = {}
+
+    with archivo:
+        for linea_cruda in archivo:
+            nueva_seccion = detectar_seccion(linea_cruda)
+            if nueva_seccion is not None:
+                seccion = nueva_seccion
                 continue
-            try:
-                partes = linea.split()
-                hub = Hub(id_nodo=int(partes[0]),
-                          costo_activacion=float(partes[1]))
-                p.hubs.append(hub)
-                hubs_leidos += 1
-            except (ValueError, IndexError):
-                pass
 
-    # Buscar encabezado de PAQUETES
-    start_paquetes = -1
-    for i in range(len(lineas)):
-        if "PAQUETES" in lineas[i] and "---" in lineas[i]:
-            start_paquetes = i + 1
-            break
-
-    # Leer PAQUETES
-    if start_paquetes > 0:
-        paquetes_leidos = 0
-        for i in range(start_paquetes, len(lineas)):
-            if paquetes_leidos >= p.num_paquetes:
-                break
-            linea = eliminar_comentario(lineas[i])
+            linea = eliminar_comentario(linea_cruda)
             if not linea:
                 continue
-            try:
-                partes = linea.split()
-                paquete = Paquete(id=int(partes[0]),
-                                  id_nodo_origen=int(partes[1]),
-                                  id_nodo_destino=int(partes[2]))
-                p.paquetes.append(paquete)
-                paquetes_leidos += 1
-            except (ValueError, IndexError):
-                pass
+            partes = linea.split()
 
-    # Buscar encabezado de ARISTAS
-    start_aristas = -1
-    for i in range(len(lineas)):
-        if "ARISTAS" in lineas[i] and "---" in lineas[i]:
-            start_aristas = i + 1
-            break
-
-    # Leer ARISTAS
-    if start_aristas > 0:
-        for i in range(start_aristas, len(lineas)):
-            linea = eliminar_comentario(lineas[i])
-            if not linea:
-                continue
             try:
-                partes = linea.split()
-                if len(partes) >= 3:
-                    u, v, peso = int(partes[0]), int(
-                        partes[1]), float(partes[2])
-                    if u < p.num_nodos and v < p.num_nodos:
-                        p.grafo_distancias[u][v] = peso
-                        p.grafo_distancias[v][u] = peso
+                if seccion == "ARISTAS":
+                    if len(partes) >= 3:
+                        u, v, peso = int(partes[0]), int(
+                            partes[1]), float(partes[2])
+                        if 0 <= u < p.num_nodos and 0 <= v < p.num_nodos:
+                            # una arista repetida pisa a la anterior
+                            aristas[(min(u, v), max(u, v))] = peso
+                elif seccion == "NODOS":
+                    if len(p.nodos) < p.num_nodos:
+                        p.nodos.append(Nodo(id=int(partes[0]), x=int(
+                            partes[1]), y=int(partes[2])))
+                elif seccion == "HUBS":
+                    if len(p.hubs) < p.num_hubs:
+                        p.hubs.append(Hub(id_nodo=int(partes[0]),
+                                          costo_activacion=float(partes[1])))
+                elif seccion == "PAQUETES":
+                    if len(p.paquetes) < p.num_paquetes:
+                        p.paquetes.append(Paquete(id=int(partes[0]),
+                                                  id_nodo_origen=int(partes[1]),
+                                                  id_nodo_destino=int(partes[2])))
+                elif partes[0] == "NODOS":
+                    p.num_nodos = int(partes[1])
+                elif partes[0] == "HUBS":
+                    p.num_hubs = int(partes[1])
+                elif partes[0] == "PAQUETES":
+                    p.num_paquetes = int(partes[1])
+                elif partes[0] == "CAPACIDAD_CAMION":
+                    p.capacidad_camion = int(partes[1])
+                elif partes[0] == "DEPOSITO_ID":
+                    p.deposito_id = int(partes[1])
             except (ValueError, IndexError):
                 pass
 
+    p.grafo = f.GrafoCSR.desde_aristas(p.num_nodos, aristas)
     return p
 
 
@@ -238,23 +190,310 @@ def imprimir_problema(p: Problema) -> None:
     print("===========================================================\n")
 
 
-def main():
+#  Cache binaria de instancias compiladas (problema parseado + distancias + siguientes)
+VERSION_CACHE = 1
+
+
+def ruta_cache(nombre_archivo: str) -> str:
+    """Archivo de cache que acompaña a la instancia."""
+    return nombre_archivo + ".cache.npz"
+
+
+def hash_contenido(nombre_archivo: str) -> str:
+    """SHA-256 del contenido del archivo (la cache se invalida si el archivo cambia)."""
+    h = hashlib.sha256()
+    with open(nombre_archivo, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def guardar_cache(nombre_archivo: str, huella: str, p: Problema,
+                  distancia: Optional[List[List[float]]] = None,
+                  oraculo: Optional[f.OraculoCaminos] = None) -> None:
+    """Guarda en un .npz el problema parseado y, si se pasan, las matrices de distancias y
+    siguientes de Floyd (sin ellas la cache solo evita volver a parsear, como con Dijkstra)."""
+    np = f.np
+    destino = ruta_cache(nombre_archivo)
+    temporal = destino + ".tmp"
+    matrices = {}
+    if distancia is not None:
+        matrices = {"distancia": np.asarray(distancia, dtype=np.float64),
+                    "siguiente": np.asarray(oraculo.siguiente, dtype=np.int32)}
+    with open(temporal, 'wb') as archivo:
+        np.savez(
+            archivo,
+            version=np.int64(VERSION_CACHE),
+            huella=np.array(huella),
+            config=np.array([p.num_nodos, p.num_hubs, p.num_paquetes,
+                             p.capacidad_camion, p.deposito_id], dtype=np.int64),
+            nodos=np.array([(n.id, n.x, n.y) for n in p.nodos], dtype=np.int64).reshape(-1, 3),
+            hubs_id=np.array([h.id_nodo for h in p.hubs], dtype=np.int64),
+            hubs_costo=np.array([h.costo_activacion for h in p.hubs], dtype=np.float64),
+            paquetes=np.array([(q.id, q.id_nodo_origen, q.id_nodo_destino)
+                               for q in p.paquetes], dtype=np.int64).reshape(-1, 3),
+            offsets=np.frombuffer(p.grafo.offsets, dtype=np.int32),
+            destinos=np.frombuffer(p.grafo.destinos, dtype=np.int32),
+            pesos=np.frombuffer(p.grafo.pesos, dtype=np.float64),
+            **matrices,
+        )
+    os.replace(temporal, destino)
 
-    if len(sys.argv) != 2:
-        print(f"Uso: {sys.argv[0]} <nombre_del_archivo.txt>")
-        sys.exit(1)
 
-    nombre_archivo = sys.argv[1]
+def cargar_cache(nombre_archivo: str, huella: str,
+                 con_distancias: bool = True) -> Optional[Tuple[Problema, List[List[float]], f.OraculoCaminos]]:
+    """Carga la instancia compilada si existe y corresponde a `huella`; si no, devuelve None.
+    Con `con_distancias=False` solo se lee el problema (la tupla trae None en las matrices)."""
+    np = f.np
+    try:
+        with np.load(ruta_cache(nombre_archivo), allow_pickle=False) as datos:
+            if int(datos["version"]) != VERSION_CACHE or str(datos["huella"]) != huella:
+                return None
+            p = Problema()
+            (p.num_nodos, p.num_hubs, p.num_paquetes,
+             p.capacidad_camion, p.deposito_id) = datos["config"].tolist()
+            p.nodos = [Nodo(id=i, x=x, y=y) for i, x, y in datos["nodos"].tolist()]
+            p.hubs = [Hub(id_nodo=i, costo_activacion=c)
+                      for i, c in zip(datos["hubs_id"].tolist(), datos["hubs_costo"].tolist())]
+            p.paquetes = [Paquete(id=i, id_nodo_origen=o, id_nodo_destino=d)
+                          for i, o, d in datos["paquetes"].tolist()]
+            p.grafo = f.GrafoCSR(array('i', datos["offsets"].tobytes()),
+                                 array('i', datos["destinos"].tobytes()),
+                                 array('d', datos["pesos"].tobytes()))
+            if con_distancias:
+                distancia = datos["distancia"]
+                siguiente = datos["siguiente"].ravel()
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+    n = p.num_nodos
+    if p.grafo.n != n:
+        return None
+    if not con_distancias:
+        return p, None, None
+    if distancia.shape != (n, n) or len(siguiente) != n * n:
+        return None
+    return p, distancia.tolist(), f.OraculoCaminos(siguiente, n)
+
+
+def leer_instancia_con_cache(nombre_archivo: str,
+                             motor: str,
+                             problema: Optional[Problema] = None,
+                             huella: Optional[str] = None) -> Optional[Tuple[Problema, List[List[float]], f.OraculoCaminos]]:
+    """Lee la instancia y corre Floyd-Warshall, salteando ambos pasos si hay una cache válida.
+    Parametros:
+    - nombre_archivo: archivo de problema (.txt)
+    - motor: motor de Floyd-Warshall a usar si la cache no sirve
+    - problema: la instancia ya parseada, si se tiene (no se vuelve a leer el archivo)
+    - huella: hash_contenido del archivo, si ya se calculó
+    Salida:
+    - tupla (problema, matriz de distancias, oráculo de caminos), o None si no se pudo leer
+    """
+    if huella is None:
+        try:
+            huella = hash_contenido(nombre_archivo)
+        except FileNotFoundError:
+            print(f"Error: No se pudo abrir el archivo '{nombre_archivo}'")
+            return None
+
+    cacheado = cargar_cache(nombre_archivo, huella)
+    if cacheado is not None:
+        print(f"Instancia cargada desde la cache: {ruta_cache(nombre_archivo)}")
+        return cacheado
+
+    p = problema if problema is not None else leer_archivo(nombre_archivo)
+    if p is None:
+        return None
+    distancia, oraculo = f.floydWarshallConOraculo(p.grafo, motor)
+    try:
+        guardar_cache(nombre_archivo, huella, p, distancia, oraculo)
+    except OSError as e:
+        print(f"Aviso: no se pudo guardar la cache ({e})")
+    return p, distancia, oraculo
+
+
+def leer_problema_con_cache(nombre_archivo: str) -> Optional[Problema]:
+    """Lee solo la instancia (sin Floyd-Warshall), salteando el parseo si hay una cache válida.
+    Si no la hay, la cache se escribe sin matrices; la primera corrida con Floyd las agrega."""
+    try:
+        huella = hash_contenido(nombre_archivo)
+    except FileNotFoundError:
+        print(f"Error: No se pudo abrir el archivo '{nombre_archivo}'")
+        return None
+
+    cacheado = cargar_cache(nombre_archivo, huella, con_distancias=False)
+    if cacheado is not None:
+        print(f"Instancia cargada desde la cache: {ruta_cache(nombre_archivo)}")
+        return cacheado[0]
+
+    p = leer_archivo(nombre_archivo)
+    if p is None:
+        return None
+    try:
+        guardar_cache(nombre_archivo, huella, p)
+    except OSError as e:
+        print(f"Aviso: no se pudo guardar la cache ({e})")
+    return p
+
+
+# Motores de Floyd-Warshall disponibles (todos devuelven distancias y caminos idénticos)
+MOTORES_FLOYD = ["python", "numpy"]
+
+
+def motor_por_defecto() -> str:
+    """Usa el motor vectorizado si numpy está disponible."""
+    return "numpy" if f.np is not None else "python"
+
+
+def parsear_argumentos(argv: List[str]) -> argparse.Namespace:
+    """Parsea la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        prog=argv[0], description="Resuelve un problema de ruteo con hubs.")
+    parser.add_argument("archivo", help="archivo de problema (.txt)")
+    parser.add_argument("--motor", choices=MOTORES_FLOYD + ["dijkstra"], default=motor_por_defecto(),
+                        help="motor de caminos mínimos: Floyd-Warshall (python/numpy) o Dijkstra "
+                             "solo desde los terminales (por defecto: numpy si está instalado)")
+    parser.add_argument("--sin-cache", action="store_true",
+                        help="no leer ni escribir la cache binaria de la instancia (.cache.npz)")
+    parser.add_argument("--motor-bt", choices=sorted(f.MOTORES_BT), default="iterativo",
+                        help="motor del backtracking: pila explícita (iterativo) o recursivo")
+    parser.add_argument("--comparar-bt", action="store_true",
+                        help="corre también el otro motor de backtracking e informa llamadas/s de ambos")
+    parser.add_argument("--distancias-mmap", metavar="RUTA",
+                        help="compartir la matriz de distancias entre procesos mediante un archivo "
+                             "mapeado en memoria (se crea si no existe o no corresponde a la instancia)")
+    parser.add_argument("--memoria-tt", metavar="MB", type=float, default=64,
+                        help="tope de memoria de la tabla de transposición del backtracking "
+                             "(desaloja LRU; 0 = sin tabla)")
+    parser.add_argument("--limite-segundos", metavar="S", type=float,
+                        help="tiempo máximo de resolución: al vencer se usa la mejor ruta encontrada")
+    parser.add_argument("--mostrar-mejoras", action="store_true",
+                        help="informar cada nueva mejor ruta apenas se encuentra")
+    parser.add_argument("--sin-busqueda-local", action="store_true",
+                        help="no post-optimizar la ruta final con búsqueda local")
+    parser.add_argument("--procesos", type=int, default=1,
+                        help="procesos para el branch-and-bound en paralelo (1 = secuencial)")
+    parser.add_argument("--metodo", choices=f.METODOS, default="bt",
+                        help="búsqueda a partir de la solución inicial: backtracking (bt), "
+                             "recocido simulado (recocido), destrucción y reparación adaptativa (lns), "
+                             "búsqueda en haz por capas (haz) o varias estrategias en carrera en "
+                             "procesos paralelos (portafolio)")
+    parser.add_argument("--iteraciones", type=int,
+                        help="presupuesto de iteraciones del recocido simulado o de LNS "
+                             "(por defecto: hasta --limite-segundos, o proporcional a la demanda)")
+    parser.add_argument("--semilla", type=int, default=0,
+                        help="semilla del generador aleatorio del recocido simulado o de LNS")
+    parser.add_argument("--candidatos", metavar="K", type=int, default=0,
+                        help="el backtracking ramifica solo entre los K destinos pendientes más cercanos "
+                             "y duplica K cada vez que se estanca (0 = todos)")
+    parser.add_argument("--ancho-haz", metavar="W", type=int, default=64,
+                        help="estados que sobreviven en cada capa de la búsqueda en haz "
+                             "(con --procesos cada capa se expande en paralelo)")
+    parser.add_argument("--estrategias", nargs="+", choices=list(portafolio.ESTRATEGIAS),
+                        help="estrategias del portafolio (por defecto: todas; --procesos limita "
+                             "cuántas corren a la vez)")
+    parser.add_argument("--constructores", nargs="+", choices=sorted(heuristicas.CONSTRUCTORES),
+                        default=["greedy", "split", "ahorros"],
+                        help="heurísticas para la solución inicial; el backtracking parte de la mejor")
+    parser.add_argument("--sin-exacto", action="store_true",
+                        help="usar siempre el backtracking, aunque la instancia sea chica para el solver exacto")
+    args = parser.parse_args(argv[1:])
+    if args.motor == "dijkstra" and args.distancias_mmap:
+        # el archivo compartido guarda la matriz completa y el oráculo de Floyd; Dijkstra solo
+        # calcula las filas de los terminales y arma sus caminos con árboles de predecesores
+        parser.error("--distancias-mmap requiere un motor de Floyd-Warshall (python o numpy), no dijkstra")
+    return args
+
+
+def abrir_distancias_mmap(ruta: str, huella: bytes, n: int) -> Optional[f.MatrizCompartida]:
+    """Se adjunta al archivo de distancias compartido si existe y es de esta instancia."""
+    try:
+        matriz = f.MatrizCompartida.abrir_archivo(ruta)
+    except (OSError, ValueError, struct.error):
+        return None
+    if matriz.n != n or matriz.huella != huella:
+        matriz.cerrar()
+        return None
+    return matriz
+
+
+def preparar_instancia(args: argparse.Namespace) -> Optional[Tuple[Problema, List[List[float]], object]]:
+    """Lee la instancia y calcula los caminos mínimos según las opciones de línea de comandos.
+    Salida:
+    - tupla (problema, matriz de distancias, oráculo de caminos), o None si no se pudo leer
+    """
+    nombre_archivo = args.archivo
+    # La cache guarda el problema y, con los motores de Floyd, sus matrices (requiere numpy)
+    usar_cache = not args.sin_cache and f.np is not None
+    if args.motor == "dijkstra":
+        problema = leer_problema_con_cache(nombre_archivo) if usar_cache else leer_archivo(nombre_archivo)
+        if problema is None:
+            return None
+        # El solver solo lee distancias entre terminales: Dijkstra desde cada uno alcanza
+        terminales = ([problema.deposito_id] + [hub.id_nodo for hub in problema.hubs]
+                      + [paquete.id_nodo_destino for paquete in problema.paquetes])
+        floyd, predecesores = f.dijkstraTerminales(problema.grafo, terminales)
+        print(f"Se han calculado los caminos mínimos desde {len(predecesores)} terminales con Dijkstra.")
+        return problema, floyd, f.OraculoPredecesores(predecesores)
+
+    problema, huella = None, None
+    if args.distancias_mmap:
+        # Si otro proceso ya dejó las distancias de esta instancia, se comparten sin recalcular
+        try:
+            huella = bytes.fromhex(hash_contenido(nombre_archivo))
+        except FileNotFoundError:
+            print(f"Error: No se pudo abrir el archivo '{nombre_archivo}'")
+            return None
+        problema = leer_archivo(nombre_archivo)
+        if problema is None:
+            return None
+        matriz = abrir_distancias_mmap(args.distancias_mmap, huella, problema.num_nodos)
+        if matriz is not None:
+            print(f"Distancias compartidas desde: {args.distancias_mmap}")
+            return problema, matriz.filas, matriz.oraculo()
+        # el archivo no es de esta instancia: se sigue con el problema ya parseado
+
+    if usar_cache:
+        instancia = leer_instancia_con_cache(nombre_archivo, args.motor, problema,
+                                             huella.hex() if huella is not None else None)
+        if instancia is None:
+            return None
+        problema, floyd, oraculo = instancia
+    else:
+        if problema is None:
+            problema = leer_archivo(nombre_archivo)
+        if problema is None:
+            return None
+        # Floyd (distancias y oráculo de caminos; los tramos se arman al expandir la ruta)
+        floyd, oraculo = f.floydWarshallConOraculo(problema.grafo, args.motor)
+    print(f"Se ha convertido el grafo de distancias con Floyd-Warshall (motor {args.motor}).")
+
+    if huella is not None:
+        f.MatrizCompartida.crear_archivo(args.distancias_mmap, floyd, oraculo, huella)
+        matriz = f.MatrizCompartida.abrir_archivo(args.distancias_mmap)
+        print(f"Distancias escritas en: {args.distancias_mmap}")
+        return problema, matriz.filas, matriz.oraculo()
+    return problema, floyd, oraculo
+
+
+def informar_mejora(incumbente: f.Incumbente) -> None:
+    """Imprime una nueva mejor ruta apenas la encuentra el solver."""
+    print(f"[{incumbente.segundos:8.3f}s] mejor distancia {incumbente.distancia:.2f} "
+          f"({len(incumbente.ruta)} paradas, hubs {sorted(incumbente.hubs_usados)})")
+
+
+def main():
+
+    args = parsear_argumentos(sys.argv)
+    nombre_archivo = args.archivo
     print(f"Leyendo el archivo de problema: {nombre_archivo}")
     tiempoInicial = time.time()
     print("Comienza el programa")
 
-    problema = leer_archivo(nombre_archivo)
-    if problema is None:
+    instancia = preparar_instancia(args)
+    if instancia is None:
         sys.exit(1)
-    # Floyd (distancias y caminos)
-    floyd, caminos = f.floydWarshallConCaminos(problema.grafo_distancias)
-    print("Se ha convertido el grafo de distancias con Floyd-Warshall.")
+    problema, floyd, oraculo = instancia
 
     hubs = [hub.id_nodo for hub in problema.hubs]
     nodosEntrega = [paquete.id_nodo_destino for paquete in problema.paquetes]
@@ -264,21 +503,42 @@ def main():
         dicNodosCantidad[nodo] = dicNodosCantidad.get(nodo, 0) + 1
     print("Se ha construido el diccionario de demandas por nodo.")
 
+    # comparar motores de backtracking no tiene sentido si la instancia la resuelve el solver exacto
+    umbral_exacto = 0 if args.sin_exacto or args.comparar_bt else 16
+
+    # la comparación de motores vuelve a resolver con exactamente esta configuración
+    opciones = dict(
+        matriz_distancias=floyd,
+        deposito_id=problema.deposito_id,
+        hubs=hubs,
+        demanda_por_nodo=dicNodosCantidad,
+        capacidad_camion=problema.capacidad_camion,
+        max_llamadas_sin_mejora=None,
+        debug=False,
+        base_meseta=1300,
+        motor_bt=args.motor_bt,
+        memoria_transposicion_mb=args.memoria_tt,
+        umbral_exacto=umbral_exacto,
+        procesos=args.procesos,
+        limite_segundos=args.limite_segundos,
+        busqueda_local=not args.sin_busqueda_local,
+        constructores=tuple(args.constructores),
+        metodo=args.metodo,
+        iteraciones=args.iteraciones,
+        semilla=args.semilla,
+        coordenadas={nodo.id: (nodo.x, nodo.y) for nodo in problema.nodos},
+        candidatos=args.candidatos,
+        ancho_haz=args.ancho_haz,
+        estrategias=tuple(args.estrategias) if args.estrategias else None
+    )
+
     try:
-        mejor = f.resolver_problema(
-            matriz_distancias=floyd,
-            deposito_id=problema.deposito_id,
-            hubs=hubs,
-            demanda_por_nodo=dicNodosCantidad,
-            capacidad_camion=problema.capacidad_camion,
-            max_llamadas_sin_mejora=None,
-            debug=False,
-            base_meseta=1300
-        )
+        mejor = f.resolver_problema(**opciones,
+                                    al_mejorar=informar_mejora if args.mostrar_mejoras else None)
 
         ruta_expandida = []
         for a, b in zip(mejor.ruta, mejor.ruta[1:]):
-            tramo = caminos[a][b]
+            tramo = oraculo.camino(a, b)
             if not tramo:
                 tramo = [a, b]
             if ruta_expandida:
@@ -301,6 +561,66 @@ def main():
         print(f"DISTANCIA_RECORRIDA : {mejor.distancia:.2f}")
         print("COSTO_HUBS : 0.00")
 
+        stats = mejor.estadisticas
+        if mejor.estrategia is not None:
+            resultados = [f"{clave[len('portafolio_'):]} {valor:.2f}" for clave, valor in stats.items()
+                          if clave.startswith("portafolio_")]
+            print(f"Portafolio: ganó {mejor.estrategia} ({', '.join(resultados)})")
+        if "estados_exacto" in stats:
+            print(f"Solver exacto: {stats['estados_exacto']:,} estados, óptimo demostrado en el modelo del backtracking")
+        elif "iteraciones_recocido" in stats:
+            print(f"Recocido simulado: {stats['iteraciones_recocido']:,} iteraciones, "
+                  f"{stats['aceptadas_recocido']:,} movimientos aceptados, "
+                  f"{stats['segundos_recocido']:.2f}s")
+        elif "iteraciones_lns" in stats:
+            print(f"LNS: {stats['iteraciones_lns']:,} iteraciones, {stats['mejoras_lns']:,} mejoras, "
+                  f"{stats['segundos_lns']:.2f}s")
+        elif "iteraciones_haz" in stats:
+            print(f"Búsqueda en haz: {stats['iteraciones_haz']:,} capas de ancho {stats['ancho_haz']}, "
+                  f"{stats['estados_haz']:,} estados, {stats['segundos_haz']:.2f}s")
+        elif "llamadas_bt" in stats:
+            motor = f"paralelo, {args.procesos} procesos" if args.procesos > 1 and args.metodo == "bt" else args.motor_bt
+            print(f"Backtracking ({motor}): {stats['llamadas_bt']:,} llamadas, "
+                  f"{stats['llamadas_por_segundo']:,.0f} llamadas/s"
+                  + (f", {stats['pasadas_candidatos']} pasadas con candidatos"
+                     if "pasadas_candidatos" in stats else ""))
+        iniciales = [f"{nombre} {stats[f'distancia_{nombre}']:.2f}"
+                     for nombre in args.constructores if f"distancia_{nombre}" in stats]
+        if iniciales:
+            print(f"Solución inicial: {', '.join(iniciales)}")
+        # la cota (y el óptimo) valen en el modelo de carga del backtracking: sale lleno y recarga
+        # solo vacío; split, ahorros y la búsqueda local arman rutas fuera de ese modelo
+        if mejor.cota_inferior >= mejor.distancia:
+            print("OPTIMO_DEMOSTRADO : SI (modelo del backtracking)")
+        elif mejor.cota_inferior > 0:
+            print(f"COTA_INFERIOR : {mejor.cota_inferior:.2f} (gap {stats['gap']:.1%}, modelo del backtracking)")
+        else:
+            print("COTA_INFERIOR : - (ninguna cota demostrada vale para esta ruta)")
+        if stats.get("ahorro_busqueda_local"):
+            print(f"Búsqueda local: {stats['mejoras_busqueda_local']:,} mejoras, "
+                  f"{stats['ahorro_busqueda_local']:.2f} de distancia ahorrada")
+        if "viajes_held_karp" in stats:
+            print(f"Held-Karp: {stats['viajes_held_karp']:,} viajes resueltos "
+                  f"({stats['aciertos_held_karp']:,} aciertos de cache), "
+                  f"{stats['reordenados_held_karp']:,} reordenados, "
+                  f"{stats['ahorro_held_karp']:.2f} de distancia ahorrada")
+        if stats.get("corte_por_tiempo"):
+            print(f"Se alcanzó el límite de tiempo ({stats['segundos_total']:.2f}s de resolución)")
+        if "tt_consultas" in stats:
+            print(f"Tabla de transposición: {stats['tt_tasa_aciertos']:.1%} de aciertos, "
+                  f"{stats['tt_podas']:,} podas, {stats['tt_desalojos']:,} desalojos")
+        # el branch-and-bound paralelo usa siempre el motor iterativo: solo se compara el secuencial
+        if args.comparar_bt and args.metodo == "bt" and args.procesos <= 1:
+            for motor in sorted(f.MOTORES_BT):
+                if motor == args.motor_bt:
+                    continue
+                otra = f.resolver_problema(**{**opciones, "motor_bt": motor})
+                otras = otra.estadisticas
+                print(f"Backtracking ({motor}): {otras['llamadas_bt']:,} llamadas, "
+                      f"{otras['llamadas_por_segundo']:,.0f} llamadas/s, distancia {otra.distancia:.2f} "
+                      f"(x{stats['llamadas_por_segundo'] / max(1.0, otras['llamadas_por_segundo']):.2f} "
+                      f"con {args.motor_bt})")
+
         tiempoFinal = time.time()
         print(
             f"Tiempo de ejecución: {tiempoFinal - tiempoInicial:.2f} segundos")
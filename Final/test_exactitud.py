@@ -0,0 +1,84 @@
+import itertools
+import random
+
+import pytest
+
+import funciones as f
+import exacto
+import held_karp
+from cotas import CotasInferiores, ContextoCotas
+
+# Las podas (cotas, tabla de transposición, candidatos) y los solvers exactos tienen que dar el
+# mismo óptimo que el backtracking sin podas sobre el modelo de carga del backtracking
+SEMILLAS = range(300)
+
+
+def instancia(semilla: int):
+    """Instancia chica al azar: (matriz, depósito, hubs, demanda, capacidad)."""
+    azar = random.Random(semilla)
+    n = azar.randint(5, 9)
+    puntos = [(azar.randint(0, 100), azar.randint(0, 100)) for _ in range(n)]
+    matriz = [[float(abs(xa - xb) + abs(ya - yb)) for xb, yb in puntos] for xa, ya in puntos]
+    hubs = azar.sample(range(1, n), azar.randint(0, min(2, n - 2)))
+    libres = [v for v in range(1, n) if v not in hubs]
+    destinos = azar.sample(libres, azar.randint(1, min(5, len(libres))))
+    demanda = {v: azar.randint(1, 3) for v in destinos}
+    return matriz, 0, hubs, demanda, azar.randint(2, 4)
+
+
+def resolver(matriz, deposito, hubs, demanda, capacidad, **opciones):
+    """resolver_problema sin constructores fuera del modelo, sin búsqueda local ni meseta."""
+    parametros = dict(max_llamadas_sin_mejora=10 ** 9, umbral_exacto=0, busqueda_local=False,
+                      constructores=("greedy",))
+    parametros.update(opciones)
+    return f.resolver_problema(matriz, deposito, hubs, demanda, capacidad, **parametros)
+
+
+def optimo_sin_podas(matriz, deposito, hubs, demanda, capacidad) -> float:
+    solucion = resolver(matriz, deposito, hubs, demanda, capacidad, cotas=(), memoria_transposicion_mb=0)
+    assert solucion.cota_inferior == solucion.distancia  # recorrió todo el árbol
+    return solucion.distancia
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS)
+def test_podas_y_solvers_exactos_dan_el_optimo(semilla):
+    caso = instancia(semilla)
+    optimo = optimo_sin_podas(*caso)
+
+    assert exacto.resolver_exacto(*caso).distancia == pytest.approx(optimo)
+    for motor in f.MOTORES_BT:
+        con_podas = resolver(*caso, motor_bt=motor, cotas=("recargas", "mst"), memoria_transposicion_mb=1)
+        assert con_podas.distancia == pytest.approx(optimo)
+    assert resolver(*caso, candidatos=1).distancia == pytest.approx(optimo)
+    assert resolver(*caso, metodo="haz", ancho_haz=10 ** 6).distancia == pytest.approx(optimo)
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS)
+def test_cotas_admisibles_en_la_raiz(semilla):
+    matriz, deposito, hubs, demanda, capacidad = instancia(semilla)
+    optimo = optimo_sin_podas(matriz, deposito, hubs, demanda, capacidad)
+    nodos_recarga = set(hubs) | {deposito}
+    nodos_demanda = list(demanda)
+    orden = f.ordenar_destinos(matriz, list(nodos_recarga | set(nodos_demanda)), nodos_demanda)
+    contexto = ContextoCotas(matriz, deposito, nodos_demanda, nodos_recarga, capacidad, orden)
+    demanda_vec = [demanda.get(v, 0) for v in range(len(matriz))]
+    for nombre in ("recargas", "mst"):
+        cota = CotasInferiores([nombre], contexto).cota_raiz(deposito, 0, sum(demanda.values()),
+                                                             contexto.mascara(demanda_vec))
+        assert cota <= optimo + 1e-9
+
+
+@pytest.mark.parametrize("semilla", SEMILLAS)
+def test_held_karp_igual_a_fuerza_bruta(semilla):
+    azar = random.Random(semilla)
+    k = azar.randint(1, 6)
+    submatriz = [[float(azar.randint(1, 50)) for _ in range(k + 2)] for _ in range(k + 2)]
+    costo, orden = held_karp.camino_minimo(submatriz)
+
+    def largo(permutacion):
+        nodos = [0, *(i + 1 for i in permutacion), k + 1]
+        return sum(submatriz[a][b] for a, b in zip(nodos, nodos[1:]))
+
+    assert sorted(orden) == list(range(k))
+    assert costo == pytest.approx(largo(orden))
+    assert costo == pytest.approx(min(largo(p) for p in itertools.permutations(range(k))))
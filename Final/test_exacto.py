@@ -0,0 +1,11 @@
+import funciones as f
+
+
+def test_demanda_grande_no_agota_la_recursion():
+    # ~750 viajes: la programación dinámica recursiva superaba el límite de recursión de Python
+    matriz = [[0, 5, 10], [5, 0, 5], [10, 5, 0]]
+    solucion = f.resolver_problema(matriz, 0, [1], {2: 6000}, 8)
+    assert "estados_exacto" in solucion.estadisticas
+    # depósito -> hub, 750 viajes hub -> 2 (-> hub), y del último destino al depósito
+    assert solucion.distancia == 5 + 749 * 10 + 5 + 10
+    assert solucion.cota_inferior == solucion.distancia
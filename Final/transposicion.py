@@ -0,0 +1,79 @@
+import random
+from collections import OrderedDict
+from typing import List, Dict
+
+#  Tabla de transposición para el backtracking
+#
+# El mismo estado (u, carga, demanda pendiente) aparece por distintos órdenes de entrega con
+# distinta distancia acumulada; lo que queda por recorrer desde él es idéntico, así que si ya
+# se llegó con una distancia menor o igual la rama no puede mejorar nada. Los hubs usados no
+# forman parte del estado porque no suman al costo.
+#
+# Los estados se identifican con un hash de Zobrist de 64 bits: un número al azar por cada
+# (nodo), (carga) y (nodo, demanda pendiente de ese nodo), combinados con XOR. La parte de la
+# demanda se actualiza en O(1) al entregar. Una colisión de 64 bits podría podar una rama
+# válida, con probabilidad despreciable.
+
+# Memoria aproximada que ocupa cada entrada del OrderedDict (clave int + valor float + nodo)
+BYTES_POR_ENTRADA = 160
+
+
+class TablaTransposicion:
+    """Mejor distancia registrada por estado, con desalojo LRU al superar `memoria_mb`."""
+
+    def __init__(self, n: int, demanda: List[int], capacidad_camion: int,
+                 memoria_mb: float = 64, semilla: int = 0):
+        azar = random.Random(semilla)
+        self.clave_nodo = [azar.getrandbits(64) for _ in range(n)]
+        self.clave_carga = [azar.getrandbits(64) for _ in range(capacidad_camion + 1)]
+        # clave_demanda[v][k]: nodo v con k paquetes pendientes (vacía si v no tiene demanda)
+        self.clave_demanda = [[azar.getrandbits(64) for _ in range(cnt + 1)] if cnt > 0 else []
+                              for cnt in demanda]
+        self.max_entradas = max(1, int(memoria_mb * 2 ** 20) // BYTES_POR_ENTRADA)
+        self._tabla: "OrderedDict[int, float]" = OrderedDict()
+        self.consultas = 0
+        self.aciertos = 0
+        self.podas = 0
+        self.desalojos = 0
+
+    def huella(self, demanda: List[int]) -> int:
+        """Hash de Zobrist del vector de demanda completo."""
+        h = 0
+        for v, claves in enumerate(self.clave_demanda):
+            if claves:
+                h ^= claves[demanda[v]]
+        return h
+
+    def entrega(self, huella: int, v: int, antes: int, despues: int) -> int:
+        """Huella de la demanda luego de que el nodo `v` pasa de `antes` a `despues` paquetes."""
+        claves = self.clave_demanda[v]
+        return huella ^ claves[antes] ^ claves[despues]
+
+    def podar(self, u: int, carga: int, huella: int, dist: float) -> bool:
+        """True si el estado ya se alcanzó con distancia <= `dist`; si no, registra `dist`."""
+        clave = huella ^ self.clave_nodo[u] ^ self.clave_carga[carga]
+        tabla = self._tabla
+        self.consultas += 1
+        registrada = tabla.get(clave)
+        if registrada is not None:
+            self.aciertos += 1
+            tabla.move_to_end(clave)
+            if registrada <= dist:
+                self.podas += 1
+                return True
+        elif len(tabla) >= self.max_entradas:
+            tabla.popitem(last=False)
+            self.desalojos += 1
+        tabla[clave] = dist
+        return False
+
+    def estadisticas(self) -> Dict[str, float]:
+        """Consultas, aciertos (tasa incluida), podas, desalojos y tamaño final de la tabla."""
+        return {
+            "tt_consultas": self.consultas,
+            "tt_aciertos": self.aciertos,
+            "tt_tasa_aciertos": self.aciertos / self.consultas if self.consultas else 0.0,
+            "tt_podas": self.podas,
+            "tt_desalojos": self.desalojos,
+            "tt_entradas": len(self._tabla),
+        }
@@ -46,142 +46,88 @@ def eliminar_comentario(linea: str) -> str:
     return linea.strip()
 
 
+# Encabezados de sección reconocidos (se busca el nombre dentro de una línea "// --- X ---")
+SECCIONES = ("ARISTAS", "PAQUETES", "HUBS", "NODOS")
+
+
+def detectar_seccion(linea: str) -> Optional[str]:
+    """Devuelve el nombre de la sección si la línea es un encabezado "--- X ---"."""
+    if "---" not in linea:
+        return None
+    for seccion in SECCIONES:
+        if seccion in linea:
+            return seccion
+    return None
+
+
 def leer_archivo(nombre_archivo: str) -> Optional[Problema]:
-    """Lee un archivo de problema y retorna un objeto Problema."""
+    """Lee un archivo de problema y retorna un objeto Problema.
+    Recorre el archivo una sola vez, línea por línea, con una máquina de estados
+    que cambia de sección al encontrar cada encabezado.
+    """
     try:
-        with open(nombre_archivo, 'r') as f:
-            lineas = f.readlines()
+        archivo = open(nombre_archivo, 'r')
     except FileNotFoundError:
         print(f"Error: No se pudo abrir el archivo '{nombre_archivo}'")
         return None
 
     p = Problema()
-
-    # --- LEER CONFIGURACIÓN (primeras líneas) ---
-    idx = 0
-    while idx < len(lineas):
-        linea = eliminar_comentario(lineas[idx])
-        
-        if not linea:
-            idx += 1
-            continue
-        
-        if linea.startswith("NODOS"):
-            p.num_nodos = int(linea.split()[1])
-        elif linea.startswith("HUBS"):
-            p.num_hubs = int(linea.split()[1])
-        elif linea.startswith("PAQUETES"):
-            p.num_paquetes = int(linea.split()[1])
-        elif linea.startswith("CAPACIDAD_CAMION"):
-            p.capacidad_camion = int(linea.split()[1])
-        elif linea.startswith("DEPOSITO_ID"):
-            p.deposito_id = int(linea.split()[1])
-            idx += 1
-            break  # <-- BREAK aquí después de encontrar DEPOSITO_ID
-        
-        idx += 1
-
-    # Inicializar matriz de distancias
-    p.grafo_distancias = [[0.0 for _ in range(p.num_nodos)] for _ in range(p.num_nodos)]
-
-    # --- ENCONTRAR Y LEER CADA SECCIÓN ---
-    
-    # Buscar encabezado de NODOS
-    start_nodos = -1
-    for i in range(idx, len(lineas)):
-        if "NODOS" in lineas[i] and "---" in lineas[i]:
-            start_nodos = i + 1
-            break
-    
-    # Leer NODOS
-    if start_nodos > 0:
-        nodos_leidos = 0
-        for i in range(start_nodos, len(lineas)):
-            if nodos_leidos >= p.num_nodos:
-                break
-            linea = eliminar_comentario(lineas[i])
-            if not linea:
+    seccion = "CONFIGURACION"
+
+    with archivo:
+        for linea_cruda in archivo:
+            nueva_seccion = detectar_seccion(linea_cruda)
+            if nueva_seccion is not None:
+                if seccion == "CONFIGURACION":
+                    # Terminó la configuración: ya se conoce la cantidad de nodos
+                    p.grafo_distancias = [
+                        [0.0 for _ in range(p.num_nodos)] for _ in range(p.num_nodos)]
+                seccion = nueva_seccion
                 continue
-            try:
-                partes = linea.split()
-                nodo = Nodo(id=int(partes[0]), x=int(partes[1]), y=int(partes[2]))
-                p.nodos.append(nodo)
-                nodos_leidos += 1
-            except (ValueError, IndexError):
-                pass
 
-    # Buscar encabezado de HUBS
-    start_hubs = -1
-    for i in range(len(lineas)):
-        if "HUBS" in lineas[i] and "---" in lineas[i]:
-            start_hubs = i + 1
-            break
-    
-    # Leer HUBS
-    if start_hubs > 0:
-        hubs_leidos = 0
-        for i in range(start_hubs, len(lineas)):
-            if hubs_leidos >= p.num_hubs:
-                break
-            linea = eliminar_comentario(lineas[i])
+            linea = eliminar_comentario(linea_cruda)
             if not linea:
                 continue
-            try:
-                partes = linea.split()
-                hub = Hub(id_nodo=int(partes[0]), costo_activacion=float(partes[1]))
-                p.hubs.append(hub)
-                hubs_leidos += 1
-            except (ValueError, IndexError):
-                pass
+            partes = linea.split()
 
-    # Buscar encabezado de PAQUETES
-    start_paquetes = -1
-    for i in range(len(lineas)):
-        if "PAQUETES" in lineas[i] and "---" in lineas[i]:
-            start_paquetes = i + 1
-            break
-    
-    # Leer PAQUETES
-    if start_paquetes > 0:
-        paquetes_leidos = 0
-        for i in range(start_paquetes, len(lineas)):
-            if paquetes_leidos >= p.num_paquetes:
-                break
-            linea = eliminar_comentario(lineas[i])
-            if not linea:
-                continue
             try:
-                partes = linea.split()
-                paquete = Paquete(id=int(partes[0]), 
-                                 id_nodo_origen=int(partes[1]), 
-                                 id_nodo_destino=int(partes[2]))
-                p.paquetes.append(paquete)
-                paquetes_leidos += 1
+                if seccion == "ARISTAS":
+                    if len(partes) >= 3:
+                        u, v, peso = int(partes[0]), int(
+                            partes[1]), float(partes[2])
+                        if u < p.num_nodos and v < p.num_nodos:
+                            p.grafo_distancias[u][v] = peso
+                            p.grafo_distancias[v][u] = peso
+                elif seccion == "NODOS":
+                    if len(p.nodos) < p.num_nodos:
+                        p.nodos.append(Nodo(id=int(partes[0]), x=int(
+                            partes[1]), y=int(partes[2])))
+                elif seccion == "HUBS":
+                    if len(p.hubs) < p.num_hubs:
+                        p.hubs.append(Hub(id_nodo=int(partes[0]),
+                                          costo_activacion=float(partes[1])))
+                elif seccion == "PAQUETES":
+                    if len(p.paquetes) < p.num_paquetes:
+                        p.paquetes.append(Paquete(id=int(partes[0]),
+                                                  id_nodo_origen=int(partes[1]),
+                                                  id_nodo_destino=int(partes[2])))
+                elif partes[0] == "NODOS":
+                    p.num_nodos = int(partes[1])
+                elif partes[0] == "HUBS":
+                    p.num_hubs = int(partes[1])
+                elif partes[0] == "PAQUETES":
+                    p.num_paquetes = int(partes[1])
+                elif partes[0] == "CAPACIDAD_CAMION":
+                    p.capacidad_camion = int(partes[1])
+                elif partes[0] == "DEPOSITO_ID":
+                    p.deposito_id = int(partes[1])
             except (ValueError, IndexError):
                 pass
 
-    # Buscar encabezado de ARISTAS
-    start_aristas = -1
-    for i in range(len(lineas)):
-        if "ARISTAS" in lineas[i] and "---" in lineas[i]:
-            start_aristas = i + 1
-            break
-    
-    # Leer ARISTAS
-    if start_aristas > 0:
-        for i in range(start_aristas, len(lineas)):
-            linea = eliminar_comentario(lineas[i])
-            if not linea:
-                continue
-            try:
-                partes = linea.split()
-                if len(partes) >= 3:
-                    u, v, peso = int(partes[0]), int(partes[1]), float(partes[2])
-                    if u < p.num_nodos and v < p.num_nodos:
-                        p.grafo_distancias[u][v] = peso
-                        p.grafo_distancias[v][u] = peso
-            except (ValueError, IndexError):
-                pass
+    if seccion == "CONFIGURACION":
+        # Archivo sin secciones: igual se devuelve la matriz vacía
+        p.grafo_distancias = [
+            [0.0 for _ in range(p.num_nodos)] for _ in range(p.num_nodos)]
 
     return p
 